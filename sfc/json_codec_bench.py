@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Synopsis:                                                                   #
+# Benchmarks the JSON codecs SFC can use to decode SolidFire API responses   #
+#   (sfc.JSON_CODECS) on recorded ListVolumes/ListVolumeStats responses.      #
+#                                                                             #
+# Author: @scaleoutSean (Github)                                              #
+# Repository: https://github.com/scaleoutsean/sfc                             #
+# License: the Apache License Version 2.0                                     #
+###############################################################################
+
+# Record responses from a cluster (read-only API calls), for example:
+#   curl -sk -u admin -H 'Content-Type: application/json' -o ListVolumes.json \
+#     -d '{"method": "ListVolumes", "params": {"volumeStatus": "active"}}' https://MVIP/json-rpc/12.5/
+#   curl -sk -u admin -H 'Content-Type: application/json' -o ListVolumeStats.json \
+#     -d '{"method": "ListVolumeStats", "params": {"volumeIDs": [1, 2, 3]}}' https://MVIP/json-rpc/12.5/
+# and run:
+#   python3 json_codec_bench.py ListVolumes.json ListVolumeStats.json
+# Without files, synthetic ListVolumes and ListVolumeStats responses for --volumes volumes are used.
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sfc  # noqa: E402
+
+
+def synthetic_responses(volumes):
+    """
+    Return ListVolumes and ListVolumeStats response bodies for the given number of volumes.
+    """
+    list_volumes = {'id': 1, 'result': {'volumes': [
+        {'volumeID': i, 'name': 'pvc-' + str(i), 'accountID': i % 16 + 1, 'access': 'readWrite', 'status': 'active',
+         'enable512e': True, 'scsiNAADeviceID': '6f47acc1000000006a6b6d7a%08x' % i, 'qosPolicyID': None,
+         'blockSize': 4096, 'fifoSize': 24, 'minFifoSize': 0, 'totalSize': 1073741824 * (i % 64 + 1),
+         'volumeConsistencyGroupUUID': '1c6ad2d5-4bd2-4bd3-8f5d-%012d' % i, 'volumePairs': [],
+         'qos': {'minIOPS': 50, 'maxIOPS': 15000, 'burstIOPS': 15000, 'burstTime': 60},
+         'attributes': {'docker-name': 'pvc-' + str(i), 'fstype': 'xfs', 'provisioning': '',
+                        'trident': json.dumps({'version': '24.02', 'backendUUID': 'b-1', 'platform': 'kubernetes',
+                                               'platformVersion': 'v1.29.2', 'plugin': 'solidfire-san'})}}
+        for i in range(1, volumes + 1)]}}
+    list_volume_stats = {'id': 1, 'result': {'volumeStats': [
+        {'volumeID': i, 'accountID': i % 16 + 1, 'actualIOPS': i % 5000, 'asyncDelay': None, 'averageIOPSize': 4096,
+         'burstIOPSCredit': 30000, 'clientQueueDepth': 1, 'latencyUSec': 300 + i % 700, 'nonZeroBlocks': 1000 * i,
+         'normalizedIOPS': i % 3000, 'readBytes': 10 ** 12 + i, 'readBytesLastSample': 4096 * i, 'readLatencyUSec': 200,
+         'readOps': 10 ** 8 + i, 'readOpsLastSample': i, 'samplePeriodMSec': 500, 'throttle': 0.0,
+         'timestamp': '2026-01-01T00:00:00.000000Z', 'unalignedReads': 0, 'unalignedWrites': 0,
+         'volumeAccessGroups': [1], 'volumeSize': 1073741824 * (i % 64 + 1), 'volumeUtilization': 0.25,
+         'writeBytes': 10 ** 11 + i, 'writeBytesLastSample': 8192 * i, 'writeLatencyUSec': 400,
+         'writeOps': 10 ** 7 + i, 'writeOpsLastSample': 2 * i, 'zeroBlocks': 262144 - i % 1000}
+        for i in range(1, volumes + 1)]}}
+    return [('ListVolumes (synthetic)', json.dumps(list_volumes).encode()),
+            ('ListVolumeStats (synthetic)', json.dumps(list_volume_stats).encode())]
+
+
+def bench(loads, body, repeat):
+    """
+    Return the median decode time (seconds) and the peak and retained memory (bytes) of one decode.
+    """
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        loads(body)
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    result = loads(body)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return statistics.median(times), peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON codecs on recorded SolidFire API responses.')
+    parser.add_argument('files', nargs='*', help='recorded SolidFire API response bodies (JSON)')
+    parser.add_argument('--volumes', type=int, default=10000,
+                        help='number of volumes in synthetic responses (used without files). Default: 10000')
+    parser.add_argument('--repeat', type=int, default=20, help='decodes per codec and response. Default: 20')
+    args = parser.parse_args()
+
+    if args.files:
+        responses = []
+        for name in args.files:
+            with open(name, 'rb') as f:
+                responses.append((os.path.basename(name), f.read()))
+    else:
+        responses = synthetic_responses(args.volumes)
+
+    # NOTE: 'json (text)' is what aiohttp's response.json() does: decode the body to str, then parse the str
+    codecs = [('json (text)', lambda body: json.loads(body.decode('utf-8')))]
+    codecs.extend(sorted(sfc.JSON_CODECS.items()))
+    if sfc.orjson is None:
+        print('orjson is not installed; only the json codec is benchmarked.')
+    print(f"{'response':<30} {'codec':<12} {'MB':>7} {'ms':>9} {'MB/s':>8} {'peak MB':>8} {'kept MB':>8}")
+    for name, body in responses:
+        size = len(body) / 1e6
+        for codec, loads in codecs:
+            seconds, peak, retained = bench(loads, body, args.repeat)
+            print(f'{name:<30} {codec:<12} {size:>7.2f} {seconds * 1000:>9.2f} {size / seconds:>8.1f} '
+                  f'{peak / 1e6:>8.2f} {retained / 1e6:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
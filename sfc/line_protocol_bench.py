@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Synopsis:                                                                   #
+# Benchmarks building the volume_performance line protocol payload from       #
+#   ListVolumeStats records: timestamps stamped while lines are built (SFC)   #
+#   versus the former timestamp rewrite pass in send_to_influx().             #
+#                                                                             #
+# Author: @scaleoutSean (Github)                                              #
+# Repository: https://github.com/scaleoutsean/sfc                             #
+# License: the Apache License Version 2.0                                     #
+###############################################################################
+
+# Run:
+#   python3 line_protocol_bench.py --volumes 10000
+# Each variant turns the same ListVolumeStats records into the payload that is handed to the InfluxDB writer, and
+# all variants must produce the same payload.
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sfc  # noqa: E402
+from json_codec_bench import synthetic_responses  # noqa: E402
+
+TIMESTAMP = 1767225600
+
+
+def build(records, timestamp):
+    """
+    Build the volume_performance payload per record, as volume_performance() does without NumPy.
+    """
+    sfc.CURRENT_TIMESTAMP = timestamp
+    schema = sfc.MEASUREMENT_SCHEMAS['volume_performance']
+    lp = sfc.LineProtocol()
+    for volume in records:
+        schema.add(lp, volume, tags=[('cluster', 'PROD-01'), ('id', volume['volumeID']),
+                                     ('name', 'pvc-' + str(volume['volumeID']))])
+    return lp.payload()
+
+
+def build_columns(records, timestamp):
+    """
+    Build the volume_performance payload with the columnar encoder, as volume_performance() does with NumPy.
+    """
+    sfc.CURRENT_TIMESTAMP = timestamp
+    schema = sfc.MEASUREMENT_SCHEMAS['volume_performance']
+    lp = sfc.LineProtocol()
+    columns = schema.columns(records)
+    ids = [volume['volumeID'] for volume in records]
+    schema.add_columns(lp, columns, tags=[('cluster', 'PROD-01'), ('id', sfc._np_column(ids)),
+                                          ('name', sfc._np_column(['pvc-' + str(i) for i in ids]))])
+    return lp.payload()
+
+
+def rewrite_pass(payload, timestamp):
+    """
+    The timestamp rewrite pass send_to_influx() ran on every payload before lines were stamped while being built.
+    """
+    original_lines = payload.splitlines()
+    stripped_lines = [line.rstrip() for line in original_lines]
+    timestamped_lines = []
+    for line in stripped_lines:
+        if line.strip():
+            timestamp_pattern = r'\s+\d{10,}$'
+            if re.search(timestamp_pattern, line):
+                timestamped_line = re.sub(timestamp_pattern, ' ' + str(timestamp), line)
+            else:
+                timestamped_line = line.rstrip() + " " + str(timestamp)
+            timestamped_lines.append(timestamped_line)
+    return '\n'.join(timestamped_lines)
+
+
+def submitted(payload):
+    """
+    What send_to_influx() does with a stamped payload before it is handed to the writer.
+    """
+    payload = payload.rstrip('\n')
+    payload.count('\n')
+    return payload
+
+
+def bench(variant, records, repeat):
+    """
+    Return the median time (seconds), the peak memory (bytes) and the payload of one run of a variant.
+    """
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        variant(records)
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    payload = variant(records)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark building the volume_performance line protocol payload.')
+    parser.add_argument('--volumes', type=int, default=10000,
+                        help='number of volumes in the synthetic ListVolumeStats response. Default: 10000')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per variant. Default: 20')
+    args = parser.parse_args()
+    sfc.args = argparse.Namespace(loglevel='WARNING')
+
+    body = dict(synthetic_responses(args.volumes))['ListVolumeStats (synthetic)']
+    records = json.loads(body)['result']['volumeStats']
+    variants = [('rewrite pass (former)', lambda r: submitted(rewrite_pass(build(r, None), TIMESTAMP))),
+                ('stamped while built', lambda r: submitted(build(r, TIMESTAMP)))]
+    if sfc.np is not None:
+        variants.append(('stamped, columnar', lambda r: submitted(build_columns(r, TIMESTAMP))))
+    else:
+        print('NumPy is not installed; the columnar encoder is not benchmarked.')
+    print(f"{'variant':<24} {'lines':>7} {'MB':>7} {'ms':>9} {'peak MB':>8}")
+    expected = None
+    for name, variant in variants:
+        seconds, peak, payload = bench(variant, records, args.repeat)
+        if expected is None:
+            expected = payload
+        elif payload != expected:
+            sys.exit(name + ' produced a different payload.')
+        print(f"{name:<24} {payload.count(chr(10)) + 1:>7} {len(payload) / 1e6:>7.2f} {seconds * 1000:>9.2f} "
+              f"{peak / 1e6:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -22,32 +22,51 @@ from argparse import Namespace
 import aiohttp
 import asyncio
 import base64
+import codecs
+import contextvars
 from aiohttp import ClientSession, ClientResponseError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import datetime
 from getpass import getpass
+import gzip
 import hashlib
+import heapq
 import logging
 import logging.handlers
 from logging.handlers import RotatingFileHandler
 from logging.handlers import QueueHandler
 import json
+import math
+import mmap
+import operator
 import os
 import platform
 import random
 import re
 import ssl
+import struct
 import sys
 import warnings
 import time
+import zlib
 # import urllib.parse
 # import uuid
+# NOTE: NumPy is optional. Without it, volume_performance encodes lines per record (see lp_column())
+try:
+    import numpy as np
+except ImportError:
+    np = None
+# NOTE: orjson is optional. Without it, SolidFire API responses are decoded with json (see sf_json_loads())
+try:
+    import orjson
+except ImportError:
+    orjson = None
 warnings.simplefilter("default")
 os.environ["PYTHONWARNINGS"] = "default"
 
 # =============== default vars ================================================
 
-VERSION = '2.2.2'
+VERSION = '2.3.0'
 
 # Create reporting-only admin user with read-only access to the SolidFire API.
 # Modify these five variables to match your environment if you want hardcoded
@@ -76,6 +95,102 @@ INT_EXPERIMENTAL_FREQ = 600
 
 # Check the source code below to see what this does (submits volume metrics in batches)
 CHUNK_SIZE = 24
+# Batched SolidFire API calls (ListVolumeStats) adapt their chunk size after every collection cycle (see ChunkSizer),
+# starting at CHUNK_SIZE and staying within these bounds. Calls should not take longer than the latency ceiling (seconds)
+CHUNK_SIZE_MIN = 8
+CHUNK_SIZE_MAX = 500
+CHUNK_LATENCY_CEILING = 5.0
+# Number of volumes per ListVolumes request; volumes() processes and sends one page at a time
+LIST_VOLUMES_PAGE_SIZE = 1000
+# SolidFire API responses cached for all collectors and tiers (see SFResponseCache): TTL (seconds) per API method.
+# Methods without a TTL are not cached
+SF_CACHE_TTL = {'ListVolumes': 300, 'ListAccounts': 300}
+# JSON decoder for SolidFire API responses (see JSON_CODECS): 'orjson' when it is installed, otherwise 'json'
+SF_JSON_CODEC = 'orjson' if orjson is not None else 'json'
+# Bytes read from the response stream at a time when SolidFire API responses are decoded incrementally (--stream-json)
+SF_STREAM_READ_SIZE = 64 * 1024
+# Max. number of ListVolumeStats batches (of CHUNK_SIZE volumes) volume_performance requests at the same time
+VOLUME_STATS_CONCURRENCY = 4
+# Volume QoS histogram output (experimental): raw bucket counts ('buckets'), approximate percentiles and means per
+# volume and histogram in one histogram_summary line per volume ('summary', requires NumPy), or 'both'. The summary
+# has one series per volume instead of six; use 'buckets' or 'both' for dashboards that need the bucket counts.
+# Without NumPy, bucket counts are sent.
+QOS_HISTOGRAM_OUTPUT = 'summary'
+# Max. number of GetVolumeEfficiency (GetAccountEfficiency) requests volume_efficiency (account_efficiency) has in
+# flight at the same time
+VOLUME_EFFICIENCY_CONCURRENCY = 4
+ACCOUNT_EFFICIENCY_CONCURRENCY = 4
+# Rotating efficiency collection (see EfficiencyRotation): with EFFICIENCY_SLICES > 1, accounts and volumes are split
+# into slices by ID and account_efficiency and volume_efficiency collect one slice every INT_LO_FREQ / EFFICIENCY_SLICES
+# seconds, so every object is still collected once per low-frequency interval. Progress is saved to
+# EFFICIENCY_STATE_FILE (if set), so that SFC continues with the next slice after a restart
+EFFICIENCY_SLICES = 1
+EFFICIENCY_STATE_FILE = None
+
+# SolidFire API client (see SolidFireClient): max. connections per collection tier and
+# max. idle keep-alive time (seconds) of pooled connections to the MVIP. The 'efficiency' tier runs the ticks of
+# rotating efficiency collection (see efficiency_tasks())
+SF_POOL_SIZE = {'hi': 8, 'med': 4, 'lo': 4, 'experimental': 4, 'efficiency': 4}
+SF_KEEPALIVE_TIMEOUT = 300
+
+# SolidFire API governor (see SFGovernor): requests of all tiers share a token bucket (requests per second, adapted
+# between SF_RATE_MIN and SF_RATE_MAX) and a limit of concurrent requests (adapted between 1 and SF_MAX_IN_FLIGHT).
+# Both back off when requests fail or take longer than SF_LATENCY_TARGET (seconds). Waiting requests of tiers with
+# lower SF_TIER_PRIORITY values go first
+SF_RATE_MAX = 50.0
+SF_RATE_MIN = 1.0
+SF_MAX_IN_FLIGHT = 16
+SF_LATENCY_TARGET = 2.0
+SF_TIER_PRIORITY = {'hi': 0, 'med': 1, 'experimental': 2, 'lo': 3, 'efficiency': 3}
+
+# Collection cycle deadline: collectors of a tier still running CYCLE_DEADLINE_FRACTION of the tier's interval after
+# the cycle started are cancelled and the lines they gathered so far are sent (see run_tier_tasks()). SolidFire API
+# calls time out after SF_CALL_TIMEOUT seconds or half of the cycle deadline, whichever is shorter
+CYCLE_DEADLINE_FRACTION = 0.8
+SF_CALL_TIMEOUT = 30.0
+
+# InfluxDB writer connection pool (see InfluxWriter): max. connections, idle
+# keep-alive time (seconds) and DNS cache TTL (seconds)
+INFLUX_POOL_SIZE = 4
+INFLUX_KEEPALIVE_TIMEOUT = 120
+INFLUX_DNS_TTL = 300
+
+# Write coalescing: line protocol from all collectors is buffered and sent when
+# the buffer reaches max. bytes (approximate) or max. lines, or when the oldest
+# buffered line is older than linger time (seconds). Linger 0 disables buffering.
+INFLUX_WRITE_MAX_BYTES = 4 * 1024 * 1024
+INFLUX_WRITE_MAX_LINES = 20000
+INFLUX_WRITE_LINGER = 2.0
+
+# Flushed batches go to a bounded queue drained by INFLUX_WRITE_WORKERS writer
+# tasks. When the queue is full, the policy decides what happens to a new batch:
+# 'block' (collector waits), 'drop-oldest' or 'spill' (to the on-disk spool)
+INFLUX_WRITE_WORKERS = 2
+INFLUX_WRITE_QUEUE_SIZE = 16
+INFLUX_WRITE_QUEUE_POLICY = 'block'
+
+# Writes that time out or fail with 429 or 5xx are retried up to INFLUX_WRITE_RETRIES
+# times with jittered exponential backoff (seconds). Other 4xx responses are not
+# retried; lines rejected in a partial write are logged and, if INFLUX_QUARANTINE_FILE
+# is set, appended to it
+INFLUX_WRITE_RETRIES = 3
+INFLUX_WRITE_BACKOFF = 0.5
+INFLUX_WRITE_BACKOFF_MAX = 10.0
+INFLUX_QUARANTINE_FILE = None
+
+# Gzip compression of InfluxDB write bodies: compression level (1-9, 0 disables
+# compression) and min. body size (bytes) below which bodies are sent as-is
+INFLUX_WRITE_GZIP_LEVEL = 0
+INFLUX_WRITE_GZIP_MIN_BYTES = 4096
+
+# On-disk spool for InfluxDB writes that failed with a transient error (see
+# WriteSpool). Disabled when INFLUX_SPOOL_DIR is None. Spooled batches are
+# replayed at up to INFLUX_SPOOL_REPLAY_RATE batches per second once InfluxDB
+# accepts writes again; the oldest segments are evicted above INFLUX_SPOOL_MAX_BYTES.
+INFLUX_SPOOL_DIR = None
+INFLUX_SPOOL_MAX_BYTES = 256 * 1024 * 1024
+INFLUX_SPOOL_SEGMENT_BYTES = 16 * 1024 * 1024
+INFLUX_SPOOL_REPLAY_RATE = 2.0
 
 # Global iteration counter
 ITERATION = 0
@@ -88,6 +203,17 @@ SF_URL = f'https://{SF_MVIP}'  # Constructed from SF_MVIP
 SF_POST_URL = f'https://{SF_MVIP}/json-rpc/12.5/'  # Default URL
 CLUSTER_NAME = 'unknown'  # Will be set after connecting
 args: Namespace  # Will be set by argparse
+INFLUX_WRITER = None  # Long-lived InfluxWriter, created by main()
+SF_CLIENT = None  # Long-lived SolidFireClient, created by main()
+CHUNK_SIZERS = {}  # ChunkSizer per batched SolidFire API method, see get_chunk_sizer()
+SF_RESPONSE_CACHE = None  # SFResponseCache shared by all collectors, see get_sf_response_cache()
+# LineProtocol payloads built by the collector (task) that runs in this context, see run_sf_task()
+CYCLE_LINES = contextvars.ContextVar('CYCLE_LINES', default=None)
+EFFICIENCY_ROTATION = None  # EfficiencyRotation, created by main() with EFFICIENCY_SLICES > 1
+
+# Column arrays (one NumPy array per ListVolumeStats key, including volumeID) from the last volume_performance run,
+# kept for in-process aggregation. Only filled when volume_performance uses the columnar (NumPy) encoder
+VOLUME_PERFORMANCE_COLUMNS = {}
 
 # Volume name cache - RAM-based cache for volume ID to name mapping
 VOLUME_NAME_CACHE = {}  # {volume_id: volume_name}
@@ -122,7 +248,7 @@ def sf_ssl_for_connector():
     return False
 
 
-def build_sf_connector(*, timeout_ceil_threshold=None, force_close=False):
+def build_sf_connector(*, timeout_ceil_threshold=None, force_close=False, limit=None, keepalive_timeout=None):
     # Python 3.15+ ignores enable_cleanup_closed and emits noisy deprecation warnings.
     kwargs = {
         'ssl': sf_ssl_for_connector(),
@@ -130,36 +256,587 @@ def build_sf_connector(*, timeout_ceil_threshold=None, force_close=False):
     }
     if timeout_ceil_threshold is not None:
         kwargs['timeout_ceil_threshold'] = timeout_ceil_threshold
+    if limit is not None:
+        kwargs['limit'] = limit
+    if keepalive_timeout is not None:
+        kwargs['keepalive_timeout'] = keepalive_timeout
     if sys.version_info < (3, 15):
         kwargs['enable_cleanup_closed'] = True
     return aiohttp.TCPConnector(**kwargs)
 
 
+class SFGovernor:
+    """
+    Rate and concurrency governor for all SolidFire API requests, applied by the SolidFireClient session middleware.
+
+    A request takes a token from a bucket refilled at rate tokens per second and one of limit concurrent slots. If
+    either is not available, it waits; waiting requests of higher-priority tiers (SF_TIER_PRIORITY) go first. Rate
+    and limit follow AIMD: both are halved (at most once per second) when a request fails with a connection error,
+    timeout, 429 or 5xx, or takes longer than SF_LATENCY_TARGET, and grow by about one per second (rate) and one per
+    round of limit requests (limit) while requests succeed.
+    """
+
+    def __init__(self):
+        self.rate = SF_RATE_MAX
+        self.limit = float(SF_MAX_IN_FLIGHT)
+        self.tokens = max(1.0, SF_RATE_MAX)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.waiters = []  # heap of (priority, sequence, future)
+        self.sequence = 0
+        self.timer = None
+        self.last_decrease = 0.0
+        self.stats = self._new_stats()
+
+    @staticmethod
+    def _new_stats():
+        return {'requests': 0, 'waited': 0, 'wait_time': 0.0, 'wait_time_max': 0.0, 'failed': 0, 'slow': 0,
+                'decreases': 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _dispatch(self):
+        self._refill()
+        while self.waiters and self.in_flight < int(self.limit) and self.tokens >= 1:
+            future = heapq.heappop(self.waiters)[2]
+            if future.done():
+                continue  # NOTE: the waiter was cancelled
+            self.tokens -= 1
+            self.in_flight += 1
+            future.set_result(None)
+        if self.waiters and self.in_flight < int(self.limit) and self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later((1 - self.tokens) / self.rate, self._on_timer)
+
+    def _on_timer(self):
+        self.timer = None
+        self._dispatch()
+
+    async def acquire(self, priority):
+        """
+        Wait for a token and a concurrency slot. Callers must call release() when the request completes.
+        """
+        self.stats['requests'] += 1
+        self._refill()
+        if not self.waiters and self.in_flight < int(self.limit) and self.tokens >= 1:
+            self.tokens -= 1
+            self.in_flight += 1
+            return
+        wait_start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self.sequence += 1
+        heapq.heappush(self.waiters, (priority, self.sequence, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        wait = time.monotonic() - wait_start
+        self.stats['waited'] += 1
+        self.stats['wait_time'] += wait
+        self.stats['wait_time_max'] = max(self.stats['wait_time_max'], wait)
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def feedback(self, latency, failed):
+        """
+        Adapt rate and limit to the outcome of a completed request.
+        """
+        if not failed and latency <= SF_LATENCY_TARGET:
+            self.rate = min(SF_RATE_MAX, self.rate + 1.0 / max(1.0, self.rate))
+            self.limit = min(float(SF_MAX_IN_FLIGHT), self.limit + 1.0 / self.limit)
+            return
+        self.stats['failed' if failed else 'slow'] += 1
+        now = time.monotonic()
+        if now - self.last_decrease < 1.0:
+            return
+        if self.rate <= SF_RATE_MIN and self.limit < 2:
+            return
+        self.last_decrease = now
+        self.rate = max(SF_RATE_MIN, self.rate / 2)
+        self.limit = max(1.0, self.limit / 2)
+        self.stats['decreases'] += 1
+        logging.warning('SolidFire API request ' + ('failed' if failed else 'took ' + str(round(latency, 3)) + 's') +
+                        '. Reducing API request rate to ' + str(round(self.rate, 1)) + '/s and concurrency to ' +
+                        str(int(self.limit)) + '.')
+
+    def flush_stats(self):
+        """
+        Return the stats since the last call, with the current rate, limit and requests in flight, and reset them.
+        """
+        stats, self.stats = self.stats, self._new_stats()
+        stats.update(rate=round(self.rate, 2), limit=int(self.limit), in_flight=self.in_flight)
+        return stats
+
+
+class SolidFireClient:
+    """
+    Long-lived SolidFire API client for one cluster (MVIP), created once by main().
+
+    Each collection tier (hi, med, lo, experimental, efficiency) has its own ClientSession with a keep-alive pool of
+    up to SF_POOL_SIZE[tier] connections, so tiers cannot starve each other of connections and connections to the
+    MVIP are reused across collection cycles instead of doing a TLS handshake per cycle. Sessions ask for
+    gzip-compressed responses. reconnect() drops a tier's pooled connections after connection errors, e.g. when the
+    MVIP moves to another node, so that the next request connects again.
+
+    fetch() is single-flight: callers that ask for the same method and params while such a request is in flight,
+    from any tier, await that request instead of sending their own. Every request of every session passes through
+    the SFGovernor of the client.
+    """
+
+    # NOTE: connector timeout_ceil_threshold per tier, as used by the former per-cycle sessions
+    TIMEOUT_CEIL_THRESHOLD = {'hi': None, 'med': 15, 'lo': 30, 'experimental': 20, 'efficiency': 30}
+
+    def __init__(self):
+        self.sessions = {}
+        self.reconnects = 0
+        self.inflight = {}  # {(method, params): future of the response body}
+        self.governor = SFGovernor()
+        self.coalesced = {}  # {method: number of requests that shared another caller's in-flight request}
+
+    def session(self, tier):
+        """
+        Return the pooled session of a tier, (re)creating it if it does not exist or was closed.
+        """
+        session = self.sessions.get(tier)
+        if session is None or session.closed:
+            # NOTE: keep idle connections a bit longer than the tier's interval so the next cycle can reuse them
+            connector = build_sf_connector(timeout_ceil_threshold=self.TIMEOUT_CEIL_THRESHOLD[tier],
+                                           limit=SF_POOL_SIZE[tier],
+                                           keepalive_timeout=min(SF_KEEPALIVE_TIMEOUT, tier_interval(tier) + 30))
+            # NOTE: the total timeout covers the whole call, including reading the response body
+            call_timeout = sf_call_timeout(tier)
+            session = aiohttp.ClientSession(connector=connector,
+                                            headers=dict(sf_headers, **{'Accept-Encoding': 'gzip, deflate'}),
+                                            timeout=aiohttp.ClientTimeout(total=call_timeout),
+                                            middlewares=(self._governed(SF_TIER_PRIORITY[tier]),))
+            self.sessions[tier] = session
+            logging.info('SolidFire API session opened for ' + tier + '-frequency tasks (pool size: ' +
+                         str(SF_POOL_SIZE[tier]) + ', call timeout: ' + str(call_timeout) + 's).')
+        return session
+
+    def _governed(self, priority):
+        """
+        Return a session middleware that sends requests through the governor with the priority of a tier.
+        """
+        governor = self.governor
+
+        async def governed(request, handler):
+            await governor.acquire(priority)
+            request_start = time.monotonic()
+            try:
+                response = await handler(request)
+            except asyncio.CancelledError:
+                governor.release()
+                raise
+            except Exception:
+                governor.feedback(time.monotonic() - request_start, True)
+                governor.release()
+                raise
+            # NOTE: latency until the response headers arrive; the body is read after the slot is released
+            governor.feedback(time.monotonic() - request_start, response.status == 429 or response.status >= 500)
+            governor.release()
+            return response
+        return governed
+
+    async def reconnect(self, tier):
+        """
+        Close a tier's session and its pooled connections. The next session() call opens new connections.
+        """
+        session = self.sessions.pop(tier, None)
+        if session is not None and not session.closed:
+            await session.close()
+        self.reconnects += 1
+        logging.warning('Reconnecting to SolidFire API (' + SF_URL + ') for ' + tier + '-frequency tasks.')
+
+    async def fetch(self, session, url, payload):
+        """
+        POST a SolidFire API request and return the response body (bytes), sharing identical in-flight requests.
+        """
+        key = sf_request_key(payload)
+        while key in self.inflight:
+            future = self.inflight[key]
+            self.coalesced[key[0]] = self.coalesced.get(key[0], 0) + 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # NOTE: if the shared request was cancelled (not this caller), send it again
+                if not future.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(f"[SF DEBUG] POST {url}")
+                logging.debug(f"[SF DEBUG] Headers: {sf_headers}")
+                logging.debug(f"[SF DEBUG] Payload: {payload}")
+            async with session.post(url, data=payload, headers=sf_headers) as response:
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug(f"[SF DEBUG] Response status: {response.status}")
+                    logging.debug(f"[SF DEBUG] Response headers: {response.headers}")
+                try:
+                    response.raise_for_status()
+                    body = await response.read()
+                except Exception as e:
+                    text = await response.text()
+                    logging.error(f"[SF DEBUG] Exception: {e}")
+                    logging.error(f"[SF DEBUG] Raw response text: {text}")
+                    raise
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # NOTE: waiters (if any) get the exception; without waiters it must not be reported as unretrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(body)
+            return body
+        finally:
+            del self.inflight[key]
+
+    def flush_coalesced(self):
+        """
+        Return the number of coalesced requests per method since the last call and reset the counters.
+        """
+        coalesced, self.coalesced = self.coalesced, {}
+        return coalesced
+
+    async def close(self):
+        """
+        Close the sessions of all tiers.
+        """
+        for tier in list(self.sessions):
+            session = self.sessions.pop(tier)
+            if not session.closed:
+                await session.close()
+        logging.info('SolidFire API sessions closed (' + str(self.reconnects) + ' reconnects).')
+
+
+def tier_interval(tier):
+    """
+    Return the collection interval (seconds) of a tier.
+    """
+    return {'hi': INT_HI_FREQ, 'med': INT_MED_FREQ, 'lo': INT_LO_FREQ, 'experimental': INT_EXPERIMENTAL_FREQ,
+            'efficiency': INT_LO_FREQ / EFFICIENCY_SLICES}[tier]
+
+
+def cycle_deadline(tier):
+    """
+    Return the time (seconds) the collectors of a tier's cycle may run before they are cancelled.
+    """
+    return round(tier_interval(tier) * CYCLE_DEADLINE_FRACTION, 3)
+
+
+def sf_call_timeout(tier):
+    """
+    Return the timeout (seconds) of a tier's SolidFire API calls, leaving time in the cycle for a retry.
+    """
+    return round(min(SF_CALL_TIMEOUT, cycle_deadline(tier) / 2), 3)
+
+
+def get_sf_client():
+    """
+    Return the global SolidFireClient, creating it on first use.
+    """
+    global SF_CLIENT
+    if SF_CLIENT is None:
+        SF_CLIENT = SolidFireClient()
+    return SF_CLIENT
+
+
+# JSON decoders by name. Each takes the response body as bytes; json detects the encoding of bytes itself and
+# orjson decodes them without an intermediate str
+JSON_CODECS = {'json': json.loads}
+if orjson is not None:
+    JSON_CODECS['orjson'] = orjson.loads
+
+
+def sf_json_loads(body: bytes):
+    """
+    Decode a SolidFire API response body with the SF_JSON_CODEC decoder.
+    """
+    return JSON_CODECS[SF_JSON_CODEC](body)
+
+
+async def sf_response_json(response):
+    """
+    Read a SolidFire API response body and decode it with sf_json_loads().
+    """
+    return sf_json_loads(await response.read())
+
+
+def sf_request_key(payload):
+    """
+    Return the method and canonical (sorted JSON) params of a SolidFire API request payload.
+    """
+    request = json.loads(payload)
+    return request['method'], json.dumps(request.get('params') or {}, sort_keys=True)
+
+
+class SFResponseCache:
+    """
+    SolidFire API response bodies keyed by method and params, shared by all collectors and collection tiers.
+
+    Only methods with a TTL in SF_CACHE_TTL are cached, and only successful responses. Bodies are kept as bytes and
+    decoded for every caller, so collectors can modify what they get. invalidate() drops the entries of a method,
+    e.g. when a collector needs a fresh listing. Hits, misses and invalidations are counted per method.
+    """
+
+    def __init__(self):
+        self.entries = {}  # {(method, params): (expiry time, body)}
+        self.stats = {}
+
+    def key(self, payload):
+        """
+        Return the cache key of a request payload, or None if its method is not cached.
+        """
+        key = sf_request_key(payload)
+        return key if key[0] in SF_CACHE_TTL else None
+
+    def _count(self, method, counter):
+        stats = self.stats.setdefault(method, {'hits': 0, 'misses': 0, 'invalidations': 0})
+        stats[counter] += 1
+
+    def get(self, key):
+        """
+        Return the cached body of a key, or None (a miss) if it is not cached or expired.
+        """
+        if key is None:
+            return None
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._count(key[0], 'hits')
+            return entry[1]
+        self.entries.pop(key, None)
+        self._count(key[0], 'misses')
+        return None
+
+    def put(self, key, body):
+        if key is None:
+            return
+        now = time.monotonic()
+        for k in [k for k, entry in self.entries.items() if entry[0] <= now]:
+            del self.entries[k]
+        self.entries[key] = (now + SF_CACHE_TTL[key[0]], body)
+
+    def invalidate(self, method=None):
+        """
+        Drop the cached responses of a method, or of all methods.
+        """
+        methods = {method} if method is not None else set(self.stats)
+        for k in [k for k in self.entries if method is None or k[0] == method]:
+            methods.add(k[0])
+            del self.entries[k]
+        for m in methods:
+            self._count(m, 'invalidations')
+
+    def flush_stats(self):
+        """
+        Return the counters per method since the last call, with the number and size of cached responses, and
+        reset them.
+        """
+        stats, self.stats = self.stats, {}
+        # NOTE: methods with cached responses are reported even if they were not requested since the last call
+        for k in self.entries:
+            stats.setdefault(k[0], {'hits': 0, 'misses': 0, 'invalidations': 0})
+        for method in stats:
+            bodies = [entry[1] for k, entry in self.entries.items() if k[0] == method]
+            stats[method]['entries'] = len(bodies)
+            stats[method]['bytes'] = sum(len(body) for body in bodies)
+        return stats
+
+
+def get_sf_response_cache():
+    """
+    Return the global SFResponseCache, creating it on first use.
+    """
+    global SF_RESPONSE_CACHE
+    if SF_RESPONSE_CACHE is None:
+        SF_RESPONSE_CACHE = SFResponseCache()
+    return SF_RESPONSE_CACHE
+
+
+class _BytesStream:
+    """
+    Async reader over a response body held in memory, for _json_array_items().
+    """
+
+    def __init__(self, body):
+        self.body = memoryview(body)
+        self.offset = 0
+
+    async def read(self, n):
+        chunk = bytes(self.body[self.offset:self.offset + n])
+        self.offset += len(chunk)
+        return chunk
+
+
 async def sf_api_post(session, url, payload, auth):
     """
     Helper for SolidFire API POST requests with debug logging and required auth.
+
+    Responses of methods with a TTL in SF_CACHE_TTL are served from and added to the SFResponseCache, and
+    identical concurrent requests share one request (see SolidFireClient.fetch()).
+    """
+    cache = get_sf_response_cache()
+    cache_key = cache.key(payload)
+    body = cache.get(cache_key)
+    if body is not None:
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"[SF DEBUG] Cached response for payload: {payload}")
+        return sf_json_loads(body)
+    body = await get_sf_client().fetch(session, url, payload)
+    try:
+        r = sf_json_loads(body)
+    except Exception as e:
+        logging.error(f"[SF DEBUG] Exception: {e}")
+        logging.error(f"[SF DEBUG] Raw response text: {body.decode('utf-8', 'replace')}")
+        raise
+    if 'result' in r:
+        cache.put(cache_key, body)
+    return r
+
+
+async def sf_api_items(session, payload, auth, key):
+    """
+    Async iterator over the elements of the result[key] array (e.g. volumes) of a SolidFire API response.
+
+    With --stream-json, elements are decoded one by one from the response stream as it arrives (see
+    _json_array_items()), so neither the whole body nor the whole object tree is held in memory. Otherwise the
+    response is decoded at once by sf_api_post().
     """
+    if not args.stream_json:
+        r = await sf_api_post(session, SF_POST_URL, payload, auth)
+        for item in r['result'][key]:
+            yield item
+        return
+    cache = get_sf_response_cache()
+    cache_key = cache.key(payload)
+    if cache_key is not None:
+        # NOTE: the body of a cached method is kept anyway, so it is read at once and only decoded incrementally
+        body = cache.get(cache_key)
+        fetched = body is None
+        if fetched:
+            body = await get_sf_client().fetch(session, SF_POST_URL, payload)
+        async for item in _json_array_items(_BytesStream(body), ('result', key)):
+            yield item
+        if fetched:
+            cache.put(cache_key, body)
+        return
     if logging.getLogger().isEnabledFor(logging.DEBUG):
-        logging.debug(f"[SF DEBUG] POST {url}")
-        logging.debug(f"[SF DEBUG] Headers: {sf_headers}")
+        logging.debug(f"[SF DEBUG] POST {SF_POST_URL} (streaming {key})")
         logging.debug(f"[SF DEBUG] Payload: {payload}")
-    async with session.post(url, data=payload, headers=sf_headers) as response:
-        if logging.getLogger().isEnabledFor(logging.DEBUG):
-            logging.debug(f"[SF DEBUG] Response status: {response.status}")
-            logging.debug(f"[SF DEBUG] Response headers: {response.headers}")
+    async with session.post(SF_POST_URL, data=payload, headers=sf_headers) as response:
+        response.raise_for_status()
+        async for item in _json_array_items(response.content, ('result', key)):
+            yield item
+
+
+async def _json_array_items(stream, path):
+    """
+    Incrementally decode a JSON document from an aiohttp stream and yield the elements of the array at path.
+
+    Only the text of the element being decoded is buffered. If the array is not found (e.g. the API returned an
+    error), the document is decoded at once and indexed with path, which raises the same errors as the non-streaming
+    path would.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    i = 0
+    eof = False
+    in_array = False
+
+    async def read_more():
+        nonlocal buf, i, eof
+        chunk = await stream.read(SF_STREAM_READ_SIZE)
+        if not chunk:
+            eof = True
+        # NOTE: the text before the array is kept in case the document has to be decoded at once
+        if in_array:
+            buf, i = buf[i:], 0
+        buf += text_decoder.decode(chunk, final=eof)
+
+    # NOTE: find the array by scanning the document up to it, tracking the keys of the enclosing containers
+    containers = []
+    key = None
+    while True:
+        while i < len(buf) and buf[i] in ' \t\r\n,':
+            i += 1
+        if i == len(buf):
+            if eof:
+                document = json.loads(buf)
+                for k in path:
+                    document = document[k]
+                for item in document:
+                    yield item
+                return
+            await read_more()
+            continue
+        c = buf[i]
+        if c == '"':
+            try:
+                text, end = json.decoder.scanstring(buf, i + 1)
+                while end < len(buf) and buf[end] in ' \t\r\n':
+                    end += 1
+                if end == len(buf):
+                    raise ValueError('incomplete')
+            except ValueError:
+                if eof:
+                    raise
+                await read_more()
+                continue
+            if buf[end] == ':':
+                key, end = text, end + 1
+            i = end
+        elif c in '{[':
+            if c == '[' and len(containers) == len(path) and containers[1:] + [key] == list(path):
+                i += 1
+                in_array = True
+                break
+            containers.append(key)
+            key = None
+            i += 1
+        elif c in '}]':
+            containers.pop()
+            key = None
+            i += 1
+        else:
+            # NOTE: numbers, true, false, null
+            i += 1
+
+    while True:
+        while i < len(buf) and buf[i] in ' \t\r\n,':
+            i += 1
+        if i < len(buf) and buf[i] == ']':
+            break
         try:
-            response.raise_for_status()
-            return await response.json()
-        except aiohttp.ContentTypeError as e:
-            text = await response.text()
-            logging.error(f"[SF DEBUG] ContentTypeError: {e}")
-            logging.error(f"[SF DEBUG] Raw response text: {text}")
-            raise
-        except Exception as e:
-            text = await response.text()
-            logging.error(f"[SF DEBUG] Exception: {e}")
-            logging.error(f"[SF DEBUG] Raw response text: {text}")
-            raise
+            if i == len(buf):
+                raise ValueError('incomplete')
+            item, end = decoder.raw_decode(buf, i)
+            # NOTE: a number at the end of the buffer (e.g. "-2." of "-2.5") may continue in the next chunk
+            if not eof and (end == len(buf) or buf[end] not in ' \t\r\n,]'):
+                raise ValueError('incomplete')
+        except ValueError:
+            if eof:
+                raise
+            await read_more()
+            continue
+        yield item
+        i = end
+        if i > SF_STREAM_READ_SIZE:
+            buf, i = buf[i:], 0
+    # NOTE: read the rest of the document so that the connection can be reused
+    while not eof:
+        await read_more()
 
 
 def get_volume_name_from_cache(volume_id):
@@ -208,122 +885,76 @@ def update_volume_name_cache(volume_mapping):
     logging.debug(f"Volume name cache updated with {len(volume_mapping)} entries at {CACHE_LAST_UPDATED}")
 
 
+async def list_volumes(session, auth):
+    """
+    Async iterator over all active volumes, requested in pages of up to LIST_VOLUMES_PAGE_SIZE volumes.
+
+    Each page is requested when the previous one has been consumed; see sf_api_items() for how pages are decoded.
+    """
+    start_volume_id = 0
+    while True:
+        api_payload = "{ \"method\": \"ListVolumes\", \"params\": {\"volumeStatus\": \"active\", " + \
+            "\"startVolumeID\": " + str(start_volume_id) + ", \"limit\": " + str(LIST_VOLUMES_PAGE_SIZE) + "} }"
+        page_volumes = 0
+        async for volume in sf_api_items(session, api_payload, auth, 'volumes'):
+            page_volumes += 1
+            # NOTE: ListVolumes returns volumes ordered by volume ID
+            start_volume_id = max(start_volume_id, volume['volumeID'] + 1)
+            yield volume
+        if page_volumes < LIST_VOLUMES_PAGE_SIZE:
+            return
+
+
 async def volumes(session, auth, **kwargs):
     """
     Extracts useful volume properties including volume name.
 
     Other SFC functions may use this function to get ID-to-name mapping for volumes.
+
+    Volumes are listed in pages of LIST_VOLUMES_PAGE_SIZE (see list_volumes()) and each page is processed and
+    sent before the next one is requested, so memory use depends on the page size rather than the number of volumes.
+    Without kwargs, returns the number of volumes collected.
     """
     time_start = round(time.time(), 3)
     function_name = 'volumes'
-    volumes = None  # initialize volumes to None
-    # NOTE: the volumeID pair is out of alphanumeric order because it maps to
-    # 'id' which *is* in proper order. We have two sets of tags/fields depending if
-    # the volume is paired
-    tags_non_paired = [
-        ('access',
-         'access'),
-        ('accountID',
-         'account_id'),
-        ('enable512e',
-         'enable_512e'),
-        ('volumeID',
-         'id'),
-        ('name',
-         'name'),
-        ('scsiNAADeviceID',
-         'scsi_naa_dev_id'),
-        ('volumeConsistencyGroupUUID',
-         'vol_cg_group_id')]
-    fields_non_paired = [
-        ('blockSize',
-         'block_size'),
-        ('fifoSize',
-         'fifo_size'),
-        ('minFifoSize',
-         'min_fifo_size'),
-        ('qosPolicyID',
-         'qos_policy_id'),
-        ('totalSize',
-         'total_size')]
-    tags_paired = [
-        ('access',
-         'access'),
-        ('accountID',
-         'account_id'),
-        ('clusterPairID',
-         'cluster_pair_id'),
-        ('enable512e',
-         'enable_512e'),
-        ('volumeID',
-         'id'),
-        ('name',
-         'name'),
-        ('remoteVolumeID',
-         'remote_volume_id'),
-        ('remoteVolumeName',
-         'remote_volume_name'),
-        ('scsiNAADeviceID',
-         'scsi_naa_dev_id'),
-        ('volumeConsistencyGroupUUID',
-         'vol_cg_group_id'),
-        ('volumePairUUID',
-         'volume_pair_uuid')]
-    fields_paired = [
-        ('blockSize',
-         'block_size'),
-        ('fifoSize',
-         'fifo_size'),
-        ('minFifoSize',
-         'min_fifo_size'),
-        ('qosPolicyID',
-         'qos_policy_id'),
-        ('remote_replication_mode',
-         'remote_replication_mode'),
-        ('remote_replication_state',
-         'remote_replication_state'),
-        ('remote_replication_snap_state',
-         'remote_replication_snap_state'),
-        ('totalSize',
-         'total_size')]
-    for t in tags_non_paired:
-        if t[0] in (t[0] for t in fields_non_paired) or [tag[0] for tag in tags_non_paired if tags_non_paired.count(
-                tag) > 1] or [field[0] for field in fields_non_paired if fields_non_paired.count(field) > 1]:
-            logging.critical(
-                "Duplicate metrics found in non-paired volume measurements (tags and fields): " +
-                t[0])
-            exit(200)
-    for t in tags_paired:
-        if t[0] in (t[0] for t in fields_paired) or [tag[0] for tag in tags_paired if tags_paired.count(
-                tag) > 1] or [field[0] for field in fields_paired if fields_paired.count(field) > 1]:
-            logging.critical(
-                "Duplicate metrics found in paired volume measurements (tags and fields): " +
-                t[0])
-            exit(200)
-    
-    # Timing instrumentation - API call
-    api_start = time.time()
-    api_payload = "{ \"method\": \"ListVolumes\", \"params\": {\"volumeStatus\": \"active\"} }"
-    try:
-        r = await sf_api_post(session, SF_POST_URL, api_payload, auth)
-        result = r['result']['volumes']
-        api_time = time.time() - api_start
-        logging.info(f"[TIMING] API call (ListVolumes) took: {api_time:.3f} seconds for {len(result)} volumes")
-    except Exception as e:
-        logging.error('Function volumes: volume information not obtained - returning.')
-        logging.error(e)
-        return
+    if kwargs and kwargs.keys() != {'names'} and kwargs.keys() != {'names_dict'}:
+        logging.error('Invalid argument passed to volumes() function.')
+        return False
+    volumes = [] if 'names' in kwargs else {} if 'names_dict' in kwargs else 0
     if not kwargs:
-        # Timing instrumentation - main processing loop
-        processing_start = time.time()
-        volumes = ''
-        volume_pair_time = 0
-        trident_attr_time = 0
-        string_building_time = 0
-        
-        for volume in result:
+        # NOTE: the full collection refreshes the cached volume list that name lookups of other collectors use
+        get_sf_response_cache().invalidate('ListVolumes')
+    # Timing instrumentation - main processing loop
+    volume_pair_time = 0
+    trident_attr_time = 0
+    string_building_time = 0
+    influx_time = 0
+    lp = LineProtocol()
+    page = []  # (volume ID, name) of the volumes in lp
+
+    async def send_page():
+        nonlocal lp, page, influx_time
+        # Time the InfluxDB write
+        influx_start = time.time()
+        if args.loglevel == 'DEBUG':
+            logging.debug("Volumes payload:\n " + lp.payload() + ".")
+        await lp.send()
+        influx_time += time.time() - influx_start
+        # Update volume name cache page by page (med_freq_tasks)
+        update_volume_name_cache(page)
+        lp = LineProtocol()
+        page = []
+
+    try:
+        async for volume in list_volumes(session, auth):
+            if 'names' in kwargs:
+                volumes.append((volume['volumeID'], volume['name']))
+                continue
+            if 'names_dict' in kwargs:
+                volumes[volume['volumeID']] = volume['name']
+                continue
             volume_start = time.time()
-            single_volume = "volumes,cluster=" + CLUSTER_NAME + ","
+            volume_fields = []
             # NOTE: this needs to be an integer in InfluxDB. None won't work
             if volume['qosPolicyID'] is None:
                 volume['qosPolicyID'] = 0
@@ -361,25 +992,11 @@ async def volumes(session, auth, **kwargs):
                 logging.debug(
                     'Volume replication not enabled for volume ' + str(volume['volumeID']) + '.')
 
+            schema = MEASUREMENT_SCHEMAS['volumes_paired' if volume_paired else 'volumes']
             if volume_paired:
-                tags = tags_paired
-                fields = fields_paired
-            else:
-                tags = tags_non_paired
-                fields = fields_non_paired
-            for tag in tags:
-                k = tag[0]
-                nk = tag[1]
-                val = volume[k]
-                kv = nk + "=" + str(volume[k])
-                if k in [x[0] for x in tags[0:-1]]:
-                    single_volume = single_volume + kv + ","
-                else:
-                    single_volume = single_volume + kv + " "
-                if volume_paired:
-                    if args.loglevel == 'DEBUG':
-                        logging.debug("single_volume tags for volume " +
-                                      str(volume['volumeID']) + ": " + str(single_volume))
+                if args.loglevel == 'DEBUG':
+                    logging.debug("Tags for paired volume " +
+                                  str(volume['volumeID']) + ": " + str([(t[0], volume.get(t[0])) for t in schema.tags]))
 
             # NOTE: this is kind of out of place, but we need to check and add
             # KV if volume has non-empty attributes
@@ -392,8 +1009,8 @@ async def volumes(session, auth, **kwargs):
                     trident_start = time.time()
                     vol_attr_fields = await extract_trident_volume_attributes(volume['attributes'])
                     trident_attr_time += (time.time() - trident_start)
-                    if vol_attr_fields != '':
-                        single_volume = single_volume + vol_attr_fields + ","
+                    if vol_attr_fields:
+                        volume_fields.extend(vol_attr_fields.items())
                         if args.loglevel == 'DEBUG':
                             logging.debug(
                                 'Volume attributes parsed and added:\n ' +
@@ -413,68 +1030,36 @@ async def volumes(session, auth, **kwargs):
                     logging.debug('No attributes found for volume ' +
                                   str(volume['volumeID']) + '.')
 
-            for field in fields:
-                k = field[0]
-                nk = field[1]
-                val = volume[k]
-                val = str(val) + "i"
-                kv = nk + "=" + val
-                if k in [x[0] for x in fields[0:-1]]:
-                    single_volume = single_volume + kv + ","
-                else:
-                    single_volume = single_volume + kv + " "
-                if volume_paired:
-                    if args.loglevel == 'DEBUG':
-                        logging.debug("single_volume tags for volume + " +
-                                      str(volume['volumeID']) + ": " + str(single_volume))
+            schema.add(lp, volume, tags=[('cluster', CLUSTER_NAME)], fields=volume_fields)
+            page.append((volume['volumeID'], volume['name']))
+            volumes += 1
             # Add per-volume string building time
             volume_time = time.time() - volume_start
             string_building_time += volume_time
-            volumes = volumes + single_volume + "\n"
-        
-        processing_time = time.time() - processing_start
-        
-        # Timing summary before InfluxDB write
-        logging.info(f"[TIMING] Volume processing breakdown:")
-        logging.info(f"[TIMING]   - Volume pair extraction: {volume_pair_time:.3f}s")
-        logging.info(f"[TIMING]   - Trident attributes: {trident_attr_time:.3f}s") 
-        logging.info(f"[TIMING]   - String building total: {string_building_time:.3f}s")
-        logging.info(f"[TIMING]   - Total processing: {processing_time:.3f}s")
-        
-        # Time the InfluxDB write
-        influx_start = time.time()
-        await send_to_influx(volumes)
-        influx_time = time.time() - influx_start
-        logging.info(f"[TIMING] InfluxDB write took: {influx_time:.3f} seconds")
-        
-        # Update volume name cache after processing all volumes (med_freq_tasks)
-        volume_cache_data = [(volume['volumeID'], volume['name']) for volume in result]
-        update_volume_name_cache(volume_cache_data)
-        logging.info(f"Updated volume name cache with {len(volume_cache_data)} volume entries")
-        
-    elif kwargs.keys() == {'names'} or kwargs.keys() == {'names_dict'}:
-        # Timing instrumentation - lightweight processing for names only
-        names_start = time.time()
-        for key in kwargs:
-            if key == 'names':
-                volumes = []
-                for volume in result:
-                    volumes.append((volume['volumeID'], volume['name']))
-                names_time = time.time() - names_start
-                logging.info(f"[TIMING] Names extraction took: {names_time:.3f} seconds for {len(volumes)} volumes")
-                return volumes
-            elif key == 'names_dict':
-                volumes_dict = dict(
-                    map(lambda x: (x['volumeID'], x['name']), result))
-                names_time = time.time() - names_start
-                logging.info(f"[TIMING] Names dict extraction took: {names_time:.3f} seconds for {len(volumes_dict)} volumes")
-                return volumes_dict
-    else:
-        logging.error('Invalid argument passed to volumes() function.')
-        return False
+            if len(page) >= LIST_VOLUMES_PAGE_SIZE:
+                await send_page()
+    except Exception as e:
+        logging.error('Function volumes: volume information not obtained - returning.')
+        logging.error(e)
+        return
+    # NOTE: API time includes decoding responses, which happens while volumes are iterated with --stream-json
+    api_time = time.time() - time_start - string_building_time - influx_time
+    logging.info(f"[TIMING] API calls (ListVolumes) took: {api_time:.3f} seconds in pages of up to "
+                 f"{LIST_VOLUMES_PAGE_SIZE} volumes")
+    if kwargs:
+        logging.info(f"[TIMING] Names extraction took: {time.time() - time_start:.3f} seconds for {len(volumes)} volumes")
+        return volumes
+    if page:
+        await send_page()
+
+    # Timing summary
+    logging.info(f"[TIMING] Volume processing breakdown:")
+    logging.info(f"[TIMING]   - Volume pair extraction: {volume_pair_time:.3f}s")
+    logging.info(f"[TIMING]   - Trident attributes: {trident_attr_time:.3f}s")
+    logging.info(f"[TIMING]   - String building total: {string_building_time:.3f}s")
+    logging.info(f"[TIMING] InfluxDB write took: {influx_time:.3f} seconds")
+    logging.info(f"Updated volume name cache with {volumes} volume entries")
     time_taken = max(0.0, round(time.time() - time_start, 3))
-    if args.loglevel == 'DEBUG':
-        logging.debug("Volumes payload:\n " + str(volumes) + ".")
     logging.info('Volumes collected in ' + str(time_taken) + ' seconds.')
     await _send_function_stat(CLUSTER_NAME, function_name, time_taken)
     return volumes
@@ -593,9 +1178,9 @@ async def extract_volume_pair(volume_pairs: list) -> dict:
         return {}
 
 
-async def extract_trident_volume_attributes(vol_attr: dict) -> str:
+async def extract_trident_volume_attributes(vol_attr: dict) -> dict:
     """
-    Extracts volume attributes from the volume dictionary and returns a list of KV strings ready for addition to volume fields.
+    Extracts volume attributes from the volume dictionary and returns a dict of string fields ready for addition to volume fields.
     """
     volume_attributes = [
         ('docker-name', 'va_docker_name'),
@@ -633,10 +1218,10 @@ async def extract_trident_volume_attributes(vol_attr: dict) -> str:
             'Non-Trident attributes found in volume attributes: ' +
             str(vol_attr) +
             '. Skipping.')
-        return ''
+        return {}
     if args.loglevel == 'DEBUG':
         logging.debug('Volume attributes extracted: ' + str(v_attrs_dict) + '.')
-    return (','.join([f'{k}="{v}"' for k, v in v_attrs_dict.items()]))
+    return {k: str(v) for k, v in v_attrs_dict.items()}
 
 
 async def sync_jobs(session, auth):
@@ -650,7 +1235,7 @@ async def sync_jobs(session, auth):
     function_name = 'sync_jobs'
     api_payload = "{ \"method\": \"ListSyncJobs\" }"
     async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+        r = await sf_response_json(response)
     result = r['result']['syncJobs']
     if args.loglevel == 'DEBUG':
         logging.debug('Sync jobs result: ' + str(result) + '.')
@@ -662,65 +1247,25 @@ async def sync_jobs(session, auth):
         # Each has unique tags and fields
         # See https://docs.netapp.com/us-en/element-software/api/reference_element_api_syncjob.html
         # type: one of clone slice block remote
-        tags = [('dstVolumeID', 'dst_volume_id'),
-                ('stage', 'stage'), ('type', 'type')]
-        fields = [
-            ('blocksPerSecond',
-             'blocks_per_sec'),
-            ('elapsedTime',
-             'elapsed_time'),
-            ('percentComplete',
-             'pct_complete'),
-            ('remainingTime',
-             'remaining_time')]
-        sync_jobs = ''
+        lp = LineProtocol()
         for i in result:
             # NOTE: this is a single sync job of 'remote' type. Until we get
             # API examples with real-life data, other types will be discarded
             if i['type'] == 'remote':
-                single_sync_job = "sync_jobs,cluster=" + CLUSTER_NAME + ","
-                for tag in tags:
-                    k = tag[0]
-                    nk = tag[1]
-                    val = i[k]
-                    kv = nk + "=" + str(val)
-                    if k in [x[0] for x in tags[0:-1]]:
-                        single_sync_job = single_sync_job + kv + ","
-                    else:
-                        single_sync_job = single_sync_job + kv + " "
-                for field in fields:
-                    k = field[0]
-                    nk = field[1]
-                    val = i[k]
-                    # NOTE: contrary to the docs, blocks_per_sec seems to be an integer
-                    # https://github.com/NetAppDocs/element-software/issues/204
-                    if nk in ['blocks_per_sec',
-                              'elapsed_time', 'pct_complete']:
-                        val = str(val) + "i"
-                    elif nk == 'remaining_time':
-                        # NOTE: Uhm, yeah. It's possible.
-                        if val is None:
-                            val = "0"
-                    # NOTE: looks like another API documentation bug,
-                    # remaining_time is a float
-                    else:
-                        val = str(val)
-                    kv = nk + "=" + val
-                    if k in [x[0] for x in fields[0:-1]]:
-                        single_sync_job = single_sync_job + kv + ","
-                    else:
-                        single_sync_job = single_sync_job + kv + " "
-                sync_jobs = sync_jobs + single_sync_job + "\n"
+                # NOTE: Uhm, yeah. It's possible.
+                if i['remainingTime'] is None:
+                    i['remainingTime'] = 0.0
+                MEASUREMENT_SCHEMAS['sync_jobs'].add(lp, i, tags=[('cluster', CLUSTER_NAME)])
             else:
                 if args.loglevel == 'DEBUG':
                     logging.debug('Sync job type ' +
                                   str(i['type']) +
                                   ' is not yet supported. You may submit this record to have it considered for inclusion in SFC. Skipping.')
                 logging.info('Skipped sync job: ' + str(i))
-    await send_to_influx(sync_jobs)
-    time_taken = max(0.0, round(time.time() - time_start, 3))
     if args.loglevel == 'DEBUG':
-        logging.debug('Sync jobs payload:\n ' + str(sync_jobs) + '.')
+        logging.debug('Sync jobs payload:\n ' + lp.payload() + '.')
+    await lp.send()
+    time_taken = max(0.0, round(time.time() - time_start, 3))
     logging.info(
         'Sync jobs obtained and sent in ' +
         str(time_taken) +
@@ -729,6 +1274,10 @@ async def sync_jobs(session, auth):
     return
 
 
+# asyncDelay of ListVolumeStats, e.g. "00:00:01.123456" (1.1s), parsed by the per-record path of volume_performance()
+_ASYNC_DELAY_PATTERN = re.compile('\\d{2}:\\d{2}:\\d{2}.\\d{5}')
+
+
 async def volume_performance(session, auth, **kwargs):
     """
     Extract volume stats for additional processing and sends to InfluxDB.
@@ -748,123 +1297,129 @@ async def volume_performance(session, auth, **kwargs):
             'Volume information not obtained from cache or malformed. Returning.')
         logging.error(e)
         return
-    fields = [('actualIOPS', 'actual_iops'),
-              ('averageIOPSize', 'average_io_size'),
-              ('asyncDelay', 'async_delay'),
-              ('burstIOPSCredit', 'burst_io_credit'),
-              ('clientQueueDepth', 'client_queue_depth'),
-              ('latencyUSec', 'latency_usec'),
-              ('nonZeroBlocks', 'non_zero_blocks'),
-              ('normalizedIOPS', 'normalized_iops'),
-              ('readBytes', 'read_bytes'),
-              ('readBytesLastSample', 'read_bytes_last_sample'),
-              ('readLatencyUSec', 'read_latency_usec'),
-              ('readOpsLastSample', 'read_ops_last_sample'),
-              ('throttle', 'throttle'),
-              ('volumeSize', 'volume_size'),
-              ('volumeUtilization', 'volume_utilization'),
-              ('writeBytes', 'write_bytes'),
-              ('writeBytesLastSample', 'write_bytes_last_sample'),
-              ('writeLatencyUSec', 'write_latency_usec'),
-              ('writeOpsLastSample', 'write_ops_last_sample'),
-              ('zeroBlocks', 'zero_blocks')
-              ]
-    if len(all_volumes) > CHUNK_SIZE:
-        if args.loglevel == 'DEBUG':
-            logging.debug('Splitting volumes list with length ' +
-                          str(len(all_volumes)) + ' using chunk size ' + str(CHUNK_SIZE) + '.')
-        volume_lists = await _split_list(all_volumes)
-    else:
-        volume_lists = []
-        volume_lists.append(all_volumes)
-
-    volumes_performance = ''
-    b = 0
-    for volume_batch in volume_lists:
-        if args.loglevel == 'DEBUG':
-            logging.info('Processing volume batch ' + str(b) + ' with ' +
-                         str(len(volume_batch)) + ' volumes.')
+    sizer = get_chunk_sizer('ListVolumeStats')
+    if args.loglevel == 'DEBUG':
+        logging.debug('Splitting volumes list with length ' +
+                      str(len(all_volumes)) + ' using chunk size ' + str(sizer.size) + '.')
+    volume_lists = await _split_list(all_volumes, sizer.size)
+
+    lp = LineProtocol()
+    schema = MEASUREMENT_SCHEMAS['volume_performance']
+    # NOTE: with NumPy, stats of all batches are collected first and encoded as columns (see add_columns())
+    columnar = np is not None and not args.no_columnar
+    stats = []
+    names = []
+    semaphore = asyncio.Semaphore(VOLUME_STATS_CONCURRENCY)
+
+    async def fetch_volume_stats(volume_batch):
         volume_batch_ids = [x[0] for x in volume_batch]
         if args.loglevel == 'DEBUG':
             logging.info("Volume batch IDs:\n" + str(volume_batch_ids) + ".")
         api_payload = "{ \"method\": \"ListVolumeStats\", \"params\": { \"volumeIDs\": " + \
             str(volume_batch_ids) + "}}"
-        async with session.post(SF_POST_URL, data=api_payload) as response:
-            r = await response.json()
-        result = r['result']['volumeStats']
-        # NOTE: we need to convert the asyncDelay from null to integer or parse the string to seconds:int
-        # NOTE: asyncDelay is a string like "00:00:01.123456" (1.1s)
-        async_delay_pattern = re.compile('\\d{2}:\\d{2}:\\d{2}.\\d{5}')
-        for volume in result:
-            if volume['asyncDelay'] is not None:
-                try:
-                    if async_delay_pattern.match(volume['asyncDelay']):
-                        async_delay_tp = datetime.datetime.strptime(
-                            volume['asyncDelay'], "%H:%M:%S.%f")
-                        volume['asyncDelay'] = async_delay_tp.hour * 3600 + \
-                            async_delay_tp.minute * 60 + async_delay_tp.second
-                except TypeError as e:
-                    logging.error(
-                        'Failed to convert asyncDelay text string to seconds (int) for volume ' +
-                        str(
-                            volume['volumeID']) +
-                        '. Problem string: ' +
-                        str(
-                            volume['asyncDelay']) +
-                        '. Setting to -1 to surface in Grafana. Error: ' +
-                        str(e) +
-                        '.')
-                    volume['asyncDelay'] = int(-1)
-            else:
-                if args.loglevel == 'DEBUG':
-                    logging.debug(
-                        'Volume has null asyncDelay. Setting it to -1 for volume ' + str(volume['volumeID']) + '.')
-                volume['asyncDelay'] = -1
+        async with semaphore:
+            call_start = time.time()
+            async with session.post(SF_POST_URL, data=api_payload) as response:
+                body = await response.read()
+                r = sf_json_loads(body)
+            sizer.observe(len(volume_batch), time.time() - call_start, len(body))
+        if 'result' not in r:
+            # NOTE: e.g. a volume deleted since the (possibly cached) volume list was fetched
+            get_sf_response_cache().invalidate('ListVolumes')
+            logging.error('ListVolumeStats failed: ' + str(r.get('error')) + '. Volume list cache invalidated, batch skipped.')
+            # NOTE: skip this batch only, so the other batches are still collected and sent
+            return volume_batch, []
+        return volume_batch, r['result']['volumeStats']
+
+    def encode_columns():
+        global VOLUME_PERFORMANCE_COLUMNS
+        encode_start = time.time()
+        columns = schema.columns(stats)
+        columns['asyncDelay'] = async_delay_seconds([volume['asyncDelay'] for volume in stats])
+        columns['volumeID'] = _np_column([volume['volumeID'] for volume in stats])
+        schema.add_columns(lp, columns, tags=[('cluster', CLUSTER_NAME), ('id', columns['volumeID']), ('name', names)])
+        VOLUME_PERFORMANCE_COLUMNS = columns
+        if args.loglevel == 'DEBUG':
+            logging.debug('Encoded ' + str(len(lp)) + ' volume performance lines from columns in ' +
+                          str(round(time.time() - encode_start, 3)) + ' seconds.')
+
+    # NOTE: up to VOLUME_STATS_CONCURRENCY batches are fetched at a time, and each batch is processed as soon as
+    # its response arrives, while requests for the remaining batches are in flight
+    fetches = [asyncio.ensure_future(fetch_volume_stats(volume_batch)) for volume_batch in volume_lists]
+    try:
+        for b, fetched in enumerate(asyncio.as_completed(fetches)):
+            volume_batch, result = await fetched
             if args.loglevel == 'DEBUG':
-                logging.debug('Processed volume ' +
-                              str(volume['volumeID']) +
-                              '. Data: ' +
-                              str(volume) +
-                              '.')
-        volume_performance = ''
-        for volume in result:
-            volume_line = ''
-            for v in volume_batch:
-                if v[0] == volume['volumeID']:
-                    volume_name = v[1]
-                    kv_list = ''
-                    for field in fields:
-                        k = field[0]
-                        nk = field[1]
-                        val = volume[k]
-                        if isinstance(
-                                val, float) or k == 'throttle' or k == 'volumeUtilization':
-                            val = str(val)
-                        else:
-                            val = str(val) + "i"
-                        if k in [x[0] for x in fields[0:-1]]:
-                            kv = nk + "=" + val + ","
-                        else:
-                            kv = nk + "=" + val + " "
-                        kv_list = kv_list + kv
-                    volume_line = "volume_performance,cluster=" + CLUSTER_NAME + ",id=" + \
-                        str(volume['volumeID']) + ",name=" + \
-                        volume_name + " " + kv_list
-            # NOTE: timestamp for the record will be removed since we will inject one per iteration in send_to_influx()
-            # ts = str(int(round(time.time(), 0)))
-            # volume_performance = volume_performance + volume_line + ts + "\n"
-            volume_performance = volume_performance + volume_line + "\n"
-        b = b + 1
-        volumes_performance = volumes_performance + volume_performance
-    await send_to_influx(volumes_performance)
-    time_taken = max(0.0, round(time.time() - time_start, 3))
+                logging.info('Processing volume batch ' + str(b) + ' with ' +
+                             str(len(volume_batch)) + ' volumes.')
+            batch_names = dict(volume_batch)
+            if columnar:
+                for volume in result:
+                    if volume['volumeID'] in batch_names:
+                        stats.append(volume)
+                        names.append(batch_names[volume['volumeID']])
+                continue
+            # NOTE: we need to convert the asyncDelay from null to integer or parse the string to seconds:int
+            # NOTE: asyncDelay is a string like "00:00:01.123456" (1.1s), see _ASYNC_DELAY_PATTERN
+            for volume in result:
+                if volume['asyncDelay'] is not None:
+                    try:
+                        if _ASYNC_DELAY_PATTERN.match(volume['asyncDelay']):
+                            async_delay_tp = datetime.datetime.strptime(
+                                volume['asyncDelay'], "%H:%M:%S.%f")
+                            volume['asyncDelay'] = async_delay_tp.hour * 3600 + \
+                                async_delay_tp.minute * 60 + async_delay_tp.second
+                    except TypeError as e:
+                        logging.error(
+                            'Failed to convert asyncDelay text string to seconds (int) for volume ' +
+                            str(
+                                volume['volumeID']) +
+                            '. Problem string: ' +
+                            str(
+                                volume['asyncDelay']) +
+                            '. Setting to -1 to surface in Grafana. Error: ' +
+                            str(e) +
+                            '.')
+                        volume['asyncDelay'] = int(-1)
+                else:
+                    if args.loglevel == 'DEBUG':
+                        logging.debug(
+                            'Volume has null asyncDelay. Setting it to -1 for volume ' + str(volume['volumeID']) + '.')
+                    volume['asyncDelay'] = -1
+                if args.loglevel == 'DEBUG':
+                    logging.debug('Processed volume ' +
+                                  str(volume['volumeID']) +
+                                  '. Data: ' +
+                                  str(volume) +
+                                  '.')
+            for volume in result:
+                if volume['volumeID'] not in batch_names:
+                    continue
+                schema.add(lp, volume,
+                           tags=[('cluster', CLUSTER_NAME), ('id', volume['volumeID']),
+                                 ('name', batch_names[volume['volumeID']])])
+    except asyncio.CancelledError:
+        # NOTE: cancelled at the cycle deadline: encode the batches received so far, run_tier_tasks() sends them
+        if stats:
+            encode_columns()
+        raise
+    finally:
+        for fetch in fetches:
+            fetch.cancel()
+        await asyncio.gather(*fetches, return_exceptions=True)
+    if stats:
+        encode_columns()
     if args.loglevel == 'DEBUG':
         logging.debug(
             "Volume performance payload:\n" +
-            str(volumes_performance))
+            lp.payload())
+    await lp.send()
+    chunk_stats = sizer.adjust()
+    time_taken = max(0.0, round(time.time() - time_start, 3))
     logging.info('Volume performance collected in ' +
                  str(time_taken) + ' seconds')
     await _send_function_stat(CLUSTER_NAME, function_name, time_taken)
+    await _send_chunk_stat(CLUSTER_NAME, sizer, chunk_stats)
     return
 
 
@@ -874,10 +1429,9 @@ async def accounts(session, auth):
     """
     time_start = round(time.time(), 3)
     function_name = 'accounts'
-    accounts = ''
+    lp = LineProtocol()
     api_payload = "{ \"method\": \"ListAccounts\" }"
-    async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+    r = await sf_api_post(session, SF_POST_URL, api_payload, auth)
     for account in r['result']['accounts']:
         if (account['enableChap']):
             try:
@@ -888,17 +1442,15 @@ async def accounts(session, auth):
                 # NOTE: if they don't exist, we don't need to remove them
                 logging.warning(
                     "Did not find account (CHAP) secrets to remove from API response" + str(account['accountID']))
-        if len(account['volumes']) > 0:
-            volume_count = str(len(account['volumes']))
-        else:
-            volume_count = "0"
+        volume_count = len(account['volumes'])
         if account['status'] == "active":
-            account_active = "1"
+            account_active = 1
         else:
-            account_active = "0"
-        accounts = accounts + "accounts,cluster=" + CLUSTER_NAME + ",id=" + str(account['accountID']) + ",name=" + str(
-            account['username']) + " " + "active=" + account_active + "i" + ",volume_count=" + volume_count + "i" + "\n"
-    await send_to_influx(accounts)
+            account_active = 0
+        lp.add('accounts', [('cluster', CLUSTER_NAME), ('id', account['accountID']), ('name', account['username'])],
+               [('active', account_active), ('volume_count', volume_count)])
+    accounts = lp.payload()
+    await lp.send()
     time_taken = max(0.0, round(time.time() - time_start, 3))
     if args.loglevel == 'DEBUG':
         logging.debug("Account (tenants) list payload: " + str(accounts))
@@ -908,96 +1460,281 @@ async def accounts(session, auth):
     return accounts
 
 
+class EfficiencyRotation:
+    """
+    Round-robin rotation of account and volume efficiency collection over slices of the account and volume IDs.
+
+    Objects are assigned to slices by ID modulo the number of slices, so slices stay the same when objects are added
+    or deleted. Each tick (see efficiency_tasks()) collects the objects of the current slice (see selects()), and
+    advance() moves to the next slice once both kinds were collected (see complete()), otherwise discard() keeps the
+    slice for the next tick. Objects whose efficiency request failed in a tick (see record()) are collected again
+    in the next tick, along with that tick's slice. A round is complete when every slice has been collected once.
+    The next slice, the round, the number of objects refreshed in the round and the objects to retry are saved to
+    the state file after every tick.
+    """
+
+    KINDS = ('accounts', 'volumes')
+
+    def __init__(self, slices, state_file=None):
+        self.slices = slices
+        self.state_file = state_file
+        self.slice = 0
+        self.round = 1
+        self.refreshed = dict.fromkeys(self.KINDS, 0)  # objects collected in this round
+        self.collected = dict.fromkeys(self.KINDS, 0)  # objects collected in this tick
+        self.recorded = set()  # kinds recorded in this tick
+        self.totals = dict.fromkeys(self.KINDS, 0)  # objects of all slices, as seen in this tick
+        self.retry = {kind: set() for kind in self.KINDS}  # IDs of objects that failed in the previous tick
+        self.failed = {kind: set() for kind in self.KINDS}  # IDs of objects that failed in this tick
+        if not state_file or not os.path.exists(state_file):
+            return
+        try:
+            with open(state_file, 'r') as f:
+                state = json.load(f)
+            if state['slices'] != slices:
+                logging.warning('Efficiency rotation state in ' + state_file + ' is for ' + str(state['slices']) +
+                                ' slices. Starting a new round with ' + str(slices) + ' slices.')
+                return
+            self.slice = state['next_slice'] % slices
+            self.round = state['round']
+            self.refreshed.update(state['refreshed'])
+            for kind, ids in state.get('retry', {}).items():
+                self.retry[kind] = set(ids)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning('Failed to load efficiency rotation state from ' + state_file + ': ' + str(e) +
+                            '. Starting a new round.')
+            return
+        logging.info('Efficiency rotation resumes with slice ' + str(self.slice + 1) + '/' + str(slices) +
+                     ' of round ' + str(self.round) + '.')
+
+    def selects(self, kind, object_id):
+        """
+        Return True if the object belongs to the current slice or failed in the previous tick.
+        """
+        return object_id % self.slices == self.slice or object_id in self.retry[kind]
+
+    def record(self, kind, collected, total, failed=()):
+        """
+        Record the number of objects of a kind collected in this tick, the number of objects in all slices and the
+        IDs of selected objects that were not collected.
+        """
+        self.collected[kind] = collected
+        self.totals[kind] = total
+        self.failed[kind] = set(failed)
+        self.recorded.add(kind)
+
+    def complete(self):
+        """
+        Return True if all kinds were recorded in this tick.
+        """
+        return self.recorded == set(self.KINDS)
+
+    def discard(self):
+        """
+        End a failed tick without moving to the next slice, so the slice is collected again in the next tick.
+        """
+        self.collected = dict.fromkeys(self.KINDS, 0)
+        self.failed = {kind: set() for kind in self.KINDS}
+        self.recorded = set()
+
+    def advance(self):
+        """
+        End the tick: move to the next slice, start a new round after the last slice and save the state.
+
+        Returns the stats of the tick.
+        """
+        for kind in self.KINDS:
+            self.refreshed[kind] += self.collected[kind]
+        tick = {'slice': self.slice, 'round': self.round, 'collected': self.collected,
+                'refreshed': dict(self.refreshed), 'totals': dict(self.totals),
+                'failed': {kind: len(self.failed[kind]) for kind in self.KINDS}}
+        self.collected = dict.fromkeys(self.KINDS, 0)
+        self.retry, self.failed = self.failed, {kind: set() for kind in self.KINDS}
+        self.recorded = set()
+        self.slice = (self.slice + 1) % self.slices
+        if self.slice == 0:
+            logging.info('Efficiency rotation round ' + str(self.round) + ' complete: ' +
+                         ', '.join(str(self.refreshed[kind]) + ' of ' + str(self.totals[kind]) + ' ' + kind
+                                   for kind in self.KINDS) + ' refreshed.')
+            self.round += 1
+            self.refreshed = dict.fromkeys(self.KINDS, 0)
+        self.save()
+        return tick
+
+    def save(self):
+        """
+        Save the next slice, the round and the objects refreshed in the round to the state file (if set).
+        """
+        if not self.state_file:
+            return
+        state = {'slices': self.slices, 'next_slice': self.slice, 'round': self.round, 'refreshed': self.refreshed,
+                 'retry': {kind: sorted(ids) for kind, ids in self.retry.items()}}
+        # NOTE: write a temporary file and rename it, so that a crash cannot leave a truncated state file
+        tmp_file = self.state_file + '.tmp'
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logging.error('Failed to save efficiency rotation state to ' + self.state_file + ': ' + str(e) + '.')
+
+
 async def account_efficiency(session, auth):
     """
     Process account efficiency response from ListAccounts, GetAccountEfficiency and submit to InfluxDB.
+
+    Up to ACCOUNT_EFFICIENCY_CONCURRENCY GetAccountEfficiency requests are in flight at a time. Lines of all accounts
+    are sent as one payload.
     """
     function_name = 'account_efficiency'
     time_start = round(time.time(), 3)
-    account_efficiency = '#account_efficiency\n'
+    lp = LineProtocol()
     api_payload = "{ \"method\": \"ListAccounts\", \"params\": {}}"
-    async with session.post(SF_POST_URL, data=api_payload) as response:
-        if response.status != 200:
-            text = await response.text()
-            logging.error(f"Failed to get accounts. Status: {response.status}, Response: {text}")
-            return
-        try:
-            r = await response.json()
-        except Exception as e:
-            text = await response.text()
-            logging.error(f"Failed to parse JSON. Response text: {text}")
-            return
-        account_id_name_list = []
-        try:
-            for account in r['result']['accounts']:
-                account_id_name_list.append(
-                    (account['accountID'], account['username']))
-        except KeyError:
-            # NOTE: we can't continue without account IDs. Log and return.
-            logging.error(
-                'Account information not obtained - deallocating response and returning.')
-            return
-        finally:
-            del r
-    for account in account_id_name_list:
-        api_payload = "{ \"method\": \"GetAccountEfficiency\", \"params\": { \"accountID\": " + \
-            str(account[0]) + " }}"
-        async with session.post(SF_POST_URL, data=api_payload) as response:
-            r = await response.json()
-        compression = round(r['result']['compression'], 2)
-        deduplication = round(r['result']['deduplication'], 2)
-        thin_provisioning = round(r['result']['thinProvisioning'], 2)
-        storage_efficiency = round((compression * deduplication), 2)
-        account_id_efficiency = "account_efficiency,cluster=" + CLUSTER_NAME + ",id=" + str(account[0]) + ",name=" + str(account[1]) + " " + "compression=" + str(
-            compression) + ",deduplication=" + str(deduplication) + ",storage_efficiency=" + str(storage_efficiency) + ",thin_provisioning=" + str(thin_provisioning) + "\n"
-        account_efficiency = account_efficiency + account_id_efficiency
+    try:
+        # NOTE: the account list is usually served from the response cache filled by accounts()
+        r = await sf_api_post(session, SF_POST_URL, api_payload, auth)
+    except Exception as e:
+        logging.error(f"Failed to get accounts: {e}")
+        return
+    account_id_name_list = []
+    try:
+        for account in r['result']['accounts']:
+            account_id_name_list.append(
+                (account['accountID'], account['username']))
+    except KeyError:
+        # NOTE: we can't continue without account IDs. Log and return.
+        logging.error(
+            'Account information not obtained - deallocating response and returning.')
+        return
+    finally:
+        del r
+    rotation = EFFICIENCY_ROTATION
+    accounts_total = len(account_id_name_list)
+    if rotation is not None:
+        account_id_name_list = [account for account in account_id_name_list
+                                if rotation.selects('accounts', account[0])]
+    account_iter = iter(account_id_name_list)
+    failed = []
+
+    async def fetch_account_efficiency():
+        # NOTE: workers share the iterator, so every account is requested once
+        for account in account_iter:
+            api_payload = "{ \"method\": \"GetAccountEfficiency\", \"params\": { \"accountID\": " + \
+                str(account[0]) + " }}"
+            async with session.post(SF_POST_URL, data=api_payload) as response:
+                r = await sf_response_json(response)
+            if 'result' not in r:
+                # NOTE: e.g. an account deleted since the (possibly cached) account list was fetched
+                failed.append(account[0])
+                logging.warning('GetAccountEfficiency failed for account ' + str(account[0]) + ': ' +
+                                str(r.get('error')) + '.')
+                continue
+            compression = round(r['result']['compression'], 2)
+            deduplication = round(r['result']['deduplication'], 2)
+            thin_provisioning = round(r['result']['thinProvisioning'], 2)
+            storage_efficiency = round((compression * deduplication), 2)
+            lp.add('account_efficiency', [('cluster', CLUSTER_NAME), ('id', account[0]), ('name', account[1])],
+                   [('compression', float(compression)), ('deduplication', float(deduplication)),
+                    ('storage_efficiency', float(storage_efficiency)),
+                    ('thin_provisioning', float(thin_provisioning))])
+
+    workers = [asyncio.ensure_future(fetch_account_efficiency())
+               for _ in range(min(ACCOUNT_EFFICIENCY_CONCURRENCY, len(account_id_name_list)))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    if rotation is not None:
+        # NOTE: accounts whose request failed are collected again in the next tick
+        rotation.record('accounts', len(lp), accounts_total, failed)
     time_taken = max(0.0, round(time.time() - time_start, 3))
-    logging.info('Account efficiency collected in ' +
+    logging.info('Account efficiency of ' + str(len(lp)) + ' accounts collected in ' +
                  str(time_taken) + ' seconds.')
     if args.loglevel == 'DEBUG':
         logging.debug(
             "Account efficiency payload:\n" +
-            str(account_efficiency))
+            lp.payload())
     await _send_function_stat(CLUSTER_NAME, function_name, time_taken)
-    await send_to_influx(account_efficiency)
+    await lp.send()
     return
 
 
 async def volume_efficiency(session, auth):
     """
     Use ListVolumes, GetVolumeEfficiency to gather volume efficiency and submit to InfluxDB.
+
+    Up to VOLUME_EFFICIENCY_CONCURRENCY GetVolumeEfficiency requests are in flight at a time. Lines are sent in
+    payloads of up to INFLUX_WRITE_MAX_LINES lines, one line per volume.
     """
     function_name = 'volume_efficiency'
-    volume_efficiency = "#volume_efficiency\n"
     time_start = round(time.time(), 3)
-    api_payload = "{ \"method\": \"ListVolumes\", \"params\": {}}"
-    async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
-        volume_id_name_list = []
-        for volume in r['result']['volumes']:
+    volume_id_name_list = []
+    try:
+        # NOTE: the volume list is usually served from the response cache filled by volumes()
+        async for volume in list_volumes(session, auth):
             volume_id_name_list.append((volume['volumeID'], volume['name']))
-    short_lists = await _split_list(volume_id_name_list)
-    for short_list in short_lists:
-        for volume in short_list:
+    except Exception as e:
+        # NOTE: the tick is not recorded, so the rotation collects this slice again in the next tick
+        logging.error('Volume information not obtained: ' + str(e) + ' - returning.')
+        return
+    rotation = EFFICIENCY_ROTATION
+    volumes_total = len(volume_id_name_list)
+    if rotation is not None:
+        volume_id_name_list = [volume for volume in volume_id_name_list if rotation.selects('volumes', volume[0])]
+    lp = LineProtocol()
+    failed = []
+    written = 0
+    volume_iter = iter(volume_id_name_list)
+
+    async def fetch_volume_efficiency():
+        nonlocal lp, written
+        # NOTE: workers share the iterator, so every volume is requested once
+        for volume in volume_iter:
             api_payload = "{ \"method\": \"GetVolumeEfficiency\", \"params\": { \"volumeID\": " + \
                 str(volume[0]) + " }}"
             async with session.post(SF_POST_URL, data=api_payload) as response:
-                r = await response.json()
-                compression = round(r['result']['compression'], 2)
-                deduplication = round(r['result']['deduplication'], 2)
-                storage_efficiency = round(
-                    r['result']['deduplication'] * r['result']['compression'], 2)
-                thin_provisioning = round(r['result']['thinProvisioning'], 2)
-                volume_id_efficiency = "volume_efficiency,cluster=" + CLUSTER_NAME + ",id=" + str(volume[0]) + ",name=" + str(volume[1]) + " " + "compression=" + str(
-                    compression) + ",deduplication=" + str(deduplication) + ",storage_efficiency=" + str(storage_efficiency) + ",thin_provisioning=" + str(thin_provisioning) + "\n"
-                volume_efficiency = volume_efficiency + volume_id_efficiency
-                await send_to_influx(volume_efficiency)
+                r = await sf_response_json(response)
+            if 'result' not in r:
+                # NOTE: e.g. a volume deleted since the (possibly cached) volume list was fetched
+                failed.append(volume[0])
+                logging.warning('GetVolumeEfficiency failed for volume ' + str(volume[0]) + ': ' +
+                                str(r.get('error')) + '.')
+                continue
+            compression = round(r['result']['compression'], 2)
+            deduplication = round(r['result']['deduplication'], 2)
+            storage_efficiency = round(
+                r['result']['deduplication'] * r['result']['compression'], 2)
+            thin_provisioning = round(r['result']['thinProvisioning'], 2)
+            lp.add('volume_efficiency', [('cluster', CLUSTER_NAME), ('id', volume[0]), ('name', volume[1])],
+                   [('compression', float(compression)), ('deduplication', float(deduplication)),
+                    ('storage_efficiency', float(storage_efficiency)),
+                    ('thin_provisioning', float(thin_provisioning))])
+            if len(lp) >= INFLUX_WRITE_MAX_LINES:
+                full_lp, lp = lp, LineProtocol()
+                written += len(full_lp)
+                await full_lp.send()
+
+    workers = [asyncio.ensure_future(fetch_volume_efficiency())
+               for _ in range(min(VOLUME_EFFICIENCY_CONCURRENCY, len(volume_id_name_list)))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    if args.loglevel == 'DEBUG':
+        logging.debug("Volume efficiency payload: " + lp.payload())
+    written += len(lp)
+    await lp.send()
+    if rotation is not None:
+        # NOTE: volumes whose request failed are collected again in the next tick
+        rotation.record('volumes', written, volumes_total, failed)
 
     time_taken = max(0.0, round(time.time() - time_start, 3))
-    if args.loglevel == 'DEBUG':
-        logging.debug("Volume efficiency payload: " + str(volume_efficiency))
-    logging.info('Volume efficiency collected in ' +
-                 str(time_taken) + ' seconds.')
+    logging.info('Volume efficiency of ' + str(written) + ' volumes collected in ' + str(time_taken) + ' seconds (' +
+                 str(len(failed)) + ' requests failed).')
     await _send_function_stat(CLUSTER_NAME, function_name, time_taken)
     return
 
@@ -1010,21 +1747,19 @@ async def cluster_faults(session, auth):
     function_name = 'cluster_faults'
     api_payload = "{ \"method\": \"ListClusterFaults\" }"
     async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+        r = await sf_response_json(response)
     group = {'bestPractices': 0, 'error': 0, 'critical': 0, 'warning': 0}
     for fault in r['result']['faults']:
         if fault['severity'] in group and fault['resolved'] is False:
             group[fault['severity']] += 1
-    if group['critical'] > 0 or group['error'] > 0 or group['warning'] > 0 or group['bestPractices'] > 0:
-        faults_total = str(
-            group['critical'] + group['error'] + group['warning'] + group['bestPractices'])
-        cluster_faults = "cluster_faults,cluster=" + CLUSTER_NAME + ",total=" + faults_total + " " + "critical=" + str(group['critical']) + "i" + ",error=" + str(
-            group['error']) + "i" + ",warning=" + str(group['warning']) + "i" + ",bestPractices=" + str(group['bestPractices']) + "i" + "\n"
-    else:
-        cluster_faults = "cluster_faults,cluster=" + CLUSTER_NAME + \
-            ",total=0 critical=0i,error=0i,warning=0i,bestPractices=0i" + "\n"
+    faults_total = group['critical'] + group['error'] + group['warning'] + group['bestPractices']
+    lp = LineProtocol()
+    lp.add('cluster_faults', [('cluster', CLUSTER_NAME), ('total', faults_total)],
+           [('critical', group['critical']), ('error', group['error']), ('warning', group['warning']),
+            ('bestPractices', group['bestPractices'])])
+    cluster_faults = lp.payload()
     time_taken = max(0.0, round(time.time() - time_start, 3))
-    await send_to_influx(cluster_faults)
+    await lp.send()
     logging.info('Cluster faults gathered in ' + str(time_taken) + ' seconds.')
     if args.loglevel == 'DEBUG':
         logging.debug("Cluster faults payload: " + str(cluster_faults))
@@ -1035,129 +1770,101 @@ async def cluster_faults(session, auth):
 async def volume_qos_histograms(session, auth):
     """
     Get ListVolumeQoSHistograms results, extract, transform and send to InfluxDB.
+
+    Volume names come from the volume name cache filled by volumes(). Depending on QOS_HISTOGRAM_OUTPUT, raw bucket
+    counts and/or percentile summaries (see qos_histogram_summary()) of all volumes are sent, in payloads of up to
+    INFLUX_WRITE_MAX_LINES lines and about INFLUX_WRITE_MAX_BYTES bytes.
     """
     # NOTE: https://docs.influxdata.com/influxdb/v1/query_language/functions/#histogram (maybe for version 3 as well)
-    # NOTE: It is resource-intensive so delay it a bit to avoid executing concurrently with other functions
-    sleep_delay = random.randint(5, 10)
-    await asyncio.sleep(sleep_delay)
     time_start = round(time.time(), 3)
     function_name = 'volume_qos_histograms'
     if not args.experimental:
         logging.warning('QoS histograms are not enabled. Returning...')
         return
-    volumes_dict = None
-    try:
-        volumes_dict = await volumes(session, auth, names_dict=True)
-        isinstance(volumes_dict, dict)
+    if not VOLUME_NAME_CACHE:
+        # NOTE: volumes() has not run yet; fill the name cache from the (cached) volume list
+        try:
+            update_volume_name_cache(await volumes(session, auth, names_dict=True))
+        except Exception as e:
+            logging.error('Volume information not returned by volumes function or response malformed: ' + str(e))
+            return
+    summary = QOS_HISTOGRAM_OUTPUT != 'buckets' and np is not None
+    buckets = QOS_HISTOGRAM_OUTPUT != 'summary' or np is None
+    lp = LineProtocol()
+    lp_bytes = 0
+    histograms = 0
+    volume_ids = []
+    volume_names = []
+    counts = {histogram_type: [] for histogram_type, _, _ in QOS_HISTOGRAMS}
+
+    async def send_if_full(lines):
+        nonlocal lp, lp_bytes
+        lp_bytes += sum(len(line) + 1 for line in lines)
+        if len(lp) >= INFLUX_WRITE_MAX_LINES or lp_bytes >= INFLUX_WRITE_MAX_BYTES:
+            await lp.send()
+            lp = LineProtocol()
+            lp_bytes = 0
+
+    def summarize():
+        summary_start = time.time()
+        columns = {'volumeID': _np_column(volume_ids)}
+        for histogram_type, _, _ in QOS_HISTOGRAMS:
+            stats = qos_histogram_summary(counts[histogram_type], *QOS_HISTOGRAM_BOUNDS[histogram_type])
+            for stat in QOS_HISTOGRAM_STATS:
+                columns[histogram_type + '_' + stat] = stats[stat]
+        lines = MEASUREMENT_SCHEMAS['qos_histogram_summary'].encode_columns(
+            columns, tags=[('cluster', CLUSTER_NAME), ('name', volume_names)], timestamp=lp.timestamp)
         if args.loglevel == 'DEBUG':
-            logging.debug('ID-volume KV pairs obtained from volumes: ' +
-                          str(len(volumes_dict)) + ' pairs.')
-    except Exception as e:
-        logging.error(
-            'Volume information not returned by volumes function or response malformed:' + str(volumes_dict))
-        logging.error(e)
-        return
+            logging.debug('Summarized QoS histograms of ' + str(len(volume_ids)) + ' volumes in ' +
+                          str(round(time.time() - summary_start, 3)) + ' seconds.')
+        return lines
+
     api_payload = "{ \"method\": \"ListVolumeQoSHistograms\" }"
-    async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
-        result = r['result']['qosHistograms']
-    qosh_list = await _split_list(result)
-    for qosh_batch in qosh_list:
-        for hg in qosh_batch:
-            vol_id_name = (hg['volumeID'], volumes_dict[hg['volumeID']])
-            await qos_histogram_processor(hg, vin=vol_id_name)
+    try:
+        # NOTE: histograms are processed one by one as they are decoded (see sf_api_items())
+        async for hg in sf_api_items(session, api_payload, auth, 'qosHistograms'):
+            vol_id_name = (hg['volumeID'], get_volume_name_from_cache(hg['volumeID']))
+            histograms += 1
+            if summary:
+                # NOTE: bucket counts of all volumes are kept (flat, a row per volume) and summarized at once
+                volume_ids.append(vol_id_name[0])
+                volume_names.append(vol_id_name[1])
+                for histogram_type, _, histogram_buckets in QOS_HISTOGRAMS:
+                    histogram = hg['histograms'].get(histogram_type) or {}
+                    counts[histogram_type].extend(histogram.get(key) or 0 for key, _ in histogram_buckets)
+            if buckets:
+                await send_if_full(qos_histogram_processor(lp, hg, vin=vol_id_name))
+    except asyncio.CancelledError:
+        # NOTE: cancelled at the cycle deadline: summarize the volumes received so far, run_tier_tasks() sends them
+        if volume_ids:
+            lp.add_lines(summarize())
+        raise
+    if volume_ids:
+        for line in summarize():
+            lp.add_lines((line,))
+            await send_if_full((line,))
+    await lp.send()
     time_taken = max(0.0, round(time.time() - time_start, 3))
-    logging.info('Volume QoS histograms collected in ' +
+    logging.info('Volume QoS histograms of ' + str(histograms) + ' volumes collected in ' +
                  str(time_taken) + ' seconds.')
     await _send_function_stat(CLUSTER_NAME, function_name, time_taken)
-    await send_to_influx("sfc_metrics,cluster=" + CLUSTER_NAME + ",function=volume_qos_histograms" + " " + "time_taken=" + str(time_taken) + "\n")
     return
 
 
-async def qos_histogram_processor(hg, **kwargs):
-    """
-    Process QoS histogram output from volume_qos_histograms function and send to InfluxDB.
-    """
-    # histogram_types = ['belowMinIopsPercentages', 'minToMaxIopsPercentages', 'readBlockSizes', 'targetUtilizationPercentages', 'throttlePercentages', 'writeBlockSizes']
-    histogram_types = [('belowMinIopsPercentages', 'below_min_iops_percentages'),
-                       ('minToMaxIopsPercentages', 'min_to_max_iops_percentages'),
-                       ('readBlockSizes', 'read_block_sizes'),
-                       ('targetUtilizationPercentages',
-                        'target_utilization_percentage'),
-                       ('throttlePercentages', 'throttle_percentages'),
-                       ('writeBlockSizes', 'write_block_sizes')
-                       ]
-    belowMinIopsPercentages = [('Bucket1To19', 'b_01_to_19'),
-                               ('Bucket20To39', 'b_20_to_39'),
-                               ('Bucket40To59', 'b_40_to_59'),
-                               ('Bucket60To79', 'b_60_to_79'),
-                               ('Bucket80To100', 'b_80_to_100')
-                               ]
-    minToMaxIopsPercentages = [('Bucket1To19', 'b_001_to_019'),
-                               ('Bucket20To39', 'b_020_to_039'),
-                               ('Bucket40To59', 'b_040_to_059'),
-                               ('Bucket60To79', 'b_060_to_079'),
-                               ('Bucket80To100', 'b_080_to_100'),
-                               ('Bucket101Plus', 'b_101_plus')
-                               ]
-    readBlockSizes = [('Bucket512To4095', 'b_000512_to_004095'),
-                      ('Bucket4096To8191', 'b_004096_to_008191'),
-                      ('Bucket8192To16383', 'b_008192_to_016383'),
-                      ('Bucket16384To32767', 'b_016384_to_032767'),
-                      ('Bucket32768To65535', 'b_032768_to_65535'),
-                      ('Bucket65536To131071', 'b_065536_to_131071'),
-                      ('Bucket131072Plus', 'b_131072_plus')
-                      ]
-    targetUtilizationPercentages = [('Bucket0', 'b_000'),
-                                    ('Bucket1To19', 'b_001_to_019'),
-                                    ('Bucket20To39', 'b_020_to_039'),
-                                    ('Bucket40To59', 'b_040_to_059'),
-                                    ('Bucket60To79', 'b_060_079'),
-                                    ('Bucket80To100', 'b_080_to_100'),
-                                    ('Bucket101Plus', 'b_101_plus')
-                                    ]
-    throttlePercentages = [('Bucket0', 'b_00'),
-                           ('Bucket1To19', 'b_00_to_19'),
-                           ('Bucket20To39', 'b_20_to_30'),
-                           ('Bucket40To59', 'b_40_to_59'),
-                           ('Bucket60To79', 'b_60_to_79'),
-                           ('Bucket80To100', 'b_80_to_100')
-                           ]
-    writeBlockSizes = [('Bucket512To4095', 'b_000512_to_004095'),
-                       ('Bucket4096To8191', 'b_004096_to_008191'),
-                       ('Bucket8192To16383', 'b_008192_to_016383'),
-                       ('Bucket16384To32767', 'b_016384_to_032767'),
-                       ('Bucket32768To65535', 'b_032768_to_65535'),
-                       ('Bucket65536To131071', 'b_065536_to_131071'),
-                       ('Bucket131072Plus', 'b_131072_plus')
-                       ]
-    hg_names = (belowMinIopsPercentages, minToMaxIopsPercentages, readBlockSizes,
-                targetUtilizationPercentages, throttlePercentages, writeBlockSizes)
+def qos_histogram_processor(lp, hg, **kwargs) -> list:
+    """
+    Add the QoS histogram lines of a volume from volume_qos_histograms function to lp and return the added lines.
+    """
     vol_id_name = kwargs['vin']
-    n = 0
-    volume_payload = ''
-    volume_kvs_string = ''
-    for bucket_tuple, histogram_type in zip(hg_names, hg['histograms']):
-        volume_kvs_string = "histogram_" + \
-            histogram_types[n][1] + ",cluster=" + \
-            CLUSTER_NAME + ",name=" + vol_id_name[1] + " "
-        kv_pair = ''
-        for orig_bucket_name, sfc_bucket_name in bucket_tuple:
-            kv_pair = kv_pair + sfc_bucket_name + '=' + \
-                str(hg['histograms'][histogram_type]
-                    [orig_bucket_name]) + 'i' + ','
-        volume_kvs_string = volume_kvs_string + kv_pair + \
-            'id=' + str(vol_id_name[0]) + 'i' + '\n'
-        volume_kvs_string = volume_kvs_string[:-1]
-        if args.loglevel == 'DEBUG':
-            logging.debug("QoS histogram records (n=" + str(n) + ") for volume " +
-                          str(vol_id_name[0]) + ":\n" + str(volume_kvs_string))
-        volume_payload = volume_payload + volume_kvs_string + "\n"
-        n = n + 1
-    await send_to_influx(volume_payload)
-    logging.debug("Sent QoS histogram records for volume " +
-                  str(vol_id_name[0]) + ". Data:\n" + str(volume_kvs_string))
-    return
+    lines = len(lp)
+    for histogram_type, _, _ in QOS_HISTOGRAMS:
+        MEASUREMENT_SCHEMAS[histogram_type].add(lp, hg['histograms'][histogram_type],
+                                                tags=[('cluster', CLUSTER_NAME), ('name', vol_id_name[1])],
+                                                fields=[('id', vol_id_name[0])])
+    if args.loglevel == 'DEBUG':
+        logging.debug("Processed QoS histogram records for volume " +
+                      str(vol_id_name[0]) + ". Data:\n" + '\n'.join(lp.lines[lines:]))
+    return lp.lines[lines:]
 
 
 async def node_performance(session, auth):
@@ -1168,10 +1875,8 @@ async def node_performance(session, auth):
     function_name = 'node_performance'
     api_payload = "{ \"method\": \"ListNodeStats\" }"
     async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+        r = await sf_response_json(response)
     result = r['result']['nodeStats']['nodes']
-    metrics = [("cpu", "cpu"), ("networkUtilizationCluster", "network_utilization_cluster"),
-               ("networkUtilizationStorage", "network_utilization_storage")]
     load_histogram_metrics = [
         ("Bucket0",
          "bucket_00_00"),
@@ -1185,39 +1890,14 @@ async def node_performance(session, auth):
          "bucket_60_to_79"),
         ("Bucket80To100",
          "bucket_80_to_100")]
-    node_performance = ''
+    lp = LineProtocol()
     for node in result:
-        metric_details = ''
-        for key in load_histogram_metrics:
-            key_string = key[1]
-            val = node['ssLoadHistogram'][key[0]]
-            if isinstance(val, int):
-                str_val = str(val) + "i"
-            else:
-                str_val = str(val)
-            metric_detail = key_string + "=" + str_val + ","
-        record = len(metrics)
-        n = 0
-        for key in metrics:
-            key_string = key[1]
-            val = node[key[0]]
-            if isinstance(val, int):
-                str_val = str(val) + "i"
-            else:
-                pass
-            if n < (record - 1):
-                metric_detail = key_string + "=" + str_val + ","
-            else:
-                metric_detail = key_string + "=" + str_val
-            n += 1
-            metric_details = metric_details + metric_detail
-        node_performance = node_performance + \
-            ("node_performance,cluster=" + CLUSTER_NAME + ",id=" +
-             str(node['nodeID']) + " " + metric_details + "\n")
-    await send_to_influx(node_performance)
-    time_taken = max(0.0, round(time.time() - time_start, 3))
+        # NOTE: load_histogram_metrics (ssLoadHistogram) are not sent for now
+        MEASUREMENT_SCHEMAS['node_performance'].add(lp, node, tags=[('cluster', CLUSTER_NAME), ('id', node['nodeID'])])
     if args.loglevel == 'DEBUG':
-        logging.debug("Node stats: " + str(node_performance))
+        logging.debug("Node stats: " + lp.payload())
+    await lp.send()
+    time_taken = max(0.0, round(time.time() - time_start, 3))
     logging.info('Node stats collected in ' + str(time_taken) + ' seconds.')
     await _send_function_stat(CLUSTER_NAME, function_name, time_taken)
     return
@@ -1232,99 +1912,34 @@ async def iscsi_sessions(session, auth):
     function_name = 'iscsi_sessions'
     time_start = round(time.time(), 3)
     api_payload = "{ \"method\": \"ListISCSISessions\" }"
-    async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
-    result = r['result']['sessions']
-    fields = [
-        ("accountID", "account_id"),
-        ("accountName", "account_name"),
-        ("initiatorIP", "initiator_ip"),
-        ("initiatorName", "initiator_name"),
-        ("initiatorSessionID", "initiator_session_id"),
-        ("nodeID", "node_id"),
-        ("targetIP", "target_ip"),
-        ("targetName", "target_name"),
-        ("virtualNetworkID", "virtual_network_id"),
-        ("volumeID", "volume_id")
-    ]
-    metrics = [
-        ("msSinceLastIscsiPDU", "ms_since_last_iscsi_pdu"),
-        ("msSinceLastScsiCommand", "ms_since_last_scsi_command"),
-        ("serviceID", "service_id"),
-        ("sessionID", "session_id"),
-        ("volumeInstance", "volume_instance")
-    ]
-    iscsi_session_number = len(result)
-    if result != []:
-        iscsi_sessions = ''
-        for session in result:
-            metric_details = ''
-            record = len(metrics)
-            field_details = ''
-            field_detail = ''
-            if session['initiator'] is None:
-                session['initiator'] = {'alias': 'None', 'initiatorID': 'None'}
-            field_details = "initiator_alias=" + \
-                session['initiator']['alias'] + "," + "initiator_id=" + \
-                str(session['initiator']['initiatorID']) + ","
-            if session['authentication']['authMethod'] is None:
-                session['authentication']['authMethod'] = "None"
-            if session['authentication']['chapAlgorithm'] == "null":
-                session['authentication']['chapAlgorithm'] = "None"
-            if session['authentication']['chapUsername'] == "null":
-                session['authentication']['chapUsername'] = "None"
-            field_details = field_details + "auth_method=" + str(session['authentication']['authMethod']) + "," + "chap_algorithm=" + str(
-                session['authentication']['chapAlgorithm']) + "," + "chap_username=" + str(session['authentication']['chapUsername']) + ","
-            if session['accountName'] is None or len(
-                    session['accountName']) == 0:
-                session['accountName'] = "None"
-            f = 0
-            record_fields = len(fields)
-            for key in fields:
-                key_string = key[1]
-                val = session[key[0]]
-                str_val = str(val)
-                if f < (record_fields - 1):
-                    if str_val is not None:
-                        field_detail = key_string + "=" + str_val + ","
-                    else:
-                        field_detail = key_string + "=" + "None" + ","
-                else:
-                    if str_val is not None:
-                        field_detail = key_string + "=" + str_val
-                    else:
-                        field_detail = key_string + "=" + "None"
-                field_details = field_details + field_detail
-                f += 1
-            m = 0
-            metric_detail = ''
-            for key in metrics:
-                key_string = key[1]
-                val = session[key[0]]
-                str_val = None  # Ensure str_val is always defined
-                if isinstance(val, str):
-                    str_val = val
-                elif isinstance(val, int):
-                    str_val = str(val) + "i"
-                else:
-                    str_val = "None"
-                if m < (record - 1):
-                    if str_val is not None:
-                        metric_detail = key_string + "=" + str_val + ","
-                else:
-                    if str_val is not None:
-                        metric_detail = key_string + "=" + str_val
-                metric_details = metric_details + metric_detail
-                m += 1
-            iscsi_sessions = iscsi_sessions + \
-                ("iscsi_sessions,cluster=" + CLUSTER_NAME + "," +
-                 field_details + " " + metric_details + "\n")
+    iscsi_session_number = 0
+    lp = LineProtocol()
+    async for iscsi_session in sf_api_items(session, api_payload, auth, 'sessions'):
+        iscsi_session_number += 1
+        if iscsi_session['initiator'] is None:
+            iscsi_session['initiator'] = {'alias': 'None', 'initiatorID': 'None'}
+        if iscsi_session['authentication']['authMethod'] is None:
+            iscsi_session['authentication']['authMethod'] = "None"
+        if iscsi_session['authentication']['chapAlgorithm'] == "null":
+            iscsi_session['authentication']['chapAlgorithm'] = "None"
+        if iscsi_session['authentication']['chapUsername'] == "null":
+            iscsi_session['authentication']['chapUsername'] = "None"
+        if iscsi_session['accountName'] is None or len(
+                iscsi_session['accountName']) == 0:
+            iscsi_session['accountName'] = "None"
+        iscsi_session['initiator_alias'] = iscsi_session['initiator']['alias']
+        iscsi_session['initiator_id'] = iscsi_session['initiator']['initiatorID']
+        iscsi_session['auth_method'] = iscsi_session['authentication']['authMethod']
+        iscsi_session['chap_algorithm'] = iscsi_session['authentication']['chapAlgorithm']
+        iscsi_session['chap_username'] = iscsi_session['authentication']['chapUsername']
+        MEASUREMENT_SCHEMAS['iscsi_sessions'].add(lp, iscsi_session, tags=[('cluster', CLUSTER_NAME)])
+    if iscsi_session_number > 0:
         if args.loglevel == 'DEBUG':
-            logging.debug("iSCSI sessions payload: " + str(iscsi_sessions))
+            logging.debug("iSCSI sessions payload: " + lp.payload())
         time_taken = max(0.0, round(time.time() - time_start, 3))
         logging.info('iSCSI sessions collected. Sending to InfluxDB information about ' + str(iscsi_session_number) +
                      ' sessions from one or more clients. Time taken: ' + str(time_taken) + ' seconds.')
-        await send_to_influx(iscsi_sessions)
+        await lp.send()
     else:
         logging.info(
             'iSCSI sessions collected. It appears there are no iSCSI connections. No payload to send to InfluxDB.')
@@ -1341,41 +1956,11 @@ async def cluster_performance(session, auth):
     time_start = round(time.time(), 3)
     api_payload = "{ \"method\": \"GetClusterStats\" }"
     async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+        r = await sf_response_json(response)
     result = r['result']['clusterStats']
-    metrics = [("actualIOPS", "actual_iops"),
-               ("averageIOPSize", "average_iops"),
-               ("clientQueueDepth", "client_queue_depth"),
-               ("clusterUtilization", "cluster_utilization"),
-               ("latencyUSec", "latency_usec"),
-               ("normalizedIOPS", "normalized_iops"),
-               ("readBytesLastSample", "read_bytes_last_sample"),
-               ("readLatencyUSec", "read_latency_usec"),
-               ("readOpsLastSample", "read_ops_last_sample"),
-               ("writeLatencyUSec", "write_latency_usec"),
-               ("writeBytesLastSample", "write_bytes_last_sample"),
-               ("writeOpsLastSample", "write_ops_last_sample")
-               ]
-    metric_details = ''
-    record = len(metrics)
-    n = 0
-    for key in metrics:
-        key_string = key[1]
-        val = result[key[0]]
-        if isinstance(val, int):
-            str_val = str(val) + "i"
-        elif isinstance(val, float) or key[0] == "clusterUtilization":
-            str_val = str(round(val, 2))
-        else:
-            str_val = str(val) + "i"
-        if n < (record - 1):
-            metric_detail = key_string + "=" + str_val + ","
-        else:
-            metric_detail = key_string + "=" + str_val
-        n += 1
-        metric_details = metric_details + metric_detail
-    cluster_performance = ("cluster_performance,name=" +
-                           CLUSTER_NAME + " " + metric_details + "\n")
+    lp = LineProtocol()
+    MEASUREMENT_SCHEMAS['cluster_performance'].add(lp, result, tags=[('name', CLUSTER_NAME)])
+    cluster_performance = lp.payload()
     time_taken = max(0.0, round(time.time() - time_start, 3))
     logging.info('Cluster performance collected in ' +
                  str(time_taken) + ' seconds.')
@@ -1383,7 +1968,7 @@ async def cluster_performance(session, auth):
         logging.debug("Cluster performance payload: " +
                       str(cluster_performance))
     await _send_function_stat(CLUSTER_NAME, function_name, time_taken)
-    await send_to_influx(cluster_performance)
+    await lp.send()
     return
 
 
@@ -1396,41 +1981,9 @@ async def cluster_capacity(session, auth):
     time_start = round(time.time(), 3)
     api_payload = "{ \"method\": \"GetClusterCapacity\" }"
     async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+        r = await sf_response_json(response)
         result = r['result']['clusterCapacity']
-        cluster_capacity = ""
         # NOTE: CLUSTER_NAME is a tag, everything else is field data
-        # NOTE: thinFactor and storageEfficiency here are SFC-derived metrics
-        # and NOT part of SolidFire's GetClusterCapacity API response
-        fields = [('activeBlockSpace', 'active_block_space'),
-                  ('activeSessions', 'active_sessions'),
-                  ('averageIOPS', 'average_iops'),
-                  ('clusterRecentIOSize', 'cluster_recent_io_size'),
-                  ('compressionFactor', 'compressioN_factor'),
-                  ('currentIOPS', 'current_iops'),
-                  ('dedupeFactor', 'dedupe_factor'),
-                  ('storageEfficiency', 'storage_efficiency'),
-                  ('maxIOPS', 'max_iops'),
-                  ('maxOverProvisionableSpace', 'max_overprovisionable_space'),
-                  ('maxProvisionedSpace', 'max_provisioned_space'),
-                  ('maxUsedMetadataSpace', 'max_used_metadata_space'),
-                  ('maxUsedSpace', 'max_used_space'),
-                  ('nonZeroBlocks', 'non_zero_blocks'),
-                  ('peakActiveSessions', 'peak_active_sessions'),
-                  ('peakIOPS', 'peak_iops'),
-                  ('provisionedSpace', 'provisioned_space'),
-                  ('snapshotNonZeroBlocks', 'snapshot_non_zero_blocks'),
-                  ('thinFactor', 'thin_factor'),
-                  ('totalOps', 'total_ops'),
-                  ('uniqueBlocks', 'unique_blocks'),
-                  ('uniqueBlocksUsedSpace', 'unique_block_space'),
-                  ('usedMetadataSpace', 'used_block_space'),
-                  ('usedMetadataSpaceInSnapshots',
-                   'used_metadata_space_in_snapshots'),
-                  ('usedSpace', 'used_space'),
-                  ('zeroBlocks', 'zero_blocks')
-                  ]
-        metric_details = 'cluster_capacity,name=' + CLUSTER_NAME + ' '
         # NOTE: Thin SFC-derived metric is the ratio of non-zero blocks to the
         # total number of blocks.
         if result['nonZeroBlocks'] != 0:
@@ -1459,27 +2012,13 @@ async def cluster_capacity(session, auth):
         # in DB or dashboards
         result['storageEfficiency'] = round(
             result['dedupeFactor'] * result['compressionFactor'], 2)
-        record = len(fields)
-        r = 0
-        for item in fields:
-            key = item[1]
-            val = result[item[0]]
-            if isinstance(val, int):
-                str_val = str(val) + "i"
-            else:
-                str_val = str(val)
-            if r < (record - 1):
-                metric_detail = key + "=" + str_val + ","
-            else:
-                metric_detail = key + "=" + str_val
-            r += 1
-            metric_details = metric_details + metric_detail
-        cluster_capacity = cluster_capacity + metric_details + "\n"
+        lp = LineProtocol()
+        MEASUREMENT_SCHEMAS['cluster_capacity'].add(lp, result, tags=[('name', CLUSTER_NAME)])
         if args.loglevel == 'DEBUG':
-            logging.debug("Cluster capacity payload: " + str(cluster_capacity))
+            logging.debug("Cluster capacity payload: " + lp.payload())
         logging.info(
             'Cluster capacity names collected. Sending to InfluxDB next.')
-        await send_to_influx(cluster_capacity)
+        await lp.send()
     time_taken = max(0.0, round(time.time() - time_start, 3))
     logging.info('Cluster capacity collected in ' +
                  str(time_taken) + ' seconds.')
@@ -1495,16 +2034,18 @@ async def cluster_version(session, auth):
     time_start = round(time.time(), 3)
     api_payload = "{ \"method\": \"GetClusterVersionInfo\" }"
     async with session.post(SF_URL + SF_JSON_PATH, data=api_payload) as response:
-        r = await response.json(content_type=None)
+        r = await sf_response_json(response)
         result = r['result']
-        api_version = str(result['clusterAPIVersion'])
+        # NOTE: api_version is a float field (e.g. 12.5)
+        api_version = float(result['clusterAPIVersion'])
         version = str(result['clusterVersion'])
-        payload = ("cluster_version,name=" + CLUSTER_NAME + ",version=" +
-                   str(version) + " " + "api_version=" + str(api_version) + "\n")
-    await send_to_influx(payload)
+        lp = LineProtocol()
+        lp.add('cluster_version', [('name', CLUSTER_NAME), ('version', version)], [('api_version', api_version)])
+    if args.loglevel == 'DEBUG':
+        logging.debug("Cluster version payload: " + lp.payload())
+    await lp.send()
     time_taken = max(0.0, round(time.time() - time_start, 3))
     if args.loglevel == 'DEBUG':
-        logging.debug("Cluster version payload: " + str(payload))
         logging.debug('Cluster version info collected in ' +
                       str(time_taken) + ' seconds.')
     await _send_function_stat(CLUSTER_NAME, function_name, time_taken)
@@ -1519,11 +2060,11 @@ async def drive_stats(session, auth):
     time_start = round(time.time(), 3)
     api_payload = "{ \"method\": \"ListDriveStats\" }"
     async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+        r = await sf_response_json(response)
         result = r['result']['driveStats']
-        payload = "# DriveStats\n"
+        lp = LineProtocol()
         for drive in result:
-            drive_id = str(drive['driveID'])
+            drive_id = drive['driveID']
             pop_list = ['driveID', 'failedDieCount', 'lifetimeReadBytes',
                         'lifetimeWriteBytes', 'procTimestamp', 'readBytes',
                         'readMsec', 'readOps', 'readSectors', 'reads',
@@ -1535,26 +2076,10 @@ async def drive_stats(session, auth):
                         ]
             for key in pop_list:
                 drive.pop(key)
-            metric_details = ''
-            record = len(drive)
-            n = 0
-            for key in drive:
-                val = drive[key]
-                if isinstance(val, int):
-                    str_val = str(val) + "i"
-                else:
-                    str_val = str(val)
-                if n < (record - 1):
-                    metric_detail = key + "=" + str_val + ","
-                else:
-                    metric_detail = key + "=" + str_val
-                n += 1
-                metric_details = metric_details + metric_detail
-            payload = payload + ("drive_stats,cluster=" + CLUSTER_NAME +
-                                 ",id=" + drive_id + " " + metric_details + "\n")
+            lp.add('drive_stats', [('cluster', CLUSTER_NAME), ('id', drive_id)], drive)
         if args.loglevel == 'DEBUG':
-            logging.debug("Drive stats: " + str(payload))
-        await send_to_influx(payload)
+            logging.debug("Drive stats: " + lp.payload())
+        await lp.send()
     time_taken = max(0.0, round(time.time() - time_start, 3))
     if args.loglevel == 'DEBUG':
         logging.debug(
@@ -1577,15 +2102,14 @@ async def schedules(session, auth):
     time_start = round(time.time(), 3)
     api_payload = "{ \"method\": \"ListSchedules\" }"
     async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+        r = await sf_response_json(response)
         if args.loglevel == 'DEBUG':
             logging.debug("Schedules response:\n" + str(r))
     result = r['result']['schedules']
     if args.loglevel == 'DEBUG':
         logging.debug("Processing schedules:\n" + str(result))
 
-    payload = ''
-    payload_header = "schedules,cluster=" + CLUSTER_NAME + ","
+    lp = LineProtocol()
     for schedule in result:
         if schedule['scheduleType'] == 'Snapshot':
             # NOTE: `volumeID` appears if for single-volume snapshot schedules while `volumes` appears in multi-volume (group) snapshot schedules!
@@ -1658,61 +2182,42 @@ async def schedules(session, auth):
                     schedule[key] = 1
                 else:
                     schedule[key] = 0
-            # NOTE: process tags
-            tags = ''
-            for tag in schedule_tags[0:-1]:
-                tag_key = tag[1]
+            # NOTE: process tags. Tags that are in neither schedule nor scheduleInfo are left out
+            schedule_info = schedule.get('scheduleInfo') or {}
+            tags = [('cluster', CLUSTER_NAME)]
+            for tag in schedule_tags:
                 if tag[0] in schedule:
-                    tag_val = schedule[tag[0]]
-                tags = tags + tag_key + "=" + str(tag_val) + ","
-            for tag in schedule_tags[-1:]:
-                tag_key = tag[1]
-                tag_val = schedule[tag[0]]
-                tags = tags + tag_key + "=" + str(tag_val) + ""
-            fields = ' '
+                    tags.append((tag[1], schedule[tag[0]]))
+                elif tag[0] in schedule_info:
+                    tags.append((tag[1], schedule_info[tag[0]]))
+            fields = []
             for field in schedule_fields:
                 field_val = None  # Ensure field_val is always initialized
                 if field[0] in schedule:
                     field_val = schedule[field[0]]
-                    if isinstance(field_val, str):
-                        field_val = "\"" + str(field_val) + "\""
-                elif 'scheduleInfo' in schedule and schedule['scheduleInfo'] is not None and schedule['scheduleInfo'] != {}:
-                    try:
-                        if field[0] in schedule['scheduleInfo'].keys():
-                            field_val = schedule['scheduleInfo'][field[0]]
-                            if isinstance(field_val, str):
-                                field_val = "\"" + str(field_val) + "\""
-                        else:
-                            if field[0] == 'name' and 'name' not in schedule['scheduleInfo']:
-                                schedule['scheduleInfo']['name'] = "auto-by-SolidFire"
-                                field_val = schedule['scheduleInfo']['name']
-                                if isinstance(field_val, str):
-                                    field_val = "\"" + str(field_val) + "\""
-                    except BaseException:
-                        field_val = None
+                elif schedule_info != {}:
+                    if field[0] in schedule_info.keys():
+                        field_val = schedule_info[field[0]]
+                    elif field[0] == 'name':
+                        schedule_info['name'] = "auto-by-SolidFire"
+                        field_val = schedule_info['name']
                 else:
                     if args.loglevel == 'DEBUG':
                         logging.debug("Field not in schedule or scheduleINFO: " +
                                       str(field[0]) + " is type: " + str(type(field_val)))
-                    field_val = None
-                if next((i for i, t in enumerate(schedule_fields)
-                        if t[0] == field[0]), None) == len(schedule_fields) - 1:
-                    fields = fields + field[1] + "=" + str(field_val) + " "
-                else:
-                    fields = fields + field[1] + "=" + str(field_val) + ","
-            snapshot_payload = payload_header + tags + fields + "\n"
-            payload = payload + snapshot_payload
+                fields.append((field[1], field_val))
+            lp.add('schedules', tags, fields)
         else:
             logging.info("Unsupported schedule type observed.")
 
     time_taken = max(0.0, round(time.time() - time_start, 3))
     if args.loglevel == 'DEBUG':
-        logging.debug("Schedules:\n" + str(payload))
+        logging.debug("Schedules:\n" + lp.payload())
         logging.debug('Schedules collected in ' +
                       str(time_taken) + ' seconds.')
     # If there are no schedules, payload will be empty and no data will be sent to InfluxDB
-    if payload != '':
-        await send_to_influx(payload)
+    if len(lp) > 0:
+        await lp.send()
     else:
         logging.info(
             'Schedules collected. It appears there are no snapshot schedules. No payload to send to InfluxDB.')
@@ -1732,7 +2237,7 @@ async def snapshot_groups(session, auth):
     time_start = round(time.time(), 3)
     api_payload = "{ \"method\": \"ListGroupSnapshots\" }"
     async with session.post(SF_POST_URL, data=api_payload) as response:
-        r = await response.json()
+        r = await sf_response_json(response)
         if args.loglevel == 'DEBUG':
             logging.debug("Group snapshots response:\n" + str(r))
     result = r['result']['groupSnapshots']
@@ -1757,8 +2262,7 @@ async def snapshot_groups(session, auth):
                    ('members', 'members')]
     snap_pop = ['attributes']
     result = sorted(result, key=lambda k: k['groupSnapshotID'])
-    payload = ''
-    payload_header = "snapshot_groups,cluster=" + CLUSTER_NAME + ","
+    lp = LineProtocol()
     for snapshot in result:
         # NOTE: process time values to save disk space
         snap_epoch_sec = (0, 0)  # Ensure snap_epoch_sec is always defined
@@ -1816,7 +2320,7 @@ async def snapshot_groups(session, auth):
                                       str(snapshot['remoteStatus']) +
                                       " so setting it to 0.")
                     snapshot['remoteStatus'] = 0
-        tags = ''
+        tags = [('cluster', CLUSTER_NAME)]
         for tag in snap_tags:
             tag_key = tag[1]
             if tag[0] in snapshot:
@@ -1849,11 +2353,8 @@ async def snapshot_groups(session, auth):
                                   " does NOT exist in schedule or scheduleInfo: " +
                                   str(tag[0]))
                 tag_val = "0"
-            if tag == snap_tags[-1]:
-                tags = tags + tag_key + "=" + str(tag_val) + ""
-            else:
-                tags = tags + tag_key + "=" + str(tag_val) + ","
-        fields = ' '
+            tags.append((tag_key, tag_val))
+        fields = []
         for field in snap_fields:
             field_val = 0
             if field[0] in snapshot:  # if scheduleInfo does not exist, use the schedule object
@@ -1871,24 +2372,15 @@ async def snapshot_groups(session, auth):
                     except BaseException:
                         field_val = "0"
             # else: field_val remains as initialized above
-            field_key = field[1]
-            if isinstance(field_val, str):
-                field_val = "\"" + str(field_val) + "\""
-            elif isinstance(field_val, int):
-                field_val = str(field_val) + "i"
-            if field == snap_fields[-1]:
-                fields = fields + field_key + "=" + field_val + ""
-            else:
-                fields = fields + field_key + "=" + field_val + ","
-        snapshot_payload = payload_header + tags + fields + "\n"
-        payload = payload + snapshot_payload
+            fields.append((field[1], field_val))
+        lp.add('snapshot_groups', tags, fields)
 
     time_taken = max(0.0, round(time.time() - time_start, 3))
     logging.info('Snapshots collected in ' + str(time_taken) + ' seconds.')
     if args.loglevel == 'DEBUG':
-        logging.debug("Snapshots:\n" + str(payload))
-    if payload != '':
-        await send_to_influx(payload)
+        logging.debug("Snapshots:\n" + lp.payload())
+    if len(lp) > 0:
+        await lp.send()
     else:
         logging.info(
             'Snapshots collected. It appears there are no group snapshots. No payload to send to InfluxDB.')
@@ -1907,23 +2399,18 @@ async def list_database():
         'Content-Type': 'application/json'
     }
     
-    # Create SSL context if TLS CA is specified
-    ssl_context = None
-    if os.environ.get('INFLUXDB3_TLS_CA'):
-        ssl_context = ssl.create_default_context(cafile=os.environ.get('INFLUXDB3_TLS_CA'))
-    
-    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context)) as session:
-        async with session.get(url, headers=headers) as r:
-            if r.status == 200:
-                data = await r.json()
-                # The response format is [{"iox::database":"_internal"},{"iox::database":"sfc"}]
-                dbs = [db["iox::database"] for db in data]
-                logging.info(f'Available databases: {dbs}')
-                return dbs
-            else:
-                text = await r.text()
-                logging.error(f"Failed to list databases. Status: {r.status}, Response: {text}")
-                return []
+    session = await get_influx_writer().get_session()
+    async with session.get(url, headers=headers) as r:
+        if r.status == 200:
+            data = await r.json()
+            # The response format is [{"iox::database":"_internal"},{"iox::database":"sfc"}]
+            dbs = [db["iox::database"] for db in data]
+            logging.info(f'Available databases: {dbs}')
+            return dbs
+        else:
+            text = await r.text()
+            logging.error(f"Failed to list databases. Status: {r.status}, Response: {text}")
+            return []
 
 
 async def create_database_v3(INFLUX_DB):
@@ -1965,31 +2452,26 @@ async def create_database_v3(INFLUX_DB):
                 'Content-Type': 'application/json'
             }
             
-            # Create SSL context if TLS CA is specified
-            ssl_context = None
-            if os.environ.get('INFLUXDB3_TLS_CA'):
-                ssl_context = ssl.create_default_context(cafile=os.environ.get('INFLUXDB3_TLS_CA'))
-            
             logging.info(f"Attempt {attempt}/{max_retries}: Attempting to create database '{INFLUX_DB}' using InfluxDB3 API")
             
             try:
-                async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context)) as session:
-                    async with session.post(url, headers=headers, json=payload) as r:
-                        if r.status == 201:
-                            logging.info(f"Database '{INFLUX_DB}' created successfully")
-                            return True
-                        elif r.status == 409:
-                            logging.info(f"Database '{INFLUX_DB}' already exists")
-                            return True
+                session = await get_influx_writer().get_session()
+                async with session.post(url, headers=headers, json=payload) as r:
+                    if r.status == 201:
+                        logging.info(f"Database '{INFLUX_DB}' created successfully")
+                        return True
+                    elif r.status == 409:
+                        logging.info(f"Database '{INFLUX_DB}' already exists")
+                        return True
+                    else:
+                        response_text = await r.text()
+                        if attempt < max_retries:
+                            logging.warning(f"Attempt {attempt}/{max_retries}: Failed to create database '{INFLUX_DB}'. Status: {r.status}, Response: {response_text}. Retrying in {retry_delay} seconds...")
+                            await asyncio.sleep(retry_delay)
+                            continue
                         else:
-                            response_text = await r.text()
-                            if attempt < max_retries:
-                                logging.warning(f"Attempt {attempt}/{max_retries}: Failed to create database '{INFLUX_DB}'. Status: {r.status}, Response: {response_text}. Retrying in {retry_delay} seconds...")
-                                await asyncio.sleep(retry_delay)
-                                continue
-                            else:
-                                logging.error(f"Failed to create database '{INFLUX_DB}' after {max_retries} attempts. Status: {r.status}, Response: {response_text}")
-                                return False
+                            logging.error(f"Failed to create database '{INFLUX_DB}' after {max_retries} attempts. Status: {r.status}, Response: {response_text}")
+                            return False
             except Exception as e:
                 if attempt < max_retries:
                     logging.warning(f"Attempt {attempt}/{max_retries}: Exception while connecting to InfluxDB: {e}. Retrying in {retry_delay} seconds...")
@@ -2011,133 +2493,1324 @@ async def create_database_v3(INFLUX_DB):
     return False
 
 
-async def send_to_influx(payload):
+def influx_ssl_context():
     """
-    Send received payload to InfluxDB 3 over HTTPS.
+    Build SSL context for HTTPS connections to InfluxDB, using INFLUXDB3_TLS_CA if set.
     """
-    global CURRENT_TIMESTAMP
-    
-    original_lines = payload.splitlines()
-    payload_lines = len(original_lines)
-    if args.loglevel == 'DEBUG':
-        logging.debug('send_to_influx() received payload data with ' + str(payload_lines) + ' lines.')
-    # If "measurement" is '' or null, we cannot send data to InfluxDB, so error out, print payload, and return False
-    # Extract measurement name from the first line
-    first_line = payload.splitlines()[0] if payload else ''
-    measurement = first_line.split(",", 1)[0] if first_line else ''
-    if measurement is None or measurement == '':
-        logging.error('Measurement is empty or null. Cannot send data to InfluxDB.')
-        logging.error('Payload:\n' + str(payload))
-        return False
-    # If payload is 0 lines, we cannot send data to InfluxDB, so error out, print payload, and return False
-    if payload is None or payload == '' or payload.count('\n') == 0:
-        logging.error('Payload is empty or has no lines. Cannot send data to InfluxDB.')
-        logging.error('Payload:\n' + str(payload))
-        return False
-    # Strip trailing space from any misformatted lines, if any
-    stripped_lines = [line.rstrip() for line in original_lines]
-    payload_stripped = '\n'.join(stripped_lines)
-    # Ensure no lines were removed - compare line count before and after stripping
-    if len(original_lines) != len(stripped_lines):
-        logging.error('We have fewer lines after stripping trailing spaces. This may indicate mishandling.')
-        logging.error('Original payload had ' + str(len(original_lines)) + ' lines.')
-        logging.error('Stripped payload has ' + str(len(stripped_lines)) + ' lines.')
-        logging.error('Payload with stripped lines:\n' + payload_stripped)
-        return False
-    # Optionally, diff the payloads and log if there are changes
-    if args.loglevel == 'DEBUG' and payload != payload_stripped:
-        import difflib
-        diff = list(difflib.unified_diff(
-            payload.splitlines(),
-            payload_stripped.splitlines(),
-            fromfile='original',
-            tofile='stripped',
-            lineterm=''
-        ))
-        if diff:
-            logging.debug('Diff between original and stripped payload:\n' + '\n'.join(diff))
-        else:
-            logging.debug('No differences found between original and stripped payload.')
-    
-    # Inject timestamp to each line if CURRENT_TIMESTAMP is set
-    if CURRENT_TIMESTAMP is not None:
-        import re
-        import datetime
-        timestamped_lines = []
-        for line in stripped_lines:
-            if line.strip():  # Skip empty lines
-                # Check if line already has a timestamp at the end (space followed by digits)
-                # Pattern matches space followed by 10+ digits (typical Unix timestamp)
-                timestamp_pattern = r'\s+\d{10,}$'
-                if re.search(timestamp_pattern, line):
-                    # Replace existing timestamp with CURRENT_TIMESTAMP
-                    timestamped_line = re.sub(timestamp_pattern, ' ' + str(CURRENT_TIMESTAMP), line)
-                else:
-                    # Add timestamp (space + timestamp) to end of line
-                    timestamped_line = line.rstrip() + " " + str(CURRENT_TIMESTAMP)
-                timestamped_lines.append(timestamped_line)
-        payload = '\n'.join(timestamped_lines)
-        # Log the timestamp being used
-        iso_timestamp = datetime.datetime.fromtimestamp(CURRENT_TIMESTAMP, tz=datetime.timezone.utc).isoformat()
-        logging.info(f'Using iteration timestamp: {CURRENT_TIMESTAMP} ({iso_timestamp}) for {payload_lines} lines')
-    else:
-        payload = payload_stripped
-    
-    # Configure SSL context for HTTPS connections to InfluxDB
-    ssl_context = None
     ca_cert_path = os.environ.get('INFLUXDB3_TLS_CA')
     if ca_cert_path and os.path.exists(ca_cert_path):
-        import ssl
-        ssl_context = ssl.create_default_context(cafile=ca_cert_path)
         logging.debug(f'Using CA certificate file for InfluxDB connection: {ca_cert_path}')
-    else:
-        import ssl
-        ssl_context = ssl.create_default_context()
-        logging.debug('Using default SSL context for InfluxDB connection')
-    
-    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context)) as session:
+        return ssl.create_default_context(cafile=ca_cert_path)
+    logging.debug('Using default SSL context for InfluxDB connection')
+    return ssl.create_default_context()
+
+
+def build_influx_connector(ssl_context):
+    # NOTE: unlike SolidFire connectors, this one is long-lived: keep-alive
+    # connections and cached DNS lookups are reused by all InfluxDB writes
+    kwargs = {
+        'ssl': ssl_context,
+        'limit': INFLUX_POOL_SIZE,
+        'keepalive_timeout': INFLUX_KEEPALIVE_TIMEOUT,
+        'use_dns_cache': True,
+        'ttl_dns_cache': INFLUX_DNS_TTL,
+    }
+    if sys.version_info < (3, 15):
+        kwargs['enable_cleanup_closed'] = True
+    return aiohttp.TCPConnector(**kwargs)
+
+
+class InfluxWriter:
+    """
+    Long-lived InfluxDB 3 writer created once by main().
+
+    Holds one ClientSession with a keep-alive connection pool, the SSL context
+    (built once from INFLUXDB3_TLS_CA) and a DNS cache, so that writes reuse
+    established TLS connections instead of doing a handshake per measurement.
+
+    Payloads from all collectors are coalesced in a buffer (see submit()) and
+    sent in a few large write_lp requests per collection cycle. Full buffers
+    are put on a bounded queue drained by INFLUX_WRITE_WORKERS writer tasks,
+    so collectors do not wait for InfluxDB unless the queue is full.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.ssl_context = None
+        self.writes = 0
+        self.failures = 0
+        self.buffer = []
+        self.buffer_lines = 0
+        self.buffer_bytes = 0
+        self.buffer_since = None
+        self.linger_task = None
+        self.stats = self._new_stats()
+        self.spool = None
+        self.replay_task = None
+        self.closing = False
+        self.queue = asyncio.Queue(maxsize=INFLUX_WRITE_QUEUE_SIZE)
+        self.workers = []
+
+    @staticmethod
+    def _new_stats():
+        return {'flushes': 0, 'flush_failures': 0, 'lines': 0, 'bytes': 0, 'flush_time': 0.0,
+                'flush_time_max': 0.0, 'linger_time_max': 0.0,
+                'reason_bytes': 0, 'reason_lines': 0, 'reason_linger': 0, 'reason_cycle': 0,
+                'raw_bytes': 0, 'sent_bytes': 0, 'gzip_writes': 0, 'gzip_time': 0.0,
+                'queue_wait': 0.0, 'queue_wait_max': 0.0, 'queue_depth_max': 0, 'queue_dropped': 0,
+                'queue_spilled': 0, 'attempts': 0, 'retries': 0, 'attempt_time': 0.0, 'attempt_time_max': 0.0,
+                'partial_writes': 0, 'rejected_lines': 0}
+
+    async def submit(self, payload, lines):
+        """
+        Add a timestamped payload with `lines` lines to the write buffer and flush if a threshold is reached.
+        """
+        if INFLUX_WRITE_LINGER <= 0:
+            self.buffer.append(payload)
+            self.buffer_lines += lines
+            self.buffer_bytes += len(payload)
+            self.buffer_since = time.time()
+            return await self.flush('cycle')
+        if not self.buffer:
+            self.buffer_since = time.time()
+        self.buffer.append(payload)
+        self.buffer_lines += lines
+        self.buffer_bytes += len(payload)
+        if self.buffer_bytes >= INFLUX_WRITE_MAX_BYTES:
+            return await self.flush('bytes')
+        if self.buffer_lines >= INFLUX_WRITE_MAX_LINES:
+            return await self.flush('lines')
+        if self.linger_task is None or self.linger_task.done():
+            self.linger_task = asyncio.create_task(self._linger_flush())
+        return True
+
+    async def _linger_flush(self):
+        await asyncio.sleep(INFLUX_WRITE_LINGER)
+        # NOTE: clear the handle first so that submit() can arm a new timer while we flush
+        self.linger_task = None
+        if self.buffer:
+            await self.flush('linger')
+
+    async def flush(self, reason='cycle'):
+        """
+        Move everything buffered so far to the write queue as one batch. Returns True if the batch was accepted.
+        """
+        if not self.buffer:
+            return True
+        now = time.time()
+        batch = ('\n'.join(self.buffer), self.buffer_lines, self.buffer_bytes, now)
+        self.stats['reason_' + reason] += 1
+        self.stats['linger_time_max'] = max(self.stats['linger_time_max'], now - self.buffer_since)
+        self.buffer = []
+        self.buffer_lines = 0
+        self.buffer_bytes = 0
+        self.buffer_since = None
+        return await self._enqueue(batch)
+
+    async def _enqueue(self, batch):
+        """
+        Put a batch on the bounded write queue, applying INFLUX_WRITE_QUEUE_POLICY when the queue is full.
+        """
+        self._start_workers()
+        if self.queue.full():
+            if INFLUX_WRITE_QUEUE_POLICY == 'drop-oldest':
+                dropped = self.queue.get_nowait()
+                self.queue.task_done()
+                self.stats['queue_dropped'] += 1
+                logging.warning('InfluxDB write queue is full. Dropped oldest batch of ' + str(dropped[1]) +
+                                ' lines queued ' + str(round(time.time() - dropped[3], 3)) + ' seconds ago.')
+            elif INFLUX_WRITE_QUEUE_POLICY == 'spill' and self.spool is not None:
+                self.spool.append(batch[0])
+                self.stats['queue_spilled'] += 1
+                return True
+        # NOTE: with the 'block' policy this waits (and holds up the collector) until a writer frees a slot
+        try:
+            await self.queue.put(batch)
+        except asyncio.CancelledError:
+            # NOTE: e.g. a collector cancelled at the cycle deadline: return the batch to the buffer, so that the next
+            # flush (at the latest _flush_writes() at the end of the cycle) sends it
+            self.buffer.insert(0, batch[0])
+            self.buffer_lines += batch[1]
+            self.buffer_bytes += batch[2]
+            self.buffer_since = min(self.buffer_since or batch[3], batch[3])
+            raise
+        self.stats['queue_depth_max'] = max(self.stats['queue_depth_max'], self.queue.qsize())
+        return True
+
+    def _start_workers(self):
+        self.workers = [w for w in self.workers if not w.done()]
+        while len(self.workers) < INFLUX_WRITE_WORKERS:
+            self.workers.append(asyncio.create_task(self._writer_loop()))
+
+    async def _writer_loop(self):
+        while True:
+            batch = await self.queue.get()
+            try:
+                await self._send(*batch)
+            except Exception as e:
+                logging.error('Unhandled exception in InfluxDB writer: ' + str(e))
+            finally:
+                self.queue.task_done()
+
+    async def _send(self, body, lines, size, enqueued):
+        """
+        Write one dequeued batch, spooling it if the write fails with a transient error.
+        """
+        send_start = time.time()
+        status = await self.write(body, ','.join(_payload_measurements(body)))
+        ok = status == 204
+        if ok:
+            self.replay_spool()
+        elif self.spool is not None and _is_transient_write_failure(status):
+            self.spool.append(body)
+        flush_time = time.time() - send_start
+        st = self.stats
+        st['flushes'] += 1
+        st['lines'] += lines
+        st['bytes'] += size
+        st['flush_time'] += flush_time
+        st['flush_time_max'] = max(st['flush_time_max'], flush_time)
+        st['queue_wait'] += send_start - enqueued
+        st['queue_wait_max'] = max(st['queue_wait_max'], send_start - enqueued)
+        if not ok:
+            st['flush_failures'] += 1
+        if args.loglevel == 'DEBUG':
+            logging.debug('Flushed ' + str(lines) + ' lines (' + str(size) + ' bytes) to InfluxDB in ' +
+                          str(round(flush_time, 3)) + ' seconds after ' + str(round(send_start - enqueued, 3)) +
+                          ' seconds in queue.')
+        return ok
+
+    async def drain(self):
+        """
+        Flush the buffer and wait until the write queue is empty.
+        """
+        await self.flush('cycle')
+        if self.workers:
+            await self.queue.join()
+
+    def replay_spool(self):
+        """
+        Start background replay of spooled batches, unless the spool is empty or a replay is already running.
+        """
+        if self.closing or self.spool is None or not self.spool.pending():
+            return
+        if self.replay_task is not None and not self.replay_task.done():
+            return
+        self.replay_task = asyncio.create_task(self.spool.replay(self))
+
+    def flush_stats(self, reset=True):
+        """
+        Return coalescing stats accumulated since the last reset.
+        """
+        st = self.stats
+        if reset:
+            self.stats = self._new_stats()
+        return st
+
+    async def get_session(self):
+        """
+        Return the pooled session, (re)creating it if it does not exist or was closed.
+        """
+        if self.session is None or self.session.closed:
+            if self.ssl_context is None:
+                self.ssl_context = influx_ssl_context()
+            self.session = aiohttp.ClientSession(connector=build_influx_connector(self.ssl_context))
+            logging.info('InfluxDB writer session opened (pool size: ' + str(INFLUX_POOL_SIZE) + ').')
+        return self.session
+
+    async def write(self, payload, measurement):
+        """
+        POST line protocol payload to /api/v3/write_lp.
+
+        Returns the HTTP response status (204 on success) or None if the request could not be completed.
+        """
         if INFLUXDB3_AUTH_TOKEN is None or INFLUXDB3_AUTH_TOKEN == '':
             logging.error('INFLUXDB3_AUTH_TOKEN is not set. Cannot send data to InfluxDB.')
-            return False
+            return None
         if INFLUX_DB is None or INFLUX_DB == '':
             logging.error('INFLUX_DB is not set. Cannot send data to InfluxDB.')
-            return False
+            return None
         urlPostEndpoint = f"https://{INFLUX_HOST}:{INFLUX_PORT}/api/v3/write_lp?db={INFLUX_DB}&precision=second"
         headers = {
             "Authorization": f"Bearer {INFLUXDB3_AUTH_TOKEN}",
             "Content-Type": "text/plain; charset=utf-8"
         }
+        body = payload.encode('utf-8')
+        raw_size = len(body)
+        if INFLUX_WRITE_GZIP_LEVEL > 0 and raw_size >= INFLUX_WRITE_GZIP_MIN_BYTES:
+            cpu_start = time.process_time()
+            body = gzip.compress(body, compresslevel=INFLUX_WRITE_GZIP_LEVEL)
+            cpu_time = time.process_time() - cpu_start
+            headers["Content-Encoding"] = "gzip"
+            self.stats['gzip_writes'] += 1
+            self.stats['gzip_time'] += cpu_time
+            if args.loglevel == 'DEBUG':
+                logging.debug('Compressed InfluxDB write body from ' + str(raw_size) + ' to ' + str(len(body)) +
+                              ' bytes (ratio: ' + str(round(raw_size / max(1, len(body)), 2)) + ', CPU time: ' +
+                              str(round(cpu_time * 1000, 2)) + ' ms).')
+        self.stats['raw_bytes'] += raw_size
+        self.stats['sent_bytes'] += len(body)
         # Use a shorter timeout to avoid hanging on S3 writes
         timeout = aiohttp.ClientTimeout(total=30)  # 30-second timeout instead of default
-        async with session.post(url=urlPostEndpoint, data=payload, headers=headers, timeout=timeout) as db_session:
-            resp = db_session.status
-        await session.close()
-    if resp != 204:
-        logging.error('Failed to send metrics to InfluxDB. Measurement: ' +
-                      measurement + ', response code: ' + str(resp))
-        logging.error('Payload:\n' + str(payload))
-        return False
-    else:
-        # Do not log successful sends unless in DEBUG mode
+        session = await self.get_session()
+        attempt = 0
+        while True:
+            self.writes += 1
+            attempt_start = time.time()
+            try:
+                async with session.post(url=urlPostEndpoint, data=body, headers=headers, timeout=timeout) as db_session:
+                    resp = db_session.status
+                    # NOTE: read the (normally empty) body so that the connection is released back to the pool
+                    resp_body = await db_session.read()
+                    retry_after = db_session.headers.get('Retry-After')
+                error = None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                resp, resp_body, retry_after = None, b'', None
+                error = str(e) or type(e).__name__
+            attempt_time = time.time() - attempt_start
+            self.stats['attempts'] += 1
+            self.stats['attempt_time'] += attempt_time
+            self.stats['attempt_time_max'] = max(self.stats['attempt_time_max'], attempt_time)
+            if resp == 204 or not _is_transient_write_failure(resp) or attempt >= INFLUX_WRITE_RETRIES:
+                break
+            delay = _write_backoff(attempt, retry_after)
+            attempt += 1
+            self.stats['retries'] += 1
+            logging.warning('InfluxDB write attempt ' + str(attempt) + ' for ' + measurement + ' failed (' +
+                            (error or 'response code: ' + str(resp)) + ') after ' + str(round(attempt_time, 3)) +
+                            ' seconds. Retrying in ' + str(round(delay, 2)) + ' seconds.')
+            await asyncio.sleep(delay)
+        if resp == 400:
+            rejected = _partial_write_errors(resp_body)
+            if rejected and len(rejected) < payload.count('\n') + 1:
+                # NOTE: InfluxDB 3 accepted all other lines of the batch; only the rejected ones must not be resent
+                self.quarantine(rejected, measurement)
+                self.stats['partial_writes'] += 1
+                return 204
+            if rejected:
+                self.quarantine(rejected, measurement)
+        if resp is None:
+            self.failures += 1
+            logging.error('Failed to send metrics to InfluxDB. Measurement: ' +
+                          measurement + ', error: ' + error)
+            return None
+        if resp != 204:
+            self.failures += 1
+            logging.error('Failed to send metrics to InfluxDB. Measurement: ' +
+                          measurement + ', response code: ' + str(resp))
+            if args.loglevel == 'DEBUG' or not _is_transient_write_failure(resp):
+                logging.error('Payload:\n' + str(payload))
+        else:
+            # Do not log successful sends unless in DEBUG mode
+            if args.loglevel == 'DEBUG':
+                logging.debug('send_to_influx() for ' +
+                              measurement + ': response code: 204')
+        return resp
+
+    def quarantine(self, rejected, measurement):
+        """
+        Log lines rejected by InfluxDB and append them to INFLUX_QUARANTINE_FILE, if set.
+        """
+        self.stats['rejected_lines'] += len(rejected)
+        logging.error('InfluxDB rejected ' + str(len(rejected)) + ' lines of ' + measurement + '. First error: line ' +
+                      str(rejected[0].get('line_number')) + ': ' + str(rejected[0].get('error_message')))
         if args.loglevel == 'DEBUG':
-            logging.debug('send_to_influx() for ' +
-                          measurement + ': response code: 204')
+            for r in rejected:
+                logging.debug('Rejected line ' + str(r.get('line_number')) + ' (' + str(r.get('error_message')) +
+                              '): ' + str(r.get('original_line')))
+        if INFLUX_QUARANTINE_FILE is None:
+            return
+        try:
+            with open(INFLUX_QUARANTINE_FILE, 'a', encoding='utf-8') as f:
+                for r in rejected:
+                    f.write(str(r.get('original_line')) + '\n')
+        except OSError as e:
+            logging.error('Failed to write rejected lines to ' + INFLUX_QUARANTINE_FILE + ': ' + str(e))
+
+    async def close(self):
+        """
+        Flush buffered lines and close the pooled session. Safe to call more than once.
+        """
+        if self.linger_task is not None and not self.linger_task.done():
+            self.linger_task.cancel()
+        self.linger_task = None
+        self.closing = True
+        if self.replay_task is not None and not self.replay_task.done():
+            self.replay_task.cancel()
+            try:
+                await self.replay_task
+            except asyncio.CancelledError:
+                pass
+        self.replay_task = None
+        # NOTE: batches that fail with a transient error go to the spool
+        await self.drain()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.spool is not None:
+            self.spool.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            logging.info('InfluxDB writer session closed after ' + str(self.writes) +
+                         ' writes (' + str(self.failures) + ' failed).')
+        self.session = None
+
+
+class WriteSpool:
+    """
+    Append-only, segment-based on-disk spool for InfluxDB write batches that could not be sent.
+
+    Each segment is a memory-mapped file holding records (length, CRC32, line
+    protocol body). Batches keep the iteration timestamps stamped by
+    LineProtocol, are replayed oldest first by replay() and removed one
+    segment at a time once sent. When the spool grows above max_bytes, the
+    oldest segments are evicted.
+    """
+
+    HEADER = struct.Struct('>II')
+
+    def __init__(self, path, max_bytes, segment_bytes):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.segments = []  # sealed segments, oldest first
+        self.sizes = {}  # segment name: bytes used by records
+        self.active = None
+        self.active_file = None
+        self.active_mm = None
+        self.active_offset = 0
+        self.stats = {'spooled': 0, 'replayed': 0, 'dropped': 0, 'evicted': 0}
+        seq = 0
+        for name in sorted(os.listdir(path)):
+            if name.startswith('segment-') and name.endswith('.spool'):
+                size = sum(len(r) + self.HEADER.size for _, r in self._records(name, 0))
+                if size == 0:
+                    os.remove(os.path.join(path, name))
+                    continue
+                self.segments.append(name)
+                self.sizes[name] = size
+                seq = max(seq, int(name[8:-6]))
+        self.next_seq = seq + 1
+        if self.segments:
+            logging.warning('InfluxDB write spool ' + path + ' holds ' + str(self.used_bytes()) +
+                            ' bytes in ' + str(len(self.segments)) + ' segments from previous runs. They will be replayed.')
+
+    def used_bytes(self):
+        return sum(self.sizes.values())
+
+    def pending(self):
+        return bool(self.segments) or self.active_offset > 0
+
+    def append(self, body):
+        """
+        Append one write batch (line protocol) to the active segment.
+        """
+        data = body.encode('utf-8')
+        record_size = self.HEADER.size + len(data)
+        if record_size > self.max_bytes:
+            self.stats['evicted'] += 1
+            logging.error('InfluxDB write batch of ' + str(len(data)) + ' bytes is larger than the spool (max. ' +
+                          str(self.max_bytes) + ' bytes). Dropping it.')
+            return
+        if self.active is not None and (self.active_offset + record_size > len(self.active_mm) or
+                                        self.used_bytes() + record_size > self.max_bytes):
+            self._seal_active()
+        self._evict(record_size)
+        if self.active is None:
+            self._open_active(max(self.segment_bytes, record_size))
+        mm, offset = self.active_mm, self.active_offset
+        mm[offset:offset + self.HEADER.size] = self.HEADER.pack(len(data), zlib.crc32(data))
+        mm[offset + self.HEADER.size:offset + record_size] = data
+        mm.flush()
+        self.active_offset += record_size
+        self.sizes[self.active] = self.active_offset
+        self.stats['spooled'] += 1
+        logging.warning('Spooled InfluxDB write batch of ' + str(len(data)) + ' bytes to ' + self.active +
+                        ' (spool size: ' + str(self.used_bytes()) + ' bytes).')
+
+    def _open_active(self, size):
+        self.active = 'segment-' + str(self.next_seq).zfill(20) + '.spool'
+        self.next_seq += 1
+        self.active_file = open(os.path.join(self.path, self.active), 'w+b')
+        # NOTE: sparse file, disk space is consumed only as records are written
+        self.active_file.truncate(size)
+        self.active_mm = mmap.mmap(self.active_file.fileno(), size)
+        self.active_offset = 0
+
+    def _seal_active(self):
+        if self.active is None:
+            return
+        self.active_mm.flush()
+        self.active_mm.close()
+        self.active_file.truncate(self.active_offset)
+        self.active_file.close()
+        if self.active_offset > 0:
+            self.segments.append(self.active)
+        else:
+            os.remove(os.path.join(self.path, self.active))
+            self.sizes.pop(self.active, None)
+        self.active = None
+        self.active_file = None
+        self.active_mm = None
+        self.active_offset = 0
+
+    def _evict(self, needed):
+        while self.segments and self.used_bytes() + needed > self.max_bytes:
+            name = self.segments.pop(0)
+            records = sum(1 for _ in self._records(name, 0))
+            self._remove(name)
+            self.stats['evicted'] += records
+            logging.error('InfluxDB write spool is full (max. ' + str(self.max_bytes) + ' bytes). Evicted ' +
+                          str(records) + ' oldest batches in ' + name + '.')
+
+    def _remove(self, name):
+        self.sizes.pop(name, None)
+        try:
+            os.remove(os.path.join(self.path, name))
+        except FileNotFoundError:
+            pass
+
+    def _records(self, name, offset):
+        """
+        Yield (next offset, body bytes) for records in a sealed segment, starting at offset.
+        """
+        try:
+            with open(os.path.join(self.path, name), 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    end = len(mm)
+                    while offset + self.HEADER.size <= end:
+                        length, crc = self.HEADER.unpack_from(mm, offset)
+                        start = offset + self.HEADER.size
+                        if length == 0 or start + length > end:
+                            break
+                        data = mm[start:start + length]
+                        if zlib.crc32(data) != crc:
+                            logging.error('Corrupt record in InfluxDB write spool segment ' + name +
+                                          ' at offset ' + str(offset) + '. Skipping rest of segment.')
+                            break
+                        offset = start + length
+                        yield offset, data
+        except FileNotFoundError:
+            return
+
+    async def replay(self, writer):
+        """
+        Send spooled batches oldest first at a bounded rate, stopping at the first transient failure.
+        """
+        self._seal_active()
+        replayed = 0
+        while self.segments:
+            name = self.segments[0]
+            for offset, data in self._records(name, 0):
+                status = await writer.write(data.decode('utf-8'), 'spool replay')
+                if status != 204 and _is_transient_write_failure(status):
+                    # NOTE: keep the remaining records; already sent ones are dropped from this segment
+                    self._rewrite(name, offset - self.HEADER.size - len(data))
+                    logging.warning('InfluxDB write spool replay paused after ' + str(replayed) +
+                                    ' batches. ' + str(self.used_bytes()) + ' bytes remain spooled.')
+                    return
+                if status == 204:
+                    self.stats['replayed'] += 1
+                    replayed += 1
+                else:
+                    self.stats['dropped'] += 1
+                if name not in self.sizes:
+                    # NOTE: evicted while we were replaying it
+                    break
+                await asyncio.sleep(1.0 / INFLUX_SPOOL_REPLAY_RATE)
+            if self.segments and self.segments[0] == name:
+                self.segments.pop(0)
+                self._remove(name)
+        logging.info('InfluxDB write spool replay completed: ' + str(replayed) + ' batches sent.')
+
+    def _rewrite(self, name, offset):
+        """
+        Drop already replayed records from the head of a segment.
+        """
+        if offset <= 0 or name not in self.sizes:
+            return
+        path = os.path.join(self.path, name)
+        with open(path, 'rb') as f:
+            data = f.read()[offset:]
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        self.sizes[name] = len(data)
+
+    def close(self):
+        """
+        Flush and seal the active segment.
+        """
+        self._seal_active()
+        if self.segments:
+            logging.warning('InfluxDB write spool ' + self.path + ' holds ' + str(self.used_bytes()) +
+                            ' bytes in ' + str(len(self.segments)) + ' segments to be replayed on next start.')
+
+
+def _is_transient_write_failure(status):
+    """
+    Return True if an InfluxDB write failure (HTTP status, or None for no response) may succeed later.
+    """
+    return status is None or status == 429 or status >= 500
+
+
+def _write_backoff(attempt, retry_after=None):
+    """
+    Return the delay before retrying a failed InfluxDB write: Retry-After if the server sent one, otherwise
+    exponential backoff with full jitter. Both are capped at INFLUX_WRITE_BACKOFF_MAX.
+    """
+    if retry_after is not None:
+        try:
+            return min(INFLUX_WRITE_BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(INFLUX_WRITE_BACKOFF_MAX, INFLUX_WRITE_BACKOFF * 2 ** attempt))
+
+
+def _partial_write_errors(resp_body):
+    """
+    Return the list of rejected lines from an InfluxDB 3 write error response, or [] if it does not have one.
+
+    Example: {"error": "partial write of line protocol occurred", "data": [{"original_line": "...", "line_number": 2, "error_message": "..."}]}
+    """
+    try:
+        data = json.loads(resp_body).get('data')
+    except (ValueError, AttributeError):
+        return []
+    if not isinstance(data, list):
+        return []
+    return [r for r in data if isinstance(r, dict)]
+
+
+def _payload_measurements(payload):
+    """
+    Return sorted unique measurement names in a line protocol payload (for logging).
+    """
+    measurements = set()
+    for line in payload.splitlines():
+        if line and line[0] != '#':
+            measurements.add(line.split(',', 1)[0].split(' ', 1)[0])
+    return sorted(measurements)
+
+
+def get_influx_writer():
+    """
+    Return the global InfluxWriter, creating it on first use.
+    """
+    global INFLUX_WRITER
+    if INFLUX_WRITER is None:
+        INFLUX_WRITER = InfluxWriter()
+    return INFLUX_WRITER
+
+
+def line_timestamp() -> str:
+    """
+    Return the ' <timestamp>' suffix for line protocol lines of the current iteration, or '' if CURRENT_TIMESTAMP is not set.
+    """
+    if CURRENT_TIMESTAMP is None:
+        return ''
+    return ' ' + str(CURRENT_TIMESTAMP)
+
+
+# NOTE: line protocol special characters, see https://docs.influxdata.com/influxdb3/core/reference/line-protocol/#special-characters
+# Newlines cannot be escaped in line protocol, so they are replaced with a literal '\n'
+_LP_MEASUREMENT_ESCAPES = str.maketrans({',': '\\,', ' ': '\\ ', '\n': '\\n'})
+_LP_KEY_ESCAPES = str.maketrans({',': '\\,', '=': '\\=', ' ': '\\ ', '\n': '\\n'})
+_LP_STRING_ESCAPES = str.maketrans({'"': '\\"', '\\': '\\\\'})
+
+
+def lp_escape_measurement(name) -> str:
+    """
+    Escape a line protocol measurement name.
+    """
+    return str(name).translate(_LP_MEASUREMENT_ESCAPES)
+
+
+def lp_escape_key(key) -> str:
+    """
+    Escape a line protocol tag key, tag value or field key.
+    """
+    return str(key).translate(_LP_KEY_ESCAPES)
+
+
+def lp_field_value(value):
+    """
+    Encode a field value by its Python type: int as integer ('i' suffix), float as float, bool as boolean and
+    anything else as a quoted string. Returns None for None and non-finite floats, which line protocol cannot store.
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return str(value) + 'i'
+    if isinstance(value, float):
+        return repr(value) if math.isfinite(value) else None
+    if value is None:
+        return None
+    return '"' + str(value).translate(_LP_STRING_ESCAPES) + '"'
+
+
+def _lp_encode_tags(series, tags):
+    for k, v in tags:
+        if v is not None and v != '':
+            series.append(lp_escape_key(k) + '=' + lp_escape_key(v))
+
+
+def _lp_encode_fields(field_set, fields):
+    for k, v in fields:
+        v = lp_field_value(v)
+        if v is not None:
+            field_set.append(lp_escape_key(k) + '=' + v)
+
+
+class LineProtocol:
+    """
+    Build an InfluxDB line protocol payload.
+
+    Lines are kept in a list and joined once in payload(), so the cost of building a payload is linear in its size.
+    Every line ends with the iteration timestamp (see line_timestamp()), so payloads are sent as built.
+    Collectors convert values to the Python type of the field (int, float, bool or str) before calling add().
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.timestamp = line_timestamp()
+        # NOTE: register with the running collector, so its lines can be sent if it is cancelled before send()
+        cycle_lines = CYCLE_LINES.get()
+        if cycle_lines is not None:
+            cycle_lines.append(self)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, measurement, tags, fields) -> bool:
+        """
+        Add a line. tags and fields are dicts or lists of (key, value) pairs, added in that order.
+
+        Tags with None or empty values and fields with None values are left out. If no field is left, no line is
+        added and False is returned.
+        """
+        series = [lp_escape_measurement(measurement)]
+        _lp_encode_tags(series, tags.items() if isinstance(tags, dict) else tags)
+        field_set = []
+        _lp_encode_fields(field_set, fields.items() if isinstance(fields, dict) else fields)
+        return self.add_encoded(series, field_set)
+
+    def add_encoded(self, series, field_set) -> bool:
+        """
+        Add a line from already encoded parts: series is [measurement, 'tag=value', ...] and field_set is
+        ['field=value', ...].
+        """
+        if not field_set:
+            logging.warning('No field values for ' + ','.join(series) + '. Skipping line.')
+            return False
+        self.lines.append(','.join(series) + ' ' + ','.join(field_set) + self.timestamp)
         return True
 
+    def add_lines(self, lines) -> int:
+        """
+        Add already encoded lines that end with the timestamp of this payload (e.g. from encode_columns()) and return
+        the number of lines added.
+        """
+        count = len(self.lines)
+        self.lines.extend(lines)
+        return len(self.lines) - count
+
+    def payload(self) -> str:
+        return '\n'.join(self.lines)
+
+    async def send(self):
+        """
+        Send the payload to InfluxDB (see send_to_influx()) and remove its lines. Returns False if there are no lines.
+        """
+        if not self.lines:
+            return False
+        payload = self.payload()
+        # NOTE: sent lines are dropped, so a registered payload only holds lines that were not sent yet
+        self.lines = []
+        return await send_to_influx(payload)
+
+
+class MeasurementSchema:
+    """
+    Tag and field maps of a measurement: lists of (API key, line protocol key) pairs, plus optional per-key casts
+    that convert API values to the type of the tag or field (casts must accept None).
+
+    The maps are validated once, when the schema is registered at import (see register_schema()), and keys are
+    escaped in advance, so add() only looks up, converts and encodes values.
+    """
+
+    def __init__(self, measurement, tags, fields, casts=None):
+        casts = casts or {}
+        api_keys = [t[0] for t in tags] + [f[0] for f in fields]
+        lp_keys = [t[1] for t in tags] + [f[1] for f in fields]
+        for name, keys in (('API', api_keys), ('line protocol', lp_keys)):
+            if len(set(keys)) != len(keys):
+                duplicates = sorted(set(k for k in keys if keys.count(k) > 1))
+                raise ValueError('Duplicate ' + name + ' keys in tags and fields of ' + measurement + ': ' +
+                                 ', '.join(duplicates))
+        unknown = set(casts) - set(api_keys)
+        if unknown:
+            raise ValueError('Casts for unknown keys of ' + measurement + ': ' + ', '.join(sorted(unknown)))
+        self.measurement = measurement
+        self.prefix = lp_escape_measurement(measurement)
+        self.tags = tuple((k, lp_escape_key(nk) + '=', casts.get(k)) for k, nk in tags)
+        self.fields = tuple((k, lp_escape_key(nk) + '=', casts.get(k)) for k, nk in fields)
+
+    def add(self, lp, record, tags=(), fields=()) -> bool:
+        """
+        Add a line for record (a dict with API keys) to the LineProtocol lp.
+
+        tags and fields are extra (line protocol key, value) pairs: tags (e.g. cluster) go before the schema's tags
+        and fields after its fields. Missing keys are treated as None and left out.
+        """
+        series = [self.prefix]
+        if tags:
+            _lp_encode_tags(series, tags)
+        for k, key_eq, cast in self.tags:
+            v = record.get(k)
+            if cast is not None:
+                v = cast(v)
+            if v is not None and v != '':
+                series.append(key_eq + lp_escape_key(v))
+        field_set = []
+        for k, key_eq, cast in self.fields:
+            v = record.get(k)
+            if cast is not None:
+                v = cast(v)
+            v = lp_field_value(v)
+            if v is not None:
+                field_set.append(key_eq + v)
+        if fields:
+            _lp_encode_fields(field_set, fields)
+        return lp.add_encoded(series, field_set)
+
+    def columns(self, records) -> dict:
+        """
+        Pack the tag and field values of records (dicts with API keys) into one NumPy array per API key.
+        """
+        keys = [k for k, _, _ in self.tags + self.fields]
+        try:
+            # NOTE: one C-level pass over the records; records without some of the keys take the slow path
+            values = list(zip(*map(operator.itemgetter(*keys), records))) if len(keys) > 1 and records else None
+        except KeyError:
+            values = None
+        if values is None:
+            values = [[r.get(k) for r in records] for k in keys]
+        return {k: _np_column(v) for k, v in zip(keys, values)}
+
+    def add_columns(self, lp, columns, tags=()) -> int:
+        """
+        Add a line per row of columns (see columns()) to the LineProtocol lp and return the number of lines added.
+
+        tags are extra (line protocol key, column) pairs that go before the schema's tags (see lp_encode_columns()).
+        Each column holds a single type, so a field is never sent as an integer in one line and a float in another.
+        """
+        return lp.add_lines(self.encode_columns(columns, tags, lp.timestamp))
+
+    def encode_columns(self, columns, tags=(), timestamp='') -> list:
+        """
+        Encode a line per row of columns with the given timestamp suffix (see line_timestamp()) and return the lines.
+        """
+        tag_columns = [(lp_escape_key(k) + '=', v) for k, v in tags]
+        for k, key_eq, cast in self.tags:
+            column = columns[k].tolist()
+            tag_columns.append((key_eq, column if cast is None else [cast(v) for v in column]))
+        field_columns = [(key_eq, lp_column(columns[k], cast)) for k, key_eq, cast in self.fields]
+        return lp_encode_columns(self.prefix, tag_columns, field_columns, timestamp)
+
+
+# Schema registry, filled at import by register_schema() calls below
+MEASUREMENT_SCHEMAS = {}
+
+
+def register_schema(name, measurement, tags, fields, casts=None):
+    """
+    Validate and register a measurement schema under name. Raises ValueError on duplicate or unknown keys.
+    """
+    if name in MEASUREMENT_SCHEMAS:
+        raise ValueError('Measurement schema ' + name + ' is already registered.')
+    MEASUREMENT_SCHEMAS[name] = MeasurementSchema(measurement, tags, fields, casts)
+    return MEASUREMENT_SCHEMAS[name]
+
+
+def _lp_int(v):
+    return None if v is None else int(v)
+
+
+def _lp_float(v):
+    return None if v is None else float(v)
+
+
+def _lp_float2(v):
+    return None if v is None else round(float(v), 2)
+
+
+def _lp_round2(v):
+    return round(v, 2) if isinstance(v, float) else v
+
+
+def _lp_str(v):
+    return str(v)
+
+
+def _lp_str_or_int(v):
+    return v if isinstance(v, (str, int)) else None
+
+
+# NOTE: the volumeID pair is out of alphanumeric order because it maps to
+# 'id' which *is* in proper order. We have two sets of tags/fields depending if
+# the volume is paired
+register_schema('volumes', 'volumes',
+                [('access', 'access'),
+                 ('accountID', 'account_id'),
+                 ('enable512e', 'enable_512e'),
+                 ('volumeID', 'id'),
+                 ('name', 'name'),
+                 ('scsiNAADeviceID', 'scsi_naa_dev_id'),
+                 ('volumeConsistencyGroupUUID', 'vol_cg_group_id')],
+                [('blockSize', 'block_size'),
+                 ('fifoSize', 'fifo_size'),
+                 ('minFifoSize', 'min_fifo_size'),
+                 ('qosPolicyID', 'qos_policy_id'),
+                 ('totalSize', 'total_size')])
+register_schema('volumes_paired', 'volumes',
+                [('access', 'access'),
+                 ('accountID', 'account_id'),
+                 ('clusterPairID', 'cluster_pair_id'),
+                 ('enable512e', 'enable_512e'),
+                 ('volumeID', 'id'),
+                 ('name', 'name'),
+                 ('remoteVolumeID', 'remote_volume_id'),
+                 ('remoteVolumeName', 'remote_volume_name'),
+                 ('scsiNAADeviceID', 'scsi_naa_dev_id'),
+                 ('volumeConsistencyGroupUUID', 'vol_cg_group_id'),
+                 ('volumePairUUID', 'volume_pair_uuid')],
+                [('blockSize', 'block_size'),
+                 ('fifoSize', 'fifo_size'),
+                 ('minFifoSize', 'min_fifo_size'),
+                 ('qosPolicyID', 'qos_policy_id'),
+                 ('remote_replication_mode', 'remote_replication_mode'),
+                 ('remote_replication_state', 'remote_replication_state'),
+                 ('remote_replication_snap_state', 'remote_replication_snap_state'),
+                 ('totalSize', 'total_size')])
+register_schema('volume_performance', 'volume_performance',
+                [],
+                [('actualIOPS', 'actual_iops'),
+                 ('averageIOPSize', 'average_io_size'),
+                 ('asyncDelay', 'async_delay'),
+                 ('burstIOPSCredit', 'burst_io_credit'),
+                 ('clientQueueDepth', 'client_queue_depth'),
+                 ('latencyUSec', 'latency_usec'),
+                 ('nonZeroBlocks', 'non_zero_blocks'),
+                 ('normalizedIOPS', 'normalized_iops'),
+                 ('readBytes', 'read_bytes'),
+                 ('readBytesLastSample', 'read_bytes_last_sample'),
+                 ('readLatencyUSec', 'read_latency_usec'),
+                 ('readOpsLastSample', 'read_ops_last_sample'),
+                 ('throttle', 'throttle'),
+                 ('volumeSize', 'volume_size'),
+                 ('volumeUtilization', 'volume_utilization'),
+                 ('writeBytes', 'write_bytes'),
+                 ('writeBytesLastSample', 'write_bytes_last_sample'),
+                 ('writeLatencyUSec', 'write_latency_usec'),
+                 ('writeOpsLastSample', 'write_ops_last_sample'),
+                 ('zeroBlocks', 'zero_blocks')],
+                casts={'throttle': _lp_float, 'volumeUtilization': _lp_float})
+# NOTE: contrary to the docs, blocks_per_sec seems to be an integer
+# https://github.com/NetAppDocs/element-software/issues/204
+# NOTE: looks like another API documentation bug, remaining_time is a float
+register_schema('sync_jobs', 'sync_jobs',
+                [('dstVolumeID', 'dst_volume_id'),
+                 ('stage', 'stage'),
+                 ('type', 'type')],
+                [('blocksPerSecond', 'blocks_per_sec'),
+                 ('elapsedTime', 'elapsed_time'),
+                 ('percentComplete', 'pct_complete'),
+                 ('remainingTime', 'remaining_time')],
+                casts={'blocksPerSecond': _lp_int, 'elapsedTime': _lp_int, 'percentComplete': _lp_int,
+                       'remainingTime': _lp_float})
+# NOTE: thinFactor, dedupeFactor, compressionFactor and storageEfficiency are SFC-derived metrics
+# and NOT part of SolidFire's GetClusterCapacity API response. They are floats even when they fall back to 1
+register_schema('cluster_capacity', 'cluster_capacity',
+                [],
+                [('activeBlockSpace', 'active_block_space'),
+                 ('activeSessions', 'active_sessions'),
+                 ('averageIOPS', 'average_iops'),
+                 ('clusterRecentIOSize', 'cluster_recent_io_size'),
+                 ('compressionFactor', 'compressioN_factor'),
+                 ('currentIOPS', 'current_iops'),
+                 ('dedupeFactor', 'dedupe_factor'),
+                 ('storageEfficiency', 'storage_efficiency'),
+                 ('maxIOPS', 'max_iops'),
+                 ('maxOverProvisionableSpace', 'max_overprovisionable_space'),
+                 ('maxProvisionedSpace', 'max_provisioned_space'),
+                 ('maxUsedMetadataSpace', 'max_used_metadata_space'),
+                 ('maxUsedSpace', 'max_used_space'),
+                 ('nonZeroBlocks', 'non_zero_blocks'),
+                 ('peakActiveSessions', 'peak_active_sessions'),
+                 ('peakIOPS', 'peak_iops'),
+                 ('provisionedSpace', 'provisioned_space'),
+                 ('snapshotNonZeroBlocks', 'snapshot_non_zero_blocks'),
+                 ('thinFactor', 'thin_factor'),
+                 ('totalOps', 'total_ops'),
+                 ('uniqueBlocks', 'unique_blocks'),
+                 ('uniqueBlocksUsedSpace', 'unique_block_space'),
+                 ('usedMetadataSpace', 'used_block_space'),
+                 ('usedMetadataSpaceInSnapshots', 'used_metadata_space_in_snapshots'),
+                 ('usedSpace', 'used_space'),
+                 ('zeroBlocks', 'zero_blocks')],
+                casts={'thinFactor': _lp_float, 'dedupeFactor': _lp_float, 'compressionFactor': _lp_float,
+                       'storageEfficiency': _lp_float})
+_CLUSTER_PERFORMANCE_FIELDS = [('actualIOPS', 'actual_iops'),
+                               ('averageIOPSize', 'average_iops'),
+                               ('clientQueueDepth', 'client_queue_depth'),
+                               ('clusterUtilization', 'cluster_utilization'),
+                               ('latencyUSec', 'latency_usec'),
+                               ('normalizedIOPS', 'normalized_iops'),
+                               ('readBytesLastSample', 'read_bytes_last_sample'),
+                               ('readLatencyUSec', 'read_latency_usec'),
+                               ('readOpsLastSample', 'read_ops_last_sample'),
+                               ('writeLatencyUSec', 'write_latency_usec'),
+                               ('writeBytesLastSample', 'write_bytes_last_sample'),
+                               ('writeOpsLastSample', 'write_ops_last_sample')]
+register_schema('cluster_performance', 'cluster_performance',
+                [],
+                _CLUSTER_PERFORMANCE_FIELDS,
+                casts=dict({k: _lp_round2 for k, _ in _CLUSTER_PERFORMANCE_FIELDS}, clusterUtilization=_lp_float2))
+register_schema('node_performance', 'node_performance',
+                [],
+                [('cpu', 'cpu'),
+                 ('networkUtilizationCluster', 'network_utilization_cluster'),
+                 ('networkUtilizationStorage', 'network_utilization_storage')])
+# NOTE: "fields" of iSCSI sessions are sent as tags, "metrics" as fields. The initiator_* and auth/chap tags
+# are flattened into the session record by iscsi_sessions()
+_ISCSI_SESSION_TAGS = [('initiator_alias', 'initiator_alias'),
+                       ('initiator_id', 'initiator_id'),
+                       ('auth_method', 'auth_method'),
+                       ('chap_algorithm', 'chap_algorithm'),
+                       ('chap_username', 'chap_username'),
+                       ('accountID', 'account_id'),
+                       ('accountName', 'account_name'),
+                       ('initiatorIP', 'initiator_ip'),
+                       ('initiatorName', 'initiator_name'),
+                       ('initiatorSessionID', 'initiator_session_id'),
+                       ('nodeID', 'node_id'),
+                       ('targetIP', 'target_ip'),
+                       ('targetName', 'target_name'),
+                       ('virtualNetworkID', 'virtual_network_id'),
+                       ('volumeID', 'volume_id')]
+_ISCSI_SESSION_FIELDS = [('msSinceLastIscsiPDU', 'ms_since_last_iscsi_pdu'),
+                         ('msSinceLastScsiCommand', 'ms_since_last_scsi_command'),
+                         ('serviceID', 'service_id'),
+                         ('sessionID', 'session_id'),
+                         ('volumeInstance', 'volume_instance')]
+register_schema('iscsi_sessions', 'iscsi_sessions',
+                _ISCSI_SESSION_TAGS,
+                _ISCSI_SESSION_FIELDS,
+                casts=dict({k: _lp_str for k, _ in _ISCSI_SESSION_TAGS},
+                           **{k: _lp_str_or_int for k, _ in _ISCSI_SESSION_FIELDS}))
+# QoS histograms: (API histogram name, measurement suffix, buckets)
+QOS_HISTOGRAMS = [
+    ('belowMinIopsPercentages', 'below_min_iops_percentages',
+     [('Bucket1To19', 'b_01_to_19'),
+      ('Bucket20To39', 'b_20_to_39'),
+      ('Bucket40To59', 'b_40_to_59'),
+      ('Bucket60To79', 'b_60_to_79'),
+      ('Bucket80To100', 'b_80_to_100')]),
+    ('minToMaxIopsPercentages', 'min_to_max_iops_percentages',
+     [('Bucket1To19', 'b_001_to_019'),
+      ('Bucket20To39', 'b_020_to_039'),
+      ('Bucket40To59', 'b_040_to_059'),
+      ('Bucket60To79', 'b_060_to_079'),
+      ('Bucket80To100', 'b_080_to_100'),
+      ('Bucket101Plus', 'b_101_plus')]),
+    ('readBlockSizes', 'read_block_sizes',
+     [('Bucket512To4095', 'b_000512_to_004095'),
+      ('Bucket4096To8191', 'b_004096_to_008191'),
+      ('Bucket8192To16383', 'b_008192_to_016383'),
+      ('Bucket16384To32767', 'b_016384_to_032767'),
+      ('Bucket32768To65535', 'b_032768_to_65535'),
+      ('Bucket65536To131071', 'b_065536_to_131071'),
+      ('Bucket131072Plus', 'b_131072_plus')]),
+    ('targetUtilizationPercentages', 'target_utilization_percentage',
+     [('Bucket0', 'b_000'),
+      ('Bucket1To19', 'b_001_to_019'),
+      ('Bucket20To39', 'b_020_to_039'),
+      ('Bucket40To59', 'b_040_to_059'),
+      ('Bucket60To79', 'b_060_079'),
+      ('Bucket80To100', 'b_080_to_100'),
+      ('Bucket101Plus', 'b_101_plus')]),
+    ('throttlePercentages', 'throttle_percentages',
+     [('Bucket0', 'b_00'),
+      ('Bucket1To19', 'b_00_to_19'),
+      ('Bucket20To39', 'b_20_to_30'),
+      ('Bucket40To59', 'b_40_to_59'),
+      ('Bucket60To79', 'b_60_to_79'),
+      ('Bucket80To100', 'b_80_to_100')]),
+    ('writeBlockSizes', 'write_block_sizes',
+     [('Bucket512To4095', 'b_000512_to_004095'),
+      ('Bucket4096To8191', 'b_004096_to_008191'),
+      ('Bucket8192To16383', 'b_008192_to_016383'),
+      ('Bucket16384To32767', 'b_016384_to_032767'),
+      ('Bucket32768To65535', 'b_032768_to_65535'),
+      ('Bucket65536To131071', 'b_065536_to_131071'),
+      ('Bucket131072Plus', 'b_131072_plus')])]
+for _hg_name, _hg_suffix, _hg_buckets in QOS_HISTOGRAMS:
+    register_schema(_hg_name, 'histogram_' + _hg_suffix, [], _hg_buckets)
+
+# Statistics of the histogram_summary measurement (see qos_histogram_summary()): percentiles (quantile) and mean
+QOS_HISTOGRAM_PERCENTILES = [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]
+QOS_HISTOGRAM_STATS = [stat for stat, _ in QOS_HISTOGRAM_PERCENTILES] + ['mean']
+
+
+def qos_histogram_bounds(buckets) -> tuple:
+    """
+    Return the lower and upper bounds of histogram buckets, parsed from their API keys.
+
+    'Bucket512To4095' is [512, 4095], 'Bucket0' is [0, 0] and open-ended buckets such as 'Bucket131072Plus' are
+    [131072, 131072], because their upper bound is unknown.
+    """
+    lower = []
+    upper = []
+    for key, _ in buckets:
+        low, high = re.fullmatch(r'Bucket(\d+)(?:To(\d+)|Plus)?', key).groups()
+        lower.append(float(low))
+        upper.append(float(high) if high is not None else float(low))
+    return lower, upper
+
+
+QOS_HISTOGRAM_BOUNDS = {_hg_name: qos_histogram_bounds(_hg_buckets) for _hg_name, _, _hg_buckets in QOS_HISTOGRAMS}
+register_schema('qos_histogram_summary', 'histogram_summary', [],
+                [(_hg_name + '_' + _stat, _hg_suffix + '_' + _stat)
+                 for _hg_name, _hg_suffix, _ in QOS_HISTOGRAMS for _stat in QOS_HISTOGRAM_STATS] +
+                [('volumeID', 'id')],
+                casts=dict({_hg_name + '_' + _stat: _lp_float
+                            for _hg_name, _, _ in QOS_HISTOGRAMS for _stat in QOS_HISTOGRAM_STATS},
+                           volumeID=_lp_int))
+
+
+def lp_column(values, cast=None):
+    """
+    Encode a column of field values (a list or NumPy array of API values) as line protocol field values.
+
+    Returns (matrix, present): matrix is a NumPy uint8 array with the encoded value of each row, NUL-padded, and
+    present is False for rows where the value is None or not finite. Integer columns are formatted with array
+    arithmetic and float and bool columns once per distinct value. Other columns (strings, or None mixed with
+    numbers) and casts other than _lp_int and _lp_float fall back to lp_field_value() per value.
+    """
+    if cast is not None and cast is not _lp_int and cast is not _lp_float:
+        values = [cast(v) for v in values]
+    arr = values if isinstance(values, np.ndarray) else _np_column(values)
+    kind = arr.dtype.kind
+    if kind == 'u' and len(arr) and arr.max() > np.iinfo(np.int64).max:
+        kind = 'O'
+    if kind in 'iu' and cast is _lp_float:
+        arr, kind = arr.astype(np.float64), 'f'
+    if kind == 'f' and cast is _lp_int:
+        present = np.isfinite(arr)
+        return _lp_int_matrix(np.where(present, arr, 0).astype(np.int64), 'i'), present
+    if kind in 'iu':
+        return _lp_int_matrix(arr.astype(np.int64), 'i'), np.ones(len(arr), dtype=bool)
+    if kind in 'fb':
+        distinct, inverse = np.unique(arr, return_inverse=True)
+        encoded = [lp_field_value(v) for v in distinct.tolist()]
+        table = _lp_text_matrix(['' if v is None else v for v in encoded])
+        present = np.isfinite(arr) if kind == 'f' else np.ones(len(arr), dtype=bool)
+        return table[inverse.reshape(-1)], present
+    values = arr.tolist()
+    if kind == 'O' and (cast is _lp_int or cast is _lp_float):
+        # NOTE: e.g. None mixed with numbers: cast per value like the per-record path, so 0 stays a float with _lp_float
+        values = [cast(v) for v in values]
+    encoded = [lp_field_value(v) for v in values]
+    return _lp_text_matrix(['' if v is None else v for v in encoded]), np.array([v is not None for v in encoded],
+                                                                                 dtype=bool)
+
+
+def _np_column(values):
+    """
+    Convert a list of API values to a NumPy array. Values that do not fit a typed array (e.g. integers above int64)
+    give an object array.
+    """
+    try:
+        return np.array(values)
+    except (OverflowError, ValueError):
+        return np.array(values, dtype=object)
+
+
+def _lp_int_matrix(arr, suffix=''):
+    """
+    Format an int64 array as a matrix of decimal digits (ASCII), right-aligned and NUL-padded, followed by suffix.
+    """
+    rest = np.abs(arr).astype(np.uint64)
+    width = len(str(int(rest.max()))) if len(arr) else 1
+    matrix = np.zeros((len(arr), width + 1 + len(suffix)), dtype=np.uint8)
+    matrix[:, 0] = np.where(arr < 0, ord('-'), 0)
+    matrix[:, width + 1:] = np.frombuffer(suffix.encode(), dtype=np.uint8)
+    for n in range(width, 0, -1):
+        digit = (rest % 10).astype(np.uint8) + ord('0')
+        matrix[:, n] = digit if n == width else np.where(rest > 0, digit, 0)
+        rest //= 10
+    return matrix
+
+
+def _lp_text_matrix(values):
+    """
+    Encode a list of str as a matrix of UTF-8 bytes, NUL-padded.
+    """
+    column = np.array([v.encode() for v in values], dtype=bytes)
+    return column.view(np.uint8).reshape(len(column), column.dtype.itemsize)
+
+
+def async_delay_seconds(values):
+    """
+    Convert asyncDelay values of ListVolumeStats ("HH:MM:SS.ffffff" strings) to whole seconds as an int64 array.
+    None and malformed values become -1, the same as in the per-record path of volume_performance().
+    """
+    seconds = np.full(len(values), -1, dtype=np.int64)
+    rows = [n for n, v in enumerate(values) if isinstance(v, str) and len(v) >= 14 and v.isascii()]
+    if not rows:
+        return seconds
+    text = _lp_text_matrix([values[n][:14] for n in rows]).astype(np.int64)
+    digits = text[:, [0, 1, 3, 4, 6, 7, 9, 10, 11, 12, 13]] - ord('0')
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 2] * 10 + digits[:, 3]
+    secs = digits[:, 4] * 10 + digits[:, 5]
+    valid = ((digits >= 0) & (digits <= 9)).all(axis=1) & (text[:, 2] == ord(':')) & (text[:, 5] == ord(':'))
+    valid &= (hours < 24) & (minutes < 60) & (secs < 60)
+    seconds[np.array(rows)[valid]] = (hours * 3600 + minutes * 60 + secs)[valid]
+    return seconds
+
+
+def qos_histogram_summary(counts, lower, upper) -> dict:
+    """
+    Return approximate percentiles (QOS_HISTOGRAM_PERCENTILES) and the mean of histograms as float arrays.
+
+    counts holds the bucket counts of one histogram per row, lower and upper the bucket bounds (see
+    qos_histogram_bounds()). Percentiles are interpolated linearly within the bucket they fall in and the mean takes
+    the midpoint of each bucket. Rows without samples give NaN, which lp_column() leaves out.
+    """
+    counts = np.asarray(counts, dtype=np.float64).reshape(-1, len(lower))
+    lower = np.asarray(lower)
+    upper = np.asarray(upper)
+    total = counts.sum(axis=1)
+    cumulative = np.cumsum(counts, axis=1)
+    rows = np.arange(len(counts))
+    stats = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for stat, quantile in QOS_HISTOGRAM_PERCENTILES:
+            rank = quantile * total
+            # NOTE: the first bucket whose cumulative count reaches the rank
+            bucket = np.minimum((cumulative < rank[:, None]).sum(axis=1), len(lower) - 1)
+            in_bucket = counts[rows, bucket]
+            fraction = np.where(in_bucket > 0, (rank - cumulative[rows, bucket] + in_bucket) / in_bucket, 0.0)
+            value = lower[bucket] + fraction * (upper[bucket] - lower[bucket])
+            stats[stat] = np.round(np.where(total > 0, value, np.nan), 2)
+        stats['mean'] = np.round((counts * (lower + upper) / 2).sum(axis=1) / total, 2)
+    return stats
+
+
+def lp_encode_columns(prefix, tags, fields, timestamp) -> list:
+    """
+    Encode one line per row from columns and return the lines.
+
+    prefix is the escaped measurement name. tags are (escaped key + '=', column) pairs, where a column is a str
+    (the same value for all rows), a NumPy integer array or a list of values (None or '' leaves the tag out).
+    fields are (escaped key + '=', lp_column() result) pairs. Rows without field values are left out.
+
+    Lines are assembled as one matrix of bytes (a row per line, NUL-padded columns) and the padding is removed
+    in a single pass, so there is no per-row string concatenation.
+    """
+    rows = len(fields[0][1][1]) if fields else 0
+    if rows == 0:
+        return []
+    pieces = [_lp_constant_matrix(prefix, rows)]
+    for key_eq, column in tags:
+        if isinstance(column, str):
+            if column != '':
+                pieces.append(_lp_constant_matrix(',' + key_eq + lp_escape_key(column), rows))
+            continue
+        if isinstance(column, np.ndarray) and column.dtype.kind in 'iu':
+            values, present = _lp_int_matrix(column.astype(np.int64)), None
+        else:
+            text = ['' if v is None else str(v) for v in column]
+            present = np.array([v != '' for v in text], dtype=bool)
+            # NOTE: escape all values in one call; NUL cannot be sent in line protocol anyway
+            escaped = '\0'.join(text).translate(_LP_KEY_ESCAPES).split('\0')
+            if len(escaped) != rows:
+                escaped = [lp_escape_key(v) for v in text]
+            values = _lp_text_matrix(escaped)
+        pieces.append(_lp_masked(_lp_constant_matrix(',' + key_eq, rows), present))
+        pieces.append(_lp_masked(values, present))
+    width = sum(p.shape[1] for p in pieces)
+    present = np.empty((rows, len(fields)), dtype=bool)
+    starts = np.empty(len(fields), dtype=np.intp)
+    for n, (key_eq, (values, field_present)) in enumerate(fields):
+        present[:, n] = field_present
+        starts[n] = width
+        pieces.append(_lp_masked(_lp_constant_matrix(',' + key_eq, rows), field_present))
+        pieces.append(_lp_masked(values, field_present))
+        width += pieces[-2].shape[1] + pieces[-1].shape[1]
+    pieces.append(_lp_constant_matrix(timestamp + '\n', rows))
+    matrix = np.concatenate(pieces, axis=1)
+    # NOTE: the first field of a line is separated from the series by a space, not a comma
+    matrix[np.arange(rows), starts[present.argmax(axis=1)]] = ord(' ')
+    keep = present.any(axis=1)
+    if not keep.all():
+        logging.warning(str(rows - int(keep.sum())) + ' ' + prefix + ' rows have no field values. Skipping lines.')
+        matrix = matrix[keep]
+    data = matrix.ravel()
+    return data[data != 0].tobytes().decode().split('\n')[:-1]
+
+
+def _lp_constant_matrix(text, rows):
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    return np.broadcast_to(data, (rows, len(data)))
+
+
+def _lp_masked(matrix, present):
+    """
+    Return matrix with the rows where present is False set to NUL. present None means all rows are present.
+    """
+    if present is None or present.all():
+        return matrix
+    return np.where(present[:, None], matrix, np.uint8(0))
+
+
+async def send_to_influx(payload):
+    """
+    Send a payload to InfluxDB 3 (see InfluxWriter.submit()). Returns False if the payload is empty.
+
+    The payload is taken as-is: its lines must already end with line_timestamp() (see LineProtocol) and have no
+    trailing whitespace or empty lines.
+    """
+    payload = payload.rstrip('\n')
+    if not payload:
+        return False
+    return await get_influx_writer().submit(payload, payload.count('\n') + 1)
 
-async def _split_list(long_list: list) -> list:
+
+async def _split_list(long_list: list, chunk_size=None) -> list:
     """
-    Splits a long list into a list of shorter lists.
+    Splits a long list into a list of shorter lists of chunk_size (default: CHUNK_SIZE) elements.
     """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
     list_length = len(long_list)
-    if list_length <= CHUNK_SIZE:
+    if list_length <= chunk_size:
         logging.info('List not long enough to split')
-        return long_list
+        # NOTE: callers iterate over batches, so a short list is returned as the only batch
+        return [long_list] if long_list else []
     else:
-        shorter_lists = [long_list[i:i + CHUNK_SIZE]
-                         for i in range(0, len(long_list), CHUNK_SIZE)]
+        shorter_lists = [long_list[i:i + chunk_size]
+                         for i in range(0, len(long_list), chunk_size)]
         logging.info('Split ' + str(len(long_list)) +
-                     ' long list using chunk size ' + str(CHUNK_SIZE))
+                     ' long list using chunk size ' + str(chunk_size))
         if args.loglevel == 'DEBUG':
             logging.debug('Lists created: ' +
                           str(len(shorter_lists)) +
@@ -2147,6 +3820,97 @@ async def _split_list(long_list: list) -> list:
         return shorter_lists
 
 
+class ChunkSizer:
+    """
+    Adaptive chunk size of one batched SolidFire API method (e.g. ListVolumeStats), see get_chunk_sizer().
+
+    Collectors split their requests into batches of size items, report every call with observe() and call
+    adjust() once per collection cycle. adjust() compares the cycle's API time per item with that of the previous
+    cycle and keeps moving the size in the same direction while it improves, or turns around when it gets worse.
+    The size is halved when a call took longer than CHUNK_LATENCY_CEILING and is not grown if the slowest call
+    would likely exceed it. It stays between CHUNK_SIZE_MIN and CHUNK_SIZE_MAX.
+    """
+
+    STEP = 1.25  # growth (or shrink) factor per cycle
+    TOLERANCE = 0.02  # relative change of the time per item that is treated as noise
+
+    def __init__(self, method):
+        self.method = method
+        self.size = min(max(CHUNK_SIZE, CHUNK_SIZE_MIN), CHUNK_SIZE_MAX)
+        self.direction = 1
+        self.moved = False
+        self.last_item_time = None
+        self.cycle = self._new_cycle()
+
+    @staticmethod
+    def _new_cycle():
+        return {'calls': 0, 'items': 0, 'items_max': 0, 'seconds': 0.0, 'latency_max': 0.0, 'bytes': 0}
+
+    def observe(self, items, seconds, response_bytes):
+        """
+        Record one API call with items elements that took seconds and returned response_bytes bytes.
+        """
+        cycle = self.cycle
+        cycle['calls'] += 1
+        cycle['items'] += items
+        cycle['items_max'] = max(cycle['items_max'], items)
+        cycle['seconds'] += seconds
+        cycle['latency_max'] = max(cycle['latency_max'], seconds)
+        cycle['bytes'] += response_bytes
+
+    def adjust(self):
+        """
+        Pick the chunk size for the next cycle from the calls of this cycle and return this cycle's stats.
+
+        Returns None if no calls were observed.
+        """
+        cycle, self.cycle = self.cycle, self._new_cycle()
+        if cycle['calls'] == 0 or cycle['items'] == 0:
+            return None
+        item_time = cycle['seconds'] / cycle['items']
+        cycle['chunk_size'] = self.size
+        cycle['item_time'] = item_time
+        size = self.size
+        if args.fixed_chunk_size:
+            pass
+        elif cycle['latency_max'] > CHUNK_LATENCY_CEILING:
+            size = size // 2
+            self.direction = -1
+        else:
+            # NOTE: only a cycle that followed a size change says whether the change helped
+            if self.moved and self.last_item_time is not None and \
+                    item_time > self.last_item_time * (1 + self.TOLERANCE):
+                self.direction = -self.direction
+            if self.direction < 0:
+                size = min(size - 1, int(size / self.STEP))
+            elif cycle['items_max'] >= size and cycle['latency_max'] * self.STEP <= CHUNK_LATENCY_CEILING:
+                # NOTE: there is no point in growing while all items fit in one call
+                size = max(size + 1, int(size * self.STEP))
+        size = min(max(size, CHUNK_SIZE_MIN), CHUNK_SIZE_MAX)
+        if size == CHUNK_SIZE_MIN:
+            self.direction = 1
+        elif size == CHUNK_SIZE_MAX:
+            self.direction = -1
+        self.moved = size != self.size
+        self.last_item_time = item_time
+        if self.moved:
+            logging.info(self.method + ' chunk size changed from ' + str(self.size) + ' to ' + str(size) +
+                         ' (avg. ' + str(round(cycle['seconds'] / cycle['calls'], 3)) + 's, max. ' +
+                         str(round(cycle['latency_max'], 3)) + 's per call).')
+        self.size = size
+        return cycle
+
+
+def get_chunk_sizer(method):
+    """
+    Return the ChunkSizer of a batched SolidFire API method, creating it on first use.
+    """
+    sizer = CHUNK_SIZERS.get(method)
+    if sizer is None:
+        sizer = CHUNK_SIZERS[method] = ChunkSizer(method)
+    return sizer
+
+
 async def _send_function_stat(cluster_name, function, time_taken):
     """
     Send SFC function execution metrics to InfluxDB.
@@ -2155,12 +3919,186 @@ async def _send_function_stat(cluster_name, function, time_taken):
         return  # Skip instrumentation entirely when --no-instrumenting flag is set
     
     try:
-        await send_to_influx("sfc_metrics,cluster=" + cluster_name + ",function=" + function + " " + "time_taken=" + str(time_taken) + "\n")
+        lp = LineProtocol()
+        lp.add('sfc_metrics', [('cluster', cluster_name), ('function', function)], [('time_taken', float(time_taken))])
+        await lp.send()
     except BaseException:
         logging.error("Failed to send function stats to InfluxDB.")
     return
 
 
+async def _send_overrun_stat(cluster_name, tier, function, deadline, partial_lines):
+    """
+    Send a collector that was cancelled at the cycle deadline and the number of its lines sent anyway to InfluxDB.
+    """
+    if args.no_instrumenting:
+        return
+    try:
+        lp = LineProtocol()
+        lp.add('sfc_overrun', [('cluster', cluster_name), ('tier', tier), ('function', function)],
+               [('deadline', float(deadline)), ('partial_lines', partial_lines)])
+        await lp.send()
+    except BaseException:
+        logging.error("Failed to send overrun stats to InfluxDB.")
+    return
+
+
+async def _send_rotation_stat(cluster_name, rotation, tick):
+    """
+    Send the slice collected in an efficiency rotation tick and the objects refreshed in the round to InfluxDB.
+    """
+    if args.no_instrumenting:
+        return
+    try:
+        lp = LineProtocol()
+        lp.add('sfc_efficiency_rotation', [('cluster', cluster_name)],
+               [('slice', tick['slice']), ('slices', rotation.slices), ('round', tick['round']),
+                ('accounts', tick['collected']['accounts']), ('volumes', tick['collected']['volumes']),
+                ('round_accounts', tick['refreshed']['accounts']), ('round_volumes', tick['refreshed']['volumes']),
+                ('total_accounts', tick['totals']['accounts']), ('total_volumes', tick['totals']['volumes']),
+                ('failed_accounts', tick['failed']['accounts']), ('failed_volumes', tick['failed']['volumes'])])
+        await lp.send()
+    except BaseException:
+        logging.error("Failed to send efficiency rotation stats to InfluxDB.")
+    return
+
+
+async def _send_chunk_stat(cluster_name, sizer, cycle):
+    """
+    Send the chunk size of a batched SolidFire API method and the stats of its calls in this cycle to InfluxDB.
+    """
+    if args.no_instrumenting or cycle is None:
+        return
+    try:
+        lp = LineProtocol()
+        lp.add('sfc_chunk_size', [('cluster', cluster_name), ('method', sizer.method)],
+               [('chunk_size', cycle['chunk_size']), ('next_chunk_size', sizer.size), ('calls', cycle['calls']),
+                ('items', cycle['items']), ('latency_avg', round(cycle['seconds'] / cycle['calls'], 3)),
+                ('latency_max', round(cycle['latency_max'], 3)),
+                ('response_bytes_avg', cycle['bytes'] // cycle['calls']),
+                ('item_time', round(cycle['item_time'], 6))])
+        await lp.send()
+    except BaseException:
+        logging.error("Failed to send chunk size stats to InfluxDB.")
+    return
+
+
+async def _send_api_stats():
+    """
+    Log SolidFire API response cache hits and misses, coalesced requests and governor stats since the last call and
+    send them to InfluxDB.
+    """
+    cache_stats = get_sf_response_cache().flush_stats()
+    coalesced = get_sf_client().flush_coalesced()
+    lp = LineProtocol()
+    for method in sorted(set(cache_stats) | set(coalesced)):
+        st = cache_stats.get(method, {'hits': 0, 'misses': 0, 'invalidations': 0, 'entries': 0, 'bytes': 0})
+        st['coalesced'] = coalesced.get(method, 0)
+        logging.info('[SF CACHE] ' + method + ': ' + str(st['hits']) + ' hits, ' + str(st['misses']) + ' misses, ' +
+                     str(st['invalidations']) + ' invalidations, ' + str(st['entries']) + ' cached responses (' +
+                     str(st['bytes']) + ' bytes), ' + str(st['coalesced']) + ' coalesced requests.')
+        lp.add('sfc_api_cache', [('cluster', CLUSTER_NAME), ('method', method)],
+               [('hits', st['hits']), ('misses', st['misses']), ('invalidations', st['invalidations']),
+                ('entries', st['entries']), ('bytes', st['bytes']), ('coalesced', st['coalesced'])])
+    st = get_sf_client().governor.flush_stats()
+    if st['requests'] > 0:
+        logging.info('[SF GOVERNOR] ' + str(st['requests']) + ' requests, ' + str(st['waited']) + ' waited (avg. ' +
+                     str(round(st['wait_time'] / max(1, st['waited']), 3)) + 's, max. ' +
+                     str(round(st['wait_time_max'], 3)) + 's), ' + str(st['failed']) + ' failed, ' + str(st['slow']) +
+                     ' slow, ' + str(st['decreases']) + ' backoffs. Rate ' + str(st['rate']) + '/s, concurrency ' +
+                     str(st['limit']) + '.')
+        lp.add('sfc_api_governor', [('cluster', CLUSTER_NAME)],
+               [('requests', st['requests']), ('waited', st['waited']), ('wait_time', round(st['wait_time'], 3)),
+                ('wait_time_max', round(st['wait_time_max'], 3)), ('failed', st['failed']), ('slow', st['slow']),
+                ('decreases', st['decreases']), ('rate', float(st['rate'])), ('limit', st['limit']),
+                ('in_flight', st['in_flight'])])
+    if args.no_instrumenting or len(lp) == 0:
+        return
+    await lp.send()
+
+
+async def _flush_writes():
+    """
+    Flush coalesced InfluxDB writes at the end of a collection cycle and report write buffer stats.
+    """
+    writer = get_influx_writer()
+    await writer.flush('cycle')
+    # NOTE: without this, batches spilled while the queue was full would wait for a successful write to be replayed
+    writer.replay_spool()
+    st = writer.flush_stats()
+    if st['flushes'] == 0:
+        return
+    avg_lines = round(st['lines'] / st['flushes'], 1)
+    avg_flush_time = round(st['flush_time'] / st['flushes'], 3)
+    logging.info('[WRITER] ' + str(st['flushes']) + ' flushes (' + str(st['flush_failures']) + ' failed), ' +
+                 str(st['lines']) + ' lines, ' + str(st['bytes']) + ' bytes, avg. ' + str(avg_lines) +
+                 ' lines/flush, avg. write time ' + str(avg_flush_time) + 's, max. ' +
+                 str(round(st['flush_time_max'], 3)) + 's. Reasons (bytes/lines/linger/cycle): ' +
+                 str(st['reason_bytes']) + '/' + str(st['reason_lines']) + '/' + str(st['reason_linger']) +
+                 '/' + str(st['reason_cycle']) + '.')
+    avg_queue_wait = round(st['queue_wait'] / st['flushes'], 3)
+    logging.info('[WRITER] Queue depth ' + str(writer.queue.qsize()) + ' (max. ' + str(st['queue_depth_max']) +
+                 '), avg. wait ' + str(avg_queue_wait) + 's, max. ' + str(round(st['queue_wait_max'], 3)) + 's, ' +
+                 str(st['queue_dropped']) + ' batches dropped, ' + str(st['queue_spilled']) + ' spilled to disk.')
+    avg_attempt_time = round(st['attempt_time'] / max(1, st['attempts']), 3)
+    if st['retries'] > 0 or st['rejected_lines'] > 0:
+        logging.info('[WRITER] ' + str(st['attempts']) + ' write attempts (' + str(st['retries']) + ' retries), avg. ' +
+                     str(avg_attempt_time) + 's, max. ' + str(round(st['attempt_time_max'], 3)) + 's, ' +
+                     str(st['rejected_lines']) + ' lines rejected in ' + str(st['partial_writes']) +
+                     ' partial writes.')
+    if st['gzip_writes'] > 0:
+        logging.info('[WRITER] ' + str(st['gzip_writes']) + ' gzip-compressed writes, ' + str(st['raw_bytes']) +
+                     ' bytes sent as ' + str(st['sent_bytes']) + ' (ratio: ' +
+                     str(round(st['raw_bytes'] / max(1, st['sent_bytes']), 2)) + '), compression CPU time ' +
+                     str(round(st['gzip_time'], 3)) + 's.')
+    spool = writer.spool
+    spool_stats = {'spooled': 0, 'replayed': 0, 'dropped': 0, 'evicted': 0}
+    if spool is not None:
+        spool_stats, spool.stats = spool.stats, dict.fromkeys(spool_stats, 0)
+        if spool.pending() or any(spool_stats.values()):
+            logging.info('[WRITER] Spool: ' + str(spool_stats['spooled']) + ' batches spooled, ' +
+                         str(spool_stats['replayed']) + ' replayed, ' + str(spool_stats['dropped']) +
+                         ' dropped on replay, ' + str(spool_stats['evicted']) + ' evicted, ' +
+                         str(spool.used_bytes()) + ' bytes pending.')
+    if args.no_instrumenting:
+        return
+    lp = LineProtocol()
+    lp.add('sfc_writer', [('cluster', CLUSTER_NAME)], [
+        ('flushes', st['flushes']),
+        ('flush_failures', st['flush_failures']),
+        ('lines', st['lines']),
+        ('bytes', st['bytes']),
+        ('flush_time_avg', avg_flush_time),
+        ('flush_time_max', round(st['flush_time_max'], 3)),
+        ('linger_time_max', round(st['linger_time_max'], 3)),
+        ('reason_bytes', st['reason_bytes']),
+        ('reason_lines', st['reason_lines']),
+        ('reason_linger', st['reason_linger']),
+        ('reason_cycle', st['reason_cycle']),
+        ('raw_bytes', st['raw_bytes']),
+        ('sent_bytes', st['sent_bytes']),
+        ('gzip_writes', st['gzip_writes']),
+        ('gzip_time', round(st['gzip_time'], 6)),
+        ('spooled', spool_stats['spooled']),
+        ('spool_replayed', spool_stats['replayed']),
+        ('spool_evicted', spool_stats['evicted']),
+        ('spool_bytes', spool.used_bytes() if spool is not None else 0),
+        ('queue_depth', writer.queue.qsize()),
+        ('queue_depth_max', st['queue_depth_max']),
+        ('queue_wait_avg', avg_queue_wait),
+        ('queue_wait_max', round(st['queue_wait_max'], 3)),
+        ('queue_dropped', st['queue_dropped']),
+        ('queue_spilled', st['queue_spilled']),
+        ('attempts', st['attempts']),
+        ('retries', st['retries']),
+        ('attempt_time_avg', avg_attempt_time),
+        ('attempt_time_max', round(st['attempt_time_max'], 3)),
+        ('partial_writes', st['partial_writes']),
+        ('rejected_lines', st['rejected_lines'])])
+    await lp.send()
+    await writer.flush('cycle')
+
+
 async def time_diff_epoch(t1: str, t2: str) -> tuple:
     """
     Calculate the difference between two timestamps in seconds and return a tuple with the first time and time delta in seconds.
@@ -2202,18 +4140,81 @@ async def time_diff_epoch(t1: str, t2: str) -> tuple:
     return ce_epoch
 
 
-async def run_sf_task(task_func, session, auth):
+async def run_sf_task(task_func, session, auth, cycle_lines=None):
     """
     Helper to run a SolidFire task with error handling for aiohttp and general exceptions.
+
+    LineProtocol payloads the task creates are appended to cycle_lines (if given). Returns False if the task failed
+    with a connection error (see run_tier_tasks()), otherwise True.
     """
+    if cycle_lines is not None:
+        CYCLE_LINES.set(cycle_lines)
     try:
         await task_func(session, auth)
+    except aiohttp.ClientConnectionError as e:
+        logging.error(f"Connection error in {task_func.__name__}: {e!r}")
+        return False
+    except asyncio.TimeoutError:
+        logging.error(f"SolidFire API call in {task_func.__name__} timed out.")
     except aiohttp.ContentTypeError as e:
         logging.error(f"ContentTypeError in {task_func.__name__}: {e}")
     except aiohttp.ClientResponseError as e:
         logging.error(f"ClientResponseError in {task_func.__name__}: {e}")
     except Exception as e:
         logging.error(f"Unhandled exception in {task_func.__name__}: {e}")
+    return True
+
+
+async def run_tier_tasks(tier, task_list, auth, deadline=None):
+    """
+    Run the collector tasks of a tier concurrently on the tier's pooled SolidFire API session.
+
+    Tasks that failed with a connection error (e.g. because the MVIP moved to another node) are run once more on
+    new connections. Their lines carry the iteration timestamp, so lines sent twice overwrite the same points.
+
+    Tasks still running at the cycle deadline (seconds, by default cycle_deadline() of the tier) are cancelled, so that a hung SolidFire API call
+    cannot make the scheduler skip the tier's next cycle. Lines they gathered but did not send yet are sent, and the
+    overrun is recorded (see _send_overrun_stat()).
+
+    Returns True if all tasks completed, i.e. none overran the deadline or failed with connection errors.
+    """
+    client = get_sf_client()
+    completed = True
+    if deadline is None:
+        deadline = cycle_deadline(tier)
+    cycle_end = time.monotonic() + deadline
+    for attempt in range(2):
+        session = client.session(tier)
+        cycle_lines = {t: [] for t in task_list}
+        tasks = {t: asyncio.ensure_future(run_sf_task(t, session, auth, cycle_lines[t])) for t in task_list}
+        try:
+            await asyncio.wait(tasks.values(), timeout=max(0.0, cycle_end - time.monotonic()))
+        finally:
+            overruns = [t for t in task_list if not tasks[t].done()]
+            for t in overruns:
+                tasks[t].cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for t in overruns:
+            # NOTE: lines of LineProtocol payloads the task built but did not send() before it was cancelled
+            lines = [line for lp in cycle_lines[t] for line in lp.lines]
+            logging.warning(t.__name__ + ' did not complete within the ' + tier + '-frequency cycle deadline (' +
+                            str(deadline) + 's) and was cancelled. Sending ' + str(len(lines)) + ' gathered lines.')
+            if lines:
+                await send_to_influx('\n'.join(lines))
+            await _send_overrun_stat(CLUSTER_NAME, tier, t.__name__, deadline, len(lines))
+        if overruns:
+            completed = False
+        task_list = [t for t in task_list if t not in overruns and not tasks[t].result()]
+        if not task_list:
+            return completed
+        if time.monotonic() >= cycle_end:
+            logging.error('SolidFire API connection errors in ' + ', '.join(t.__name__ for t in task_list) +
+                          '. No time left in the cycle to retry.')
+            return False
+        await client.reconnect(tier)
+    logging.error('SolidFire API connection errors in ' + ', '.join(t.__name__ for t in task_list) +
+                  ' persisted after reconnecting.')
+    return False
 
 
 async def hi_freq_tasks(auth):
@@ -2233,20 +4234,12 @@ async def hi_freq_tasks(auth):
         " of high-frequency tasks. Timestamp: " + str(CURRENT_TIMESTAMP) + 
         " (will be used by all tasks in this cycle)")
     
-    session = aiohttp.ClientSession(
-        connector=build_sf_connector(),
-        headers=sf_headers
-    )
     task_list = [cluster_faults, cluster_performance,
                  node_performance, volume_performance, sync_jobs]
     logging.info('High-frequency tasks: ' + str(len(task_list)))
-    bg_tasks = set()
-    for t in task_list:
-        task = asyncio.create_task(run_sf_task(t, session, auth))
-        bg_tasks.add(task)
-        task.add_done_callback(bg_tasks.discard)
-    await asyncio.gather(*bg_tasks)
-    await session.close()
+    await run_tier_tasks('hi', task_list, auth)
+    await _send_api_stats()
+    await _flush_writes()
     time_end = round(time.time(), 3)
     time_taken = max(0.0, round(time.time() - time_start, 3))
     logging.info('Completed combined high-frequency collection. Sending to InfluxDB next. Time taken: ' +
@@ -2259,22 +4252,14 @@ async def med_freq_tasks(auth):
     Run medium-frequency (5-30 min interval) tasks for less time-sensitive operation data.
     """
     time_start = round(time.time(), 3)
-    session = aiohttp.ClientSession(
-        connector=build_sf_connector(timeout_ceil_threshold=15),
-        headers=sf_headers
-    )
     task_list = [accounts, cluster_capacity, iscsi_sessions, volumes]
     logging.info('Medium-frequency tasks: ' + str(len(task_list)))
-    bg_tasks = set()
-    for t in task_list:
-        task = asyncio.create_task(run_sf_task(t, session, auth))
-        bg_tasks.add(task)
-        task.add_done_callback(bg_tasks.discard)
-    await asyncio.gather(*bg_tasks)
-    await session.close()
+    await run_tier_tasks('med', task_list, auth)
+    await _send_api_stats()
+    await _flush_writes()
     time_end = round(time.time(), 3)
     time_taken = max(0.0, round(time.time() - time_start, 3))
-    logging.info('Completed medium-frequency collection and closed aiohttp session. Time taken: ' +
+    logging.info('Completed medium-frequency collection. Time taken: ' +
                  str(time_taken) + ' seconds.')
     return
 
@@ -2284,45 +4269,56 @@ async def lo_freq_tasks(auth):
     Run low-frequency (0.5-3 hour interval) tasks for non-time-sensitive metrics and events.
     """
     time_start = round(time.time(), 3)
-    session = aiohttp.ClientSession(
-        connector=build_sf_connector(timeout_ceil_threshold=30),
-        headers=sf_headers
-    )
     task_list = [account_efficiency, cluster_version,
                  drive_stats, schedules, volume_efficiency]
+    if EFFICIENCY_ROTATION is not None:
+        # NOTE: account and volume efficiency are collected one slice at a time by efficiency_tasks()
+        task_list = [t for t in task_list if t not in (account_efficiency, volume_efficiency)]
     logging.info('Low-frequency tasks: ' + str(len(task_list)))
-    bg_tasks = set()
-    for t in task_list:
-        task = asyncio.create_task(run_sf_task(t, session, auth))
-        bg_tasks.add(task)
-        task.add_done_callback(bg_tasks.discard)
-    await asyncio.gather(*bg_tasks)
-    await session.close()
+    await run_tier_tasks('lo', task_list, auth)
+    await _send_api_stats()
+    await _flush_writes()
     time_end = round(time.time(), 3)
     time_taken = max(0.0, round(time.time() - time_start, 3))
-    logging.info('Completed low-frequency collection and closed aiohttp session. Time taken: ' +
+    logging.info('Completed low-frequency collection. Time taken: ' +
                  str(time_taken) + ' seconds.')
     return
 
 
+async def efficiency_tasks(auth):
+    """
+    Run account and volume efficiency collection for the current slice of accounts and volumes (see EfficiencyRotation).
+    """
+    time_start = round(time.time(), 3)
+    rotation = EFFICIENCY_ROTATION
+    task_list = [account_efficiency, volume_efficiency]
+    logging.info('Efficiency tasks for slice ' + str(rotation.slice + 1) + '/' + str(rotation.slices) + ' of round ' +
+                 str(rotation.round) + ': ' + str(len(task_list)))
+    # NOTE: ticks run on their own session, so a reconnect of the low-frequency tier does not close it mid-tick
+    completed = await run_tier_tasks('efficiency', task_list, auth)
+    if completed and rotation.complete():
+        await _send_rotation_stat(CLUSTER_NAME, rotation, rotation.advance())
+    else:
+        rotation.discard()
+        logging.warning('Efficiency collection of slice ' + str(rotation.slice + 1) + '/' + str(rotation.slices) +
+                        ' did not complete. The slice will be collected again in the next tick.')
+    await _send_api_stats()
+    await _flush_writes()
+    time_taken = max(0.0, round(time.time() - time_start, 3))
+    logging.info('Completed efficiency collection of slice. Time taken: ' + str(time_taken) + ' seconds.')
+    return
+
+
 async def experimental(auth):
     """
     Runs one or more medium-frequency and experimental collector tasks.
     """
     time_start = round(time.time(), 3)
-    session = aiohttp.ClientSession(
-        connector=build_sf_connector(timeout_ceil_threshold=20),
-        headers=sf_headers
-    )
     task_list = [schedules, snapshot_groups, volume_qos_histograms]
     logging.info('Experimental tasks: ' + str(len(task_list)))
-    bg_tasks = set()
-    for t in task_list:
-        task = asyncio.create_task(run_sf_task(t, session, auth))
-        bg_tasks.add(task)
-        task.add_done_callback(bg_tasks.discard)
-    await asyncio.gather(*bg_tasks)
-    await session.close()
+    await run_tier_tasks('experimental', task_list, auth)
+    await _send_api_stats()
+    await _flush_writes()
     time_end = round(time.time(), 3)
     time_taken = max(0.0, round(time.time() - time_start, 3))
     logging.info('Completed combined experimental collection. Sending to InfluxDB next. Time taken: ' +
@@ -2336,21 +4332,19 @@ async def get_cluster_name(auth):
     """
     time_start = round(time.time(), 3)
     url = SF_URL + SF_JSON_PATH + '?method=GetClusterInfo'
-    async with aiohttp.ClientSession(
-        connector=build_sf_connector(force_close=True),
-        headers=sf_headers, 
-    ) as session:
-        async with session.get(url, allow_redirects=True) as resp:
-            if resp.status != 200:
-                text = await resp.text()
-                logging.error(f"Failed to get cluster info. Status: {resp.status}, Response: {text}")
-                raise RuntimeError(f"Failed to get cluster info. Status: {resp.status}")
-            try:
-                result = await resp.json(content_type=None)
-            except Exception:
-                text = await resp.text()
-                logging.error(f"Failed to decode JSON: {text}")
-                raise
+    # NOTE: the connection is kept in the hi-frequency pool for the first collection cycle
+    session = get_sf_client().session('hi')
+    async with session.get(url, allow_redirects=True) as resp:
+        if resp.status != 200:
+            text = await resp.text()
+            logging.error(f"Failed to get cluster info. Status: {resp.status}, Response: {text}")
+            raise RuntimeError(f"Failed to get cluster info. Status: {resp.status}")
+        try:
+            result = await sf_response_json(resp)
+        except Exception:
+            text = await resp.text()
+            logging.error(f"Failed to decode JSON: {text}")
+            raise
     cluster_name = result['result']['clusterInfo']['name']
     time_end = round(time.time(), 3)
     time_taken = round(time_end - time_start, 3)
@@ -2364,7 +4358,7 @@ async def get_cluster_name(auth):
 
 
 async def main():
-    global ITERATION, CLUSTER_NAME, SF_URL, SF_JSON_PATH, SF_POST_URL, args, INFLUXDB3_AUTH_TOKEN
+    global ITERATION, CLUSTER_NAME, SF_URL, SF_JSON_PATH, SF_POST_URL, args, INFLUXDB3_AUTH_TOKEN, EFFICIENCY_ROTATION
     ITERATION = 0
     
     # Load InfluxDB token from file if INFLUXDB3_AUTH_TOKEN_FILE is set
@@ -2387,53 +4381,61 @@ async def main():
     auth_str = base64.b64encode(f"{args.username}:{args.password}".encode("utf-8")).decode("utf-8")
     sf_headers['Authorization'] = f"Basic {auth_str}"
     auth = None
-    CLUSTER_NAME = await get_cluster_name(auth)
-    
-    # Ensure InfluxDB database exists or create it
-    database_ready = await create_database_v3(INFLUX_DB)
-    if not database_ready:
-        logging.error(f"Failed to create or verify database '{INFLUX_DB}'. Exiting.")
-        sys.exit(1)
-    # Example: schedule hi/med/lo freq tasks with auth
-    scheduler = AsyncIOScheduler(misfire_grace_time=10)
-    scheduler.add_job(hi_freq_tasks, 'interval', seconds=INT_HI_FREQ, max_instances=1, args=[auth])
-    scheduler.add_job(med_freq_tasks, 'interval', seconds=INT_MED_FREQ, max_instances=1, args=[auth])
-    scheduler.add_job(lo_freq_tasks, 'interval', seconds=INT_LO_FREQ, max_instances=1, args=[auth])
-    scheduler.start()
-    while True:
-        await asyncio.sleep(3600)
+
+    # One SolidFire API client and one InfluxDB writer (and their connection pools) for the lifetime of the process
+    sf_client = get_sf_client()
+    influx_writer = get_influx_writer()
+    if INFLUX_SPOOL_DIR:
+        influx_writer.spool = WriteSpool(INFLUX_SPOOL_DIR, INFLUX_SPOOL_MAX_BYTES, INFLUX_SPOOL_SEGMENT_BYTES)
+    scheduler = None
+    try:
+        CLUSTER_NAME = await get_cluster_name(auth)
+        # Ensure InfluxDB database exists or create it
+        database_ready = await create_database_v3(INFLUX_DB)
+        if not database_ready:
+            logging.error(f"Failed to create or verify database '{INFLUX_DB}'. Exiting.")
+            sys.exit(1)
+        # Send batches left in the spool by a previous run
+        influx_writer.replay_spool()
+        # Example: schedule hi/med/lo freq tasks with auth
+        scheduler = AsyncIOScheduler(misfire_grace_time=10)
+        scheduler.add_job(hi_freq_tasks, 'interval', seconds=INT_HI_FREQ, max_instances=1, args=[auth])
+        scheduler.add_job(med_freq_tasks, 'interval', seconds=INT_MED_FREQ, max_instances=1, args=[auth])
+        scheduler.add_job(lo_freq_tasks, 'interval', seconds=INT_LO_FREQ, max_instances=1, args=[auth])
+        if EFFICIENCY_SLICES > 1:
+            EFFICIENCY_ROTATION = EfficiencyRotation(EFFICIENCY_SLICES, EFFICIENCY_STATE_FILE)
+            scheduler.add_job(efficiency_tasks, 'interval', seconds=INT_LO_FREQ / EFFICIENCY_SLICES, max_instances=1,
+                              args=[auth])
+        scheduler.start()
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        if scheduler is not None and scheduler.running:
+            scheduler.shutdown(wait=False)
+        await sf_client.close()
+        await influx_writer.close()
 
 
 async def run_all_sf_tasks(auth):
     """
-    Create dedicated session for SolidFire API calls with correct auth and headers, and run all SF tasks.
-    """
-    async with aiohttp.ClientSession(
-        connector=build_sf_connector(),
-        headers=sf_headers
-    ) as session:
-        task_list = [
-            cluster_faults,
-            cluster_performance,
-            node_performance,
-            volume_performance,
-            sync_jobs,
-            accounts,
-            account_efficiency,
-            volume_efficiency,
-            cluster_capacity,
-            cluster_version,
-            drive_stats,
-            schedules,
-            snapshot_groups,
-            volumes]
-        bg_tasks = set()
-        for t in task_list:
-            task = asyncio.create_task(run_sf_task(t, session, auth))
-            bg_tasks.add(task)
-            task.add_done_callback(bg_tasks.discard)
-        await asyncio.gather(*bg_tasks)
-
+    Run all SF tasks on the pooled SolidFire API session of the hi-frequency tier.
+    """
+    task_list = [
+        cluster_faults,
+        cluster_performance,
+        node_performance,
+        volume_performance,
+        sync_jobs,
+        accounts,
+        account_efficiency,
+        volume_efficiency,
+        cluster_capacity,
+        cluster_version,
+        drive_stats,
+        schedules,
+        snapshot_groups,
+        volumes]
+    await run_tier_tasks('hi', task_list, auth)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -2565,6 +4567,129 @@ if __name__ == '__main__':
         help='Disable TLS certificate verification for SolidFire API calls (insecure). Prefer using trusted CA certificates instead. Default: False')
     parser.add_argument('--no-instrumenting', action='store_true', required=False,
                         help='Disable function performance instrumentation to improve collection speed when InfluxDB writes are slow.')
+    parser.add_argument('--no-columnar', action='store_true', required=False,
+                        help='Encode volume performance per record even when NumPy is installed.')
+    parser.add_argument('--api-rate-max', type=float, required=False,
+                        default=float(os.environ.get('SF_RATE_MAX', SF_RATE_MAX)),
+                        help='max. number of SolidFire API requests per second (all tiers). The rate is reduced automatically when API latency or errors rise. Default: ' +
+                        str(SF_RATE_MAX))
+    parser.add_argument('--api-max-in-flight', type=int, required=False,
+                        default=int(os.environ.get('SF_MAX_IN_FLIGHT', SF_MAX_IN_FLIGHT)),
+                        help='max. number of concurrent SolidFire API requests (all tiers). Default: ' + str(SF_MAX_IN_FLIGHT))
+    parser.add_argument('--api-latency-target', type=float, required=False,
+                        default=float(os.environ.get('SF_LATENCY_TARGET', SF_LATENCY_TARGET)),
+                        help='SolidFire API requests slower than this (seconds) make SFC reduce its API request rate and concurrency. Default: ' +
+                        str(SF_LATENCY_TARGET))
+    parser.add_argument('--cycle-deadline', type=float, required=False,
+                        default=float(os.environ.get('CYCLE_DEADLINE_FRACTION', CYCLE_DEADLINE_FRACTION)),
+                        help='fraction (0.1-1.0) of a collection interval after which collectors still running are cancelled and the data they gathered is sent. Default: ' +
+                        str(CYCLE_DEADLINE_FRACTION))
+    parser.add_argument('--api-call-timeout', type=float, required=False,
+                        default=float(os.environ.get('SF_CALL_TIMEOUT', SF_CALL_TIMEOUT)),
+                        help='max. time (seconds) of a SolidFire API call; calls also time out after half of the cycle deadline. Default: ' +
+                        str(SF_CALL_TIMEOUT))
+    parser.add_argument('--no-api-cache', action='store_true', required=False,
+                        help='Do not share SolidFire API responses (ListVolumes, ListAccounts) between collectors; every collector requests its own.')
+    parser.add_argument('--json-codec', type=str, required=False, choices=['json', 'orjson'],
+                        default=os.environ.get('SF_JSON_CODEC', SF_JSON_CODEC),
+                        help='JSON decoder for SolidFire API responses. orjson is faster but optional. Default: ' +
+                        SF_JSON_CODEC)
+    parser.add_argument('--qos-histograms', type=str, required=False, choices=['buckets', 'summary', 'both'],
+                        default=os.environ.get('QOS_HISTOGRAM_OUTPUT', QOS_HISTOGRAM_OUTPUT),
+                        help='experimental volume QoS histograms output: raw bucket counts, a histogram_summary line per volume with approximate p50/p90/p99 and mean of each histogram (requires NumPy, otherwise bucket counts are sent), or both. Bucket counts are needed for per-bucket dashboards but take six series per volume. Default: ' +
+                        QOS_HISTOGRAM_OUTPUT)
+    parser.add_argument('--stream-json', action='store_true', required=False,
+                        help='Decode large SolidFire API responses (volumes, iSCSI sessions, QoS histograms) incrementally as they arrive instead of all at once, to reduce peak memory use.')
+    parser.add_argument('--list-volumes-page-size', type=int, required=False,
+                        default=int(os.environ.get('LIST_VOLUMES_PAGE_SIZE', LIST_VOLUMES_PAGE_SIZE)),
+                        help='number of volumes per ListVolumes request. Volumes are processed and sent one page at a time. Default: ' +
+                        str(LIST_VOLUMES_PAGE_SIZE))
+    parser.add_argument('--chunk-size', type=int, required=False,
+                        default=int(os.environ.get('CHUNK_SIZE', CHUNK_SIZE)),
+                        help='number of volumes per batched SolidFire API call (initial value when the chunk size is adaptive). Default: ' +
+                        str(CHUNK_SIZE))
+    parser.add_argument('--chunk-size-max', type=int, required=False,
+                        default=int(os.environ.get('CHUNK_SIZE_MAX', CHUNK_SIZE_MAX)),
+                        help='max. adaptive chunk size of batched SolidFire API calls. Default: ' + str(CHUNK_SIZE_MAX))
+    parser.add_argument('--chunk-latency-ceiling', type=float, required=False,
+                        default=float(os.environ.get('CHUNK_LATENCY_CEILING', CHUNK_LATENCY_CEILING)),
+                        help='max. seconds a batched SolidFire API call should take; the adaptive chunk size shrinks above it. Default: ' +
+                        str(CHUNK_LATENCY_CEILING))
+    parser.add_argument('--fixed-chunk-size', action='store_true', required=False,
+                        help='Always use --chunk-size for batched SolidFire API calls instead of adapting it to API latency.')
+    parser.add_argument('--volume-stats-concurrency', type=int, required=False,
+                        default=int(os.environ.get('VOLUME_STATS_CONCURRENCY', VOLUME_STATS_CONCURRENCY)),
+                        help='max. number of concurrent ListVolumeStats requests in volume performance collection. Default: ' +
+                        str(VOLUME_STATS_CONCURRENCY))
+    parser.add_argument('--volume-efficiency-concurrency', type=int, required=False,
+                        default=int(os.environ.get('VOLUME_EFFICIENCY_CONCURRENCY', VOLUME_EFFICIENCY_CONCURRENCY)),
+                        help='max. number of concurrent GetVolumeEfficiency requests in volume efficiency collection. Default: ' +
+                        str(VOLUME_EFFICIENCY_CONCURRENCY))
+    parser.add_argument('--account-efficiency-concurrency', type=int, required=False,
+                        default=int(os.environ.get('ACCOUNT_EFFICIENCY_CONCURRENCY', ACCOUNT_EFFICIENCY_CONCURRENCY)),
+                        help='max. number of concurrent GetAccountEfficiency requests in account efficiency collection. Default: ' +
+                        str(ACCOUNT_EFFICIENCY_CONCURRENCY))
+    parser.add_argument('--efficiency-slices', type=int, required=False,
+                        default=int(os.environ.get('EFFICIENCY_SLICES', EFFICIENCY_SLICES)),
+                        help='collect account and volume efficiency in this many slices (by ID), one slice per 1/N of the low-frequency interval, instead of all at once. Default: ' +
+                        str(EFFICIENCY_SLICES) + ' (all at once)')
+    parser.add_argument('--efficiency-state-file', type=str, required=False,
+                        default=os.environ.get('EFFICIENCY_STATE_FILE', EFFICIENCY_STATE_FILE),
+                        help='file where the progress of sliced efficiency collection is saved, so that it continues with the next slice after a restart. Default: None (not saved)')
+    parser.add_argument('--write-max-bytes', type=int, required=False,
+                        default=int(os.environ.get('INFLUX_WRITE_MAX_BYTES', INFLUX_WRITE_MAX_BYTES)),
+                        help='flush buffered InfluxDB writes when they reach this size (approximate bytes). Default: ' +
+                        str(INFLUX_WRITE_MAX_BYTES))
+    parser.add_argument('--write-max-lines', type=int, required=False,
+                        default=int(os.environ.get('INFLUX_WRITE_MAX_LINES', INFLUX_WRITE_MAX_LINES)),
+                        help='flush buffered InfluxDB writes when they reach this number of lines. Default: ' +
+                        str(INFLUX_WRITE_MAX_LINES))
+    parser.add_argument('--write-linger', type=float, required=False,
+                        default=float(os.environ.get('INFLUX_WRITE_LINGER', INFLUX_WRITE_LINGER)),
+                        help='max. seconds buffered InfluxDB writes may wait before they are flushed. 0 disables write coalescing. Default: ' +
+                        str(INFLUX_WRITE_LINGER))
+    parser.add_argument('--write-gzip-level', type=int, required=False, choices=range(0, 10), metavar='{0-9}',
+                        default=int(os.environ.get('INFLUX_WRITE_GZIP_LEVEL', INFLUX_WRITE_GZIP_LEVEL)),
+                        help='gzip compression level for InfluxDB write bodies (1-9). 0 disables compression. Default: ' +
+                        str(INFLUX_WRITE_GZIP_LEVEL))
+    parser.add_argument('--write-gzip-min-bytes', type=int, required=False,
+                        default=int(os.environ.get('INFLUX_WRITE_GZIP_MIN_BYTES', INFLUX_WRITE_GZIP_MIN_BYTES)),
+                        help='do not compress InfluxDB write bodies smaller than this (bytes). Default: ' +
+                        str(INFLUX_WRITE_GZIP_MIN_BYTES))
+    parser.add_argument('--write-workers', type=int, required=False,
+                        default=int(os.environ.get('INFLUX_WRITE_WORKERS', INFLUX_WRITE_WORKERS)),
+                        help='number of concurrent InfluxDB writer tasks. Default: ' + str(INFLUX_WRITE_WORKERS))
+    parser.add_argument('--write-queue-size', type=int, required=False,
+                        default=int(os.environ.get('INFLUX_WRITE_QUEUE_SIZE', INFLUX_WRITE_QUEUE_SIZE)),
+                        help='max. number of batches waiting to be written to InfluxDB. Default: ' +
+                        str(INFLUX_WRITE_QUEUE_SIZE))
+    parser.add_argument('--write-queue-policy', type=str, required=False,
+                        default=os.environ.get('INFLUX_WRITE_QUEUE_POLICY', INFLUX_WRITE_QUEUE_POLICY),
+                        choices=['block', 'drop-oldest', 'spill'],
+                        help='what to do when the InfluxDB write queue is full: block collectors, drop the oldest batch or spill to the on-disk spool (requires --spool-dir). Default: ' +
+                        INFLUX_WRITE_QUEUE_POLICY)
+    parser.add_argument('--write-retries', type=int, required=False,
+                        default=int(os.environ.get('INFLUX_WRITE_RETRIES', INFLUX_WRITE_RETRIES)),
+                        help='max. number of retries of an InfluxDB write that timed out or failed with 429 or 5xx. Default: ' +
+                        str(INFLUX_WRITE_RETRIES))
+    parser.add_argument('--write-backoff', type=float, required=False,
+                        default=float(os.environ.get('INFLUX_WRITE_BACKOFF', INFLUX_WRITE_BACKOFF)),
+                        help='base delay in seconds for jittered exponential backoff between InfluxDB write retries. Default: ' +
+                        str(INFLUX_WRITE_BACKOFF))
+    parser.add_argument('--quarantine-file', type=str, required=False,
+                        default=os.environ.get('INFLUX_QUARANTINE_FILE', INFLUX_QUARANTINE_FILE),
+                        help='file to which lines rejected by InfluxDB are appended. Default: none (rejected lines are only logged)')
+    parser.add_argument('--spool-dir', type=str, required=False,
+                        default=os.environ.get('INFLUX_SPOOL_DIR', INFLUX_SPOOL_DIR),
+                        help='directory for the on-disk spool of InfluxDB writes that failed with a transient error. Spooled data is replayed when InfluxDB recovers. Default: None (disabled)')
+    parser.add_argument('--spool-max-bytes', type=int, required=False,
+                        default=int(os.environ.get('INFLUX_SPOOL_MAX_BYTES', INFLUX_SPOOL_MAX_BYTES)),
+                        help='max. size of the on-disk spool; the oldest data is evicted above it. Default: ' +
+                        str(INFLUX_SPOOL_MAX_BYTES))
+    parser.add_argument('--spool-replay-rate', type=float, required=False,
+                        default=float(os.environ.get('INFLUX_SPOOL_REPLAY_RATE', INFLUX_SPOOL_REPLAY_RATE)),
+                        help='max. number of spooled batches replayed per second. Default: ' +
+                        str(INFLUX_SPOOL_REPLAY_RATE))
     parser.add_argument('-v', '--version', action='store_true', required=False,
                         help='Show program version and exit.')
     args = parser.parse_args()
@@ -2682,6 +4807,86 @@ if __name__ == '__main__':
     if args.influxdb_name is not None:
         INFLUX_DB = args.influxdb_name
     
+    SF_RATE_MAX = max(SF_RATE_MIN, args.api_rate_max)
+    SF_MAX_IN_FLIGHT = max(1, args.api_max_in_flight)
+    SF_LATENCY_TARGET = max(0.1, args.api_latency_target)
+    logging.info('SolidFire API governor: max. ' + str(SF_RATE_MAX) + ' requests/s, ' + str(SF_MAX_IN_FLIGHT) +
+                 ' concurrent requests, latency target ' + str(SF_LATENCY_TARGET) + 's.')
+    CYCLE_DEADLINE_FRACTION = min(1.0, max(0.1, args.cycle_deadline))
+    SF_CALL_TIMEOUT = max(1.0, args.api_call_timeout)
+    logging.info('Collection cycle deadline: ' + str(CYCLE_DEADLINE_FRACTION) + ' of the interval, SolidFire API ' +
+                 'call timeout: ' + str(SF_CALL_TIMEOUT) + 's.')
+    if args.no_api_cache:
+        SF_CACHE_TTL = {}
+        logging.info('SolidFire API response cache disabled.')
+    else:
+        logging.info('SolidFire API response cache TTLs: ' + str(SF_CACHE_TTL) + '.')
+    SF_JSON_CODEC = args.json_codec
+    if SF_JSON_CODEC not in JSON_CODECS:
+        logging.warning('JSON codec ' + SF_JSON_CODEC + ' is not installed. Using json instead.')
+        SF_JSON_CODEC = 'json'
+    logging.info('SolidFire API responses are decoded with ' + SF_JSON_CODEC + '.')
+    QOS_HISTOGRAM_OUTPUT = args.qos_histograms
+    if QOS_HISTOGRAM_OUTPUT != 'buckets' and np is None:
+        logging.warning('QoS histogram summaries require NumPy, which is not installed. Sending bucket counts only.')
+        QOS_HISTOGRAM_OUTPUT = 'buckets'
+    LIST_VOLUMES_PAGE_SIZE = max(1, args.list_volumes_page_size)
+    CHUNK_SIZE = max(1, args.chunk_size)
+    CHUNK_SIZE_MAX = max(CHUNK_SIZE, args.chunk_size_max)
+    CHUNK_SIZE_MIN = min(CHUNK_SIZE_MIN, CHUNK_SIZE)
+    CHUNK_LATENCY_CEILING = max(0.1, args.chunk_latency_ceiling)
+    if args.fixed_chunk_size:
+        logging.info('Chunk size of batched SolidFire API calls: ' + str(CHUNK_SIZE) + ' (fixed).')
+    else:
+        logging.info('Chunk size of batched SolidFire API calls: ' + str(CHUNK_SIZE) + ' (adaptive, ' +
+                     str(CHUNK_SIZE_MIN) + '-' + str(CHUNK_SIZE_MAX) + ', latency ceiling ' +
+                     str(CHUNK_LATENCY_CEILING) + 's).')
+    VOLUME_STATS_CONCURRENCY = max(1, args.volume_stats_concurrency)
+    if VOLUME_STATS_CONCURRENCY > SF_POOL_SIZE['hi']:
+        logging.warning('Volume stats concurrency (' + str(VOLUME_STATS_CONCURRENCY) + ') is higher than the ' +
+                        'hi-frequency SolidFire connection pool (' + str(SF_POOL_SIZE['hi']) + '). Extra requests ' +
+                        'wait for a free connection.')
+    VOLUME_EFFICIENCY_CONCURRENCY = max(1, args.volume_efficiency_concurrency)
+    ACCOUNT_EFFICIENCY_CONCURRENCY = max(1, args.account_efficiency_concurrency)
+    EFFICIENCY_SLICES = max(1, args.efficiency_slices)
+    EFFICIENCY_STATE_FILE = args.efficiency_state_file
+    if EFFICIENCY_SLICES > 1:
+        logging.info('Account and volume efficiency collected in ' + str(EFFICIENCY_SLICES) + ' slices, one every ' +
+                     str(round(INT_LO_FREQ / EFFICIENCY_SLICES, 1)) + ' seconds. State file: ' +
+                     str(EFFICIENCY_STATE_FILE) + '.')
+
+    INFLUX_WRITE_MAX_BYTES = args.write_max_bytes
+    INFLUX_WRITE_MAX_LINES = args.write_max_lines
+    INFLUX_WRITE_LINGER = args.write_linger
+    logging.info('InfluxDB write coalescing: max. ' + str(INFLUX_WRITE_MAX_BYTES) + ' bytes, ' +
+                 str(INFLUX_WRITE_MAX_LINES) + ' lines, ' + str(INFLUX_WRITE_LINGER) + ' seconds linger time.')
+    INFLUX_WRITE_GZIP_LEVEL = args.write_gzip_level
+    INFLUX_WRITE_GZIP_MIN_BYTES = args.write_gzip_min_bytes
+    if INFLUX_WRITE_GZIP_LEVEL > 0:
+        logging.info('InfluxDB write compression: gzip level ' + str(INFLUX_WRITE_GZIP_LEVEL) + ' for bodies of ' +
+                     str(INFLUX_WRITE_GZIP_MIN_BYTES) + ' bytes or more.')
+    INFLUX_WRITE_WORKERS = max(1, args.write_workers)
+    INFLUX_WRITE_QUEUE_SIZE = max(1, args.write_queue_size)
+    INFLUX_WRITE_QUEUE_POLICY = args.write_queue_policy
+    if INFLUX_WRITE_QUEUE_POLICY == 'spill' and not args.spool_dir:
+        logging.warning('InfluxDB write queue policy "spill" requires --spool-dir. Using "block" instead.')
+        INFLUX_WRITE_QUEUE_POLICY = 'block'
+    logging.info('InfluxDB write queue: ' + str(INFLUX_WRITE_QUEUE_SIZE) + ' batches, ' +
+                 str(INFLUX_WRITE_WORKERS) + ' writers, policy when full: ' + INFLUX_WRITE_QUEUE_POLICY + '.')
+    INFLUX_WRITE_RETRIES = max(0, args.write_retries)
+    INFLUX_WRITE_BACKOFF = max(0.0, args.write_backoff)
+    INFLUX_QUARANTINE_FILE = args.quarantine_file
+    logging.info('InfluxDB write retries: ' + str(INFLUX_WRITE_RETRIES) + ', backoff: ' + str(INFLUX_WRITE_BACKOFF) +
+                 's (max. ' + str(INFLUX_WRITE_BACKOFF_MAX) + 's), quarantine file: ' + str(INFLUX_QUARANTINE_FILE) + '.')
+    INFLUX_SPOOL_DIR = args.spool_dir
+    INFLUX_SPOOL_MAX_BYTES = args.spool_max_bytes
+    INFLUX_SPOOL_REPLAY_RATE = max(0.1, args.spool_replay_rate)
+    if INFLUX_SPOOL_DIR:
+        logging.info('InfluxDB write spool: ' + INFLUX_SPOOL_DIR + ' (max. ' + str(INFLUX_SPOOL_MAX_BYTES) +
+                     ' bytes, replay rate ' + str(INFLUX_SPOOL_REPLAY_RATE) + ' batches/s).')
+    else:
+        logging.info('InfluxDB write spool disabled. Failed writes are logged and dropped.')
+
     # Debug logging for container environment
     logging.info(f"InfluxDB connection: {INFLUX_HOST}:{INFLUX_PORT}, Database: {INFLUX_DB}")
     logging.info(f"InfluxDB token length: {len(INFLUXDB3_AUTH_TOKEN)} characters")
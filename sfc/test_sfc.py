@@ -0,0 +1,971 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Synopsis:                                                                   #
+# Tests of SFC (run with: python -m pytest sfc)                               #
+#                                                                             #
+# Author: @scaleoutSean (Github)                                              #
+# Repository: https://github.com/scaleoutsean/sfc                             #
+# License: the Apache License Version 2.0                                     #
+###############################################################################
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+
+import pytest
+import yarl
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sfc  # noqa: E402
+
+
+def test_columnar_encoding_matches_per_record_with_none_and_ints():
+    """
+    A column mixing None and ints (an object array) must be cast like in the per-record path, e.g.
+    volumeUtilization 0 is sent as the float 0.0, never as the integer 0i.
+    """
+    pytest.importorskip('numpy')
+    schema = sfc.MEASUREMENT_SCHEMAS['volume_performance']
+    records = [{'volumeID': 1, 'actualIOPS': 10, 'throttle': 0, 'volumeUtilization': None},
+               {'volumeID': 2, 'actualIOPS': 20, 'throttle': 0.25, 'volumeUtilization': 0},
+               {'volumeID': 3, 'actualIOPS': 30, 'throttle': 1, 'volumeUtilization': 1}]
+    per_record = sfc.LineProtocol()
+    for record in records:
+        schema.add(per_record, record, tags=[('cluster', 'c1'), ('id', record['volumeID'])])
+    columnar = sfc.LineProtocol()
+    columns = schema.columns(records)
+    columns['volumeID'] = sfc._np_column([record['volumeID'] for record in records])
+    assert columns['volumeUtilization'].dtype.kind == 'O'
+    schema.add_columns(columnar, columns, tags=[('cluster', 'c1'), ('id', columns['volumeID'])])
+    assert columnar.lines == per_record.lines
+    assert 'volume_utilization=0.0' in columnar.lines[1]
+    assert 'volume_utilization=1.0' in columnar.lines[2]
+
+
+def test_cancelled_enqueue_returns_batch_to_buffer(monkeypatch):
+    """
+    A flush cancelled while it waits for a slot in the full write queue must not lose its batch.
+    """
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_QUEUE_SIZE', 1)
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_QUEUE_POLICY', 'block')
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_LINGER', 0)
+    # NOTE: without writers the queue is not drained, so the second flush blocks
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_WORKERS', 0)
+
+    async def run():
+        writer = sfc.InfluxWriter()
+        assert await writer.submit('m f=1i 1', 1)
+        blocked = asyncio.ensure_future(writer.submit('m f=2i 2', 1))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        blocked.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await blocked
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.buffer == ['m f=2i 2']
+    assert (writer.buffer_lines, writer.buffer_bytes) == (1, len('m f=2i 2'))
+    assert writer.queue.qsize() == 1
+
+
+def _full_queue_writer(monkeypatch, policy):
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_QUEUE_SIZE', 1)
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_QUEUE_POLICY', policy)
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_LINGER', 0)
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_WORKERS', 0)
+    return sfc.InfluxWriter()
+
+
+def test_full_queue_drop_oldest_policy(monkeypatch):
+    """
+    With the 'drop-oldest' policy a flush into the full queue replaces the oldest batch without waiting.
+    """
+    async def run():
+        writer = _full_queue_writer(monkeypatch, 'drop-oldest')
+        assert await writer.submit('m f=1i 1', 1)
+        assert await asyncio.wait_for(writer.submit('m f=2i 2', 1), 1)
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.stats['queue_dropped'] == 1
+    assert writer.queue.qsize() == 1
+    assert writer.queue.get_nowait()[0] == 'm f=2i 2'
+    assert writer.buffer == []
+
+
+def test_full_queue_spill_policy(monkeypatch, tmp_path):
+    """
+    With the 'spill' policy a flush into the full queue goes to the spool without waiting.
+    """
+    async def run():
+        writer = _full_queue_writer(monkeypatch, 'spill')
+        writer.spool = sfc.WriteSpool(str(tmp_path), 1 << 20, 1 << 16)
+        assert await writer.submit('m f=1i 1', 1)
+        assert await asyncio.wait_for(writer.submit('m f=2i 2', 1), 1)
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.stats['queue_spilled'] == 1
+    assert writer.queue.get_nowait()[0] == 'm f=1i 1'
+    writer.spool.close()
+    assert [data for name in writer.spool.segments for _, data in writer.spool._records(name, 0)] == [b'm f=2i 2']
+
+
+class FakeWriter:
+    """
+    Stands in for InfluxWriter in spool replay: records written bodies and returns the given statuses in turn.
+    """
+
+    def __init__(self, statuses=()):
+        self.bodies = []
+        self.statuses = list(statuses)
+
+    async def write(self, body, measurement):
+        self.bodies.append(body)
+        return self.statuses.pop(0) if self.statuses else 204
+
+
+def _spooled(spool):
+    return [data.decode() for name in spool.segments for _, data in spool._records(name, 0)]
+
+
+def test_spool_append_then_replay_in_order(monkeypatch, tmp_path):
+    monkeypatch.setattr(sfc, 'INFLUX_SPOOL_REPLAY_RATE', 1000.0)
+    spool = sfc.WriteSpool(str(tmp_path), 1 << 20, 1 << 16)
+    bodies = ['m f=' + str(i) + 'i ' + str(1767225600 + i) for i in range(5)]
+    for body in bodies:
+        spool.append(body)
+    assert spool.pending()
+    writer = FakeWriter()
+    asyncio.run(spool.replay(writer))
+    assert writer.bodies == bodies
+    assert not spool.pending()
+    assert spool.stats['replayed'] == 5
+    assert os.listdir(tmp_path) == []
+
+
+def test_spool_replay_pauses_on_transient_failure(monkeypatch, tmp_path):
+    monkeypatch.setattr(sfc, 'INFLUX_SPOOL_REPLAY_RATE', 1000.0)
+    spool = sfc.WriteSpool(str(tmp_path), 1 << 20, 1 << 16)
+    for i in range(3):
+        spool.append('m f=' + str(i) + 'i')
+    writer = FakeWriter([204, 503])
+    asyncio.run(spool.replay(writer))
+    assert writer.bodies == ['m f=0i', 'm f=1i']
+    assert _spooled(spool) == ['m f=1i', 'm f=2i']
+    writer = FakeWriter()
+    asyncio.run(spool.replay(writer))
+    assert writer.bodies == ['m f=1i', 'm f=2i']
+    assert not spool.pending()
+
+
+def test_spool_skips_corrupted_record(monkeypatch, tmp_path):
+    """
+    A record whose CRC32 does not match is not replayed; records in other segments are.
+    """
+    monkeypatch.setattr(sfc, 'INFLUX_SPOOL_REPLAY_RATE', 1000.0)
+    # NOTE: segments smaller than a record, so every record gets its own segment
+    spool = sfc.WriteSpool(str(tmp_path), 1 << 20, 1)
+    for i in range(3):
+        spool.append('m f=' + str(i) + 'i')
+    spool.close()
+    corrupted = os.path.join(str(tmp_path), spool.segments[1])
+    with open(corrupted, 'r+b') as f:
+        f.seek(sfc.WriteSpool.HEADER.size)
+        f.write(b'M')
+    writer = FakeWriter()
+    asyncio.run(sfc.WriteSpool(str(tmp_path), 1 << 20, 1).replay(writer))
+    assert writer.bodies == ['m f=0i', 'm f=2i']
+
+
+def test_spool_evicts_oldest_at_size_cap(tmp_path):
+    record_size = sfc.WriteSpool.HEADER.size + len('m f=0i')
+    spool = sfc.WriteSpool(str(tmp_path), 3 * record_size, 1)
+    for i in range(5):
+        spool.append('m f=' + str(i) + 'i')
+    spool.close()
+    assert spool.stats['evicted'] == 2
+    assert spool.used_bytes() == 3 * record_size
+    assert _spooled(spool) == ['m f=2i', 'm f=3i', 'm f=4i']
+
+
+def test_spool_recovers_segments_after_restart(monkeypatch, tmp_path):
+    """
+    A new spool on the same directory picks up sealed segments and the active segment of a run that did not close it.
+    """
+    monkeypatch.setattr(sfc, 'INFLUX_SPOOL_REPLAY_RATE', 1000.0)
+    spool = sfc.WriteSpool(str(tmp_path), 1 << 20, 1 << 16)
+    spool.append('m f=0i')
+    spool.close()
+    spool = sfc.WriteSpool(str(tmp_path), 1 << 20, 1 << 16)
+    spool.append('m f=1i')
+    spool.append('m f=2i')
+    # NOTE: no close(), e.g. the process was killed; the active segment is still the size of a whole segment
+    restarted = sfc.WriteSpool(str(tmp_path), 1 << 20, 1 << 16)
+    assert restarted.pending()
+    restarted.append('m f=3i')
+    writer = FakeWriter()
+    asyncio.run(restarted.replay(writer))
+    assert writer.bodies == ['m f=0i', 'm f=1i', 'm f=2i', 'm f=3i']
+
+
+def test_flush_writes_replays_pending_spool(monkeypatch, tmp_path):
+    """
+    Batches spilled to the spool are replayed at the end of the cycle, even if no write succeeds in the meantime.
+    """
+    monkeypatch.setattr(sfc, 'INFLUX_SPOOL_REPLAY_RATE', 1000.0)
+    monkeypatch.setattr(sfc, 'args', argparse.Namespace(loglevel='WARNING', no_instrumenting=True), raising=False)
+    writer = sfc.InfluxWriter()
+    monkeypatch.setattr(sfc, 'INFLUX_WRITER', writer)
+    writer.spool = sfc.WriteSpool(str(tmp_path), 1 << 20, 1 << 16)
+    writer.spool.append('m f=1i')
+    fake = FakeWriter()
+    monkeypatch.setattr(writer, 'write', fake.write)
+
+    async def run():
+        await sfc._flush_writes()
+        await writer.replay_task
+
+    asyncio.run(run())
+    assert fake.bodies == ['m f=1i']
+    assert not writer.spool.pending()
+
+
+class FakeResponse:
+    """
+    Stands in for an aiohttp response. With a gate (asyncio.Event), the response arrives when the gate is set.
+    """
+
+    def __init__(self, status, body=b'', headers=None, gate=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.gate = gate
+
+    async def read(self):
+        return self.body
+
+    async def text(self):
+        return self.body.decode()
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            url = yarl.URL('https://mvip/json-rpc/12.5/')
+            raise sfc.aiohttp.ClientResponseError(sfc.aiohttp.RequestInfo(url, 'POST', {}, url), (), status=self.status)
+
+    async def __aenter__(self):
+        if self.gate is not None:
+            await self.gate.wait()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """
+    Stands in for an aiohttp ClientSession: returns the given responses in turn and records posted bodies.
+    """
+
+    closed = False
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, data=None, **kwargs):
+        self.posts.append(data)
+        return self.responses.pop(0)
+
+
+def _writer_with_session(monkeypatch, responses):
+    monkeypatch.setattr(sfc, 'args', argparse.Namespace(loglevel='WARNING'), raising=False)
+    monkeypatch.setattr(sfc, 'INFLUXDB3_AUTH_TOKEN', 'token')
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_GZIP_LEVEL', 0)
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_RETRIES', 3)
+    backoffs = []
+
+    def backoff(attempt, retry_after=None):
+        backoffs.append((attempt, retry_after))
+        return 0
+
+    monkeypatch.setattr(sfc, '_write_backoff', backoff)
+    writer = sfc.InfluxWriter()
+    writer.session = FakeSession(responses)
+    return writer, backoffs
+
+
+def test_write_backoff_retry_after_takes_precedence(monkeypatch):
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_BACKOFF', 0.5)
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_BACKOFF_MAX', 10.0)
+    assert sfc._write_backoff(0, '3') == 3.0
+    assert sfc._write_backoff(5, '0.25') == 0.25
+    assert sfc._write_backoff(0, '60') == 10.0
+    assert sfc._write_backoff(0, '-1') == 0.0
+    # NOTE: an HTTP date is not supported and falls back to the jittered backoff
+    assert 0 <= sfc._write_backoff(0, 'Wed, 21 Oct 2026 07:28:00 GMT') <= 0.5
+
+
+def test_write_backoff_bounds(monkeypatch):
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_BACKOFF', 0.5)
+    monkeypatch.setattr(sfc, 'INFLUX_WRITE_BACKOFF_MAX', 10.0)
+    for attempt in range(8):
+        for _ in range(50):
+            assert 0 <= sfc._write_backoff(attempt) <= min(10.0, 0.5 * 2 ** attempt)
+    # NOTE: full jitter: the delay is drawn from [0, cap]; with the draw at the cap, the caps are exact
+    monkeypatch.setattr(sfc.random, 'uniform', lambda low, high: high)
+    assert [sfc._write_backoff(attempt) for attempt in range(7)] == [0.5, 1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+
+
+def test_write_retries_transient_failures_with_retry_after(monkeypatch):
+    writer, backoffs = _writer_with_session(monkeypatch, [FakeResponse(503, headers={'Retry-After': '2'}),
+                                                          FakeResponse(429), FakeResponse(204)])
+    assert asyncio.run(writer.write('m f=1i 1', 'm')) == 204
+    assert len(writer.session.posts) == 3
+    assert backoffs == [(0, '2'), (1, None)]
+    assert writer.stats['retries'] == 2
+
+
+def test_write_gives_up_after_retries(monkeypatch):
+    writer, backoffs = _writer_with_session(monkeypatch, [FakeResponse(503) for _ in range(4)])
+    assert asyncio.run(writer.write('m f=1i 1', 'm')) == 503
+    assert len(writer.session.posts) == 4
+    assert writer.failures == 1
+
+
+@pytest.mark.parametrize('status', [400, 401, 403, 404, 413, 422])
+def test_write_does_not_retry_non_transient_4xx(monkeypatch, status):
+    writer, backoffs = _writer_with_session(monkeypatch, [FakeResponse(status)])
+    assert asyncio.run(writer.write('m f=1i 1', 'm')) == status
+    assert len(writer.session.posts) == 1
+    assert backoffs == []
+
+
+def test_write_partial_write_quarantines_only_rejected_lines(monkeypatch, tmp_path):
+    quarantine_file = tmp_path / 'rejected.lp'
+    monkeypatch.setattr(sfc, 'INFLUX_QUARANTINE_FILE', str(quarantine_file))
+    payload = 'm f=1i 1\nm f="x" 1\nm f=3i 1'
+    error = {'error': 'partial write of line protocol occurred',
+             'data': [{'original_line': 'm f="x" 1', 'line_number': 2,
+                       'error_message': 'invalid column type for column \'f\', expected iox::column_type::field::integer'}]}
+    writer, backoffs = _writer_with_session(monkeypatch, [FakeResponse(400, json.dumps(error).encode())])
+    # NOTE: the other lines were written, so the batch counts as sent and is not spooled or retried
+    assert asyncio.run(writer.write(payload, 'm')) == 204
+    assert len(writer.session.posts) == 1
+    assert quarantine_file.read_text() == 'm f="x" 1\n'
+    assert (writer.stats['partial_writes'], writer.stats['rejected_lines']) == (1, 1)
+
+
+class FakeClock:
+    """
+    Stands in for the time module in sfc, so that tests control time.monotonic().
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+def _governor(monkeypatch, rate_max=50.0, rate_min=1.0, max_in_flight=16):
+    monkeypatch.setattr(sfc, 'SF_RATE_MAX', rate_max)
+    monkeypatch.setattr(sfc, 'SF_RATE_MIN', rate_min)
+    monkeypatch.setattr(sfc, 'SF_MAX_IN_FLIGHT', max_in_flight)
+    monkeypatch.setattr(sfc, 'SF_LATENCY_TARGET', 2.0)
+    clock = FakeClock()
+    monkeypatch.setattr(sfc, 'time', clock)
+    return sfc.SFGovernor(), clock
+
+
+def test_governor_decreases_on_failed_and_slow_requests(monkeypatch):
+    governor, clock = _governor(monkeypatch)
+    governor.feedback(0.1, True)
+    assert (governor.rate, governor.limit) == (25.0, 8.0)
+    # NOTE: at most one decrease per second
+    clock.now += 0.5
+    governor.feedback(0.1, True)
+    assert (governor.rate, governor.limit) == (25.0, 8.0)
+    clock.now += 1.0
+    governor.feedback(2.5, False)
+    assert (governor.rate, governor.limit) == (12.5, 4.0)
+    assert (governor.stats['failed'], governor.stats['slow'], governor.stats['decreases']) == (2, 1, 2)
+
+
+def test_governor_increases_additively(monkeypatch):
+    governor, clock = _governor(monkeypatch)
+    governor.rate, governor.limit = 10.0, 4.0
+    governor.feedback(0.1, False)
+    assert governor.rate == pytest.approx(10.1)
+    assert governor.limit == pytest.approx(4.25)
+    # NOTE: the latency target itself still counts as a success
+    governor.feedback(2.0, False)
+    assert governor.rate > 10.1 and governor.stats['slow'] == 0
+
+
+def test_governor_stays_within_floor_and_ceiling(monkeypatch):
+    governor, clock = _governor(monkeypatch, rate_max=8.0, rate_min=1.0, max_in_flight=4)
+    for _ in range(20):
+        clock.now += 1.0
+        governor.feedback(0.1, True)
+    assert (governor.rate, governor.limit) == (1.0, 1.0)
+    for _ in range(1000):
+        governor.feedback(0.1, False)
+    assert (governor.rate, governor.limit) == (8.0, 4.0)
+
+
+def test_governor_serves_higher_priority_waiters_first(monkeypatch):
+    monkeypatch.setattr(sfc, 'SF_RATE_MAX', 50.0)
+    monkeypatch.setattr(sfc, 'SF_MAX_IN_FLIGHT', 1)
+    order = []
+
+    async def request(governor, tier):
+        await governor.acquire(sfc.SF_TIER_PRIORITY[tier])
+        order.append(tier)
+        governor.release()
+
+    async def run():
+        governor = sfc.SFGovernor()
+        await governor.acquire(sfc.SF_TIER_PRIORITY['med'])
+        # NOTE: the low-frequency request starts waiting first
+        waiting = [asyncio.ensure_future(request(governor, 'lo')), asyncio.ensure_future(request(governor, 'hi'))]
+        await asyncio.sleep(0)
+        assert order == [] and len(governor.waiters) == 2
+        governor.release()
+        await asyncio.gather(*waiting)
+        return governor
+
+    governor = asyncio.run(run())
+    assert order == ['hi', 'lo']
+    assert governor.in_flight == 0 and governor.stats['waited'] == 2
+
+
+def test_fetch_shares_identical_in_flight_requests():
+    payload = '{"method": "ListVolumes", "params": {"volumeStatus": "active"}}'
+
+    async def run():
+        client = sfc.SolidFireClient()
+        gate = asyncio.Event()
+        session = FakeSession([FakeResponse(200, b'{"result": {}}', gate=gate),
+                               FakeResponse(200, b'{"result": {"accounts": []}}')])
+        callers = [asyncio.ensure_future(client.fetch(session, 'url', payload)) for _ in range(5)]
+        await asyncio.sleep(0)
+        # NOTE: a different request is not shared
+        other = await client.fetch(session, 'url', '{"method": "ListAccounts"}')
+        gate.set()
+        return client, session, await asyncio.gather(*callers), other
+
+    client, session, bodies, other = asyncio.run(run())
+    assert session.posts == [payload, '{"method": "ListAccounts"}']
+    assert bodies == [b'{"result": {}}'] * 5
+    assert other == b'{"result": {"accounts": []}}'
+    assert client.flush_coalesced() == {'ListVolumes': 4}
+    assert client.inflight == {}
+
+
+def test_fetch_passes_exception_to_every_waiter():
+    payload = '{"method": "ListVolumes"}'
+
+    async def run():
+        client = sfc.SolidFireClient()
+        gate = asyncio.Event()
+        session = FakeSession([FakeResponse(503, b'busy', gate=gate)])
+        callers = [asyncio.ensure_future(client.fetch(session, 'url', payload)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        return client, session, await asyncio.gather(*callers, return_exceptions=True)
+
+    client, session, results = asyncio.run(run())
+    assert len(session.posts) == 1
+    assert len(results) == 3
+    assert all(isinstance(r, sfc.aiohttp.ClientResponseError) and r.status == 503 for r in results)
+    assert client.inflight == {}
+
+
+def test_fetch_resends_when_the_shared_request_is_cancelled():
+    payload = '{"method": "ListVolumes"}'
+
+    async def run():
+        client = sfc.SolidFireClient()
+        gate = asyncio.Event()
+        session = FakeSession([FakeResponse(200, b'first', gate=gate), FakeResponse(200, b'second')])
+        leader = asyncio.ensure_future(client.fetch(session, 'url', payload))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(client.fetch(session, 'url', payload))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return session, await waiter, leader.cancelled()
+
+    session, body, cancelled = asyncio.run(run())
+    assert cancelled
+    assert body == b'second'
+    assert len(session.posts) == 2
+
+
+def _response_cache(monkeypatch):
+    monkeypatch.setattr(sfc, 'SF_CACHE_TTL', {'ListVolumes': 300, 'ListAccounts': 60})
+    clock = FakeClock()
+    monkeypatch.setattr(sfc, 'time', clock)
+    return sfc.SFResponseCache(), clock
+
+
+def test_response_cache_expires_entries_after_ttl(monkeypatch):
+    cache, clock = _response_cache(monkeypatch)
+    volumes = cache.key('{"method": "ListVolumes", "params": {"startVolumeID": 1, "limit": 2}}')
+    accounts = cache.key('{"method": "ListAccounts"}')
+    cache.put(volumes, b'volumes')
+    cache.put(accounts, b'accounts')
+    clock.now += 59
+    assert (cache.get(volumes), cache.get(accounts)) == (b'volumes', b'accounts')
+    clock.now += 1
+    assert (cache.get(volumes), cache.get(accounts)) == (b'volumes', None)
+    clock.now += 240
+    assert cache.get(volumes) is None
+    assert cache.entries == {}
+    stats = cache.flush_stats()
+    assert (stats['ListVolumes']['hits'], stats['ListVolumes']['misses']) == (2, 1)
+    assert (stats['ListAccounts']['hits'], stats['ListAccounts']['misses']) == (1, 1)
+
+
+def test_response_cache_keys_by_method_and_params(monkeypatch):
+    cache, clock = _response_cache(monkeypatch)
+    key = cache.key('{"method": "ListVolumes", "params": {"startVolumeID": 1, "limit": 2}}')
+    assert cache.key('{"method": "ListVolumes", "params": {"limit": 2, "startVolumeID": 1}}') == key
+    assert cache.key('{"method": "ListVolumes", "params": {"limit": 3, "startVolumeID": 1}}') != key
+    assert cache.key('{"method": "ListVolumes"}') == cache.key('{"method": "ListVolumes", "params": {}}')
+    # NOTE: methods without a TTL are not cached
+    assert cache.key('{"method": "ListVolumeStats", "params": {"volumeIDs": [1]}}') is None
+    cache.put(None, b'stats')
+    assert cache.get(None) is None and cache.entries == {}
+
+
+def test_response_cache_invalidates_a_method_or_all(monkeypatch):
+    cache, clock = _response_cache(monkeypatch)
+    first = cache.key('{"method": "ListVolumes", "params": {"startVolumeID": 1}}')
+    second = cache.key('{"method": "ListVolumes", "params": {"startVolumeID": 100}}')
+    accounts = cache.key('{"method": "ListAccounts"}')
+    for key in (first, second, accounts):
+        cache.put(key, b'body')
+    cache.invalidate('ListVolumes')
+    assert list(cache.entries) == [accounts]
+    cache.invalidate()
+    assert cache.entries == {}
+    stats = cache.flush_stats()
+    assert stats['ListVolumes']['invalidations'] == 2
+    assert stats['ListAccounts']['invalidations'] == 1
+
+
+def test_response_cache_counts_entries_and_bytes(monkeypatch):
+    cache, clock = _response_cache(monkeypatch)
+    cache.put(cache.key('{"method": "ListVolumes", "params": {"startVolumeID": 1}}'), b'x' * 100)
+    cache.put(cache.key('{"method": "ListVolumes", "params": {"startVolumeID": 2}}'), b'x' * 50)
+    accounts = cache.key('{"method": "ListAccounts"}')
+    cache.put(accounts, b'x' * 10)
+    stats = cache.flush_stats()
+    assert (stats['ListVolumes']['entries'], stats['ListVolumes']['bytes']) == (2, 150)
+    assert (stats['ListAccounts']['entries'], stats['ListAccounts']['bytes']) == (1, 10)
+    # NOTE: expired entries are dropped when the next response is added
+    clock.now += 61
+    cache.put(cache.key('{"method": "ListVolumes", "params": {"startVolumeID": 3}}'), b'x' * 20)
+    stats = cache.flush_stats()
+    assert (stats['ListVolumes']['entries'], stats['ListVolumes']['bytes']) == (3, 170)
+    assert 'ListAccounts' not in stats
+    assert cache.flush_stats()['ListVolumes'] == {'hits': 0, 'misses': 0, 'invalidations': 0, 'entries': 3,
+                                                  'bytes': 170}
+
+
+def test_sf_api_post_caches_only_successful_responses(monkeypatch):
+    cache, clock = _response_cache(monkeypatch)
+    monkeypatch.setattr(sfc, 'SF_RESPONSE_CACHE', cache)
+    bodies = [b'{"error": {"name": "xNotReady"}}', b'{"result": {"volumes": []}}', b'{"result": {"volumes": [1]}}']
+    posts = []
+
+    class Client:
+        async def fetch(self, session, url, payload):
+            posts.append(payload)
+            return bodies[len(posts) - 1]
+
+    monkeypatch.setattr(sfc, 'SF_CLIENT', Client())
+    payload = '{"method": "ListVolumes"}'
+
+    async def run():
+        return [await sfc.sf_api_post(None, 'url', payload, None) for _ in range(3)]
+
+    results = asyncio.run(run())
+    assert len(posts) == 2
+    assert results == [{'error': {'name': 'xNotReady'}}, {'result': {'volumes': []}}, {'result': {'volumes': []}}]
+    # NOTE: callers get their own copy of a cached response
+    assert results[1] is not results[2]
+
+
+class ChunkedStream:
+    """
+    Stands in for an aiohttp response stream: read() returns the body in the given chunks, whatever n is.
+    """
+
+    def __init__(self, body, boundaries):
+        edges = [0] + sorted(boundaries) + [len(body)]
+        self.chunks = [body[a:b] for a, b in zip(edges, edges[1:]) if b > a]
+
+    async def read(self, n):
+        return self.chunks.pop(0) if self.chunks else b''
+
+
+def _array_items(body, boundaries, path=('result', 'volumes')):
+    async def run():
+        return [item async for item in sfc._json_array_items(ChunkedStream(body, boundaries), path)]
+    return asyncio.run(run())
+
+
+# NOTE: strings with escaped quotes, brackets, commas and multi-byte characters, nested objects and arrays, numbers
+STREAM_DOCUMENT = json.dumps({'id': 1, 'volumes': 'not this one', 'result': {
+    'other': {'volumes': [0]},
+    'volumes': [
+        {'volumeID': 1, 'name': 'say \"hi\" [1], {2}', 'attributes': {'nested': {'deeper': [1, {'x': None}]}},
+         'qos': {'minIOPS': 50, 'burstTime': 60}, 'throttle': -2.5},
+        {'volumeID': 2, 'name': 'tr\\ailing \\\\', 'attributes': {}, 'qos': {}, 'throttle': 0.0},
+        {'volumeID': 3, 'name': 'völüme ☃', 'attributes': {'a': [[], {}]}, 'qos': None,
+         'throttle': 12345678901234567890},
+        'plain', 42, True, None]}}, ensure_ascii=False).encode()
+
+
+def _boundary(marker, offset=0):
+    return STREAM_DOCUMENT.index(marker.encode()) + offset
+
+
+@pytest.mark.parametrize('boundaries', [
+    pytest.param([_boundary('say') + 2], id='inside-string'),
+    pytest.param([_boundary('\\"hi') + 1], id='after-escape-backslash'),
+    pytest.param([_boundary('\\"hi') + 2], id='after-escaped-quote'),
+    pytest.param([_boundary('deeper') + 3, _boundary('"x"') + 1], id='inside-nested-object'),
+    pytest.param([_boundary('}, {"volumeID": 2') + 1, _boundary('}, {"volumeID": 2') + 2], id='between-items'),
+    pytest.param([_boundary('ö') + 1], id='inside-multibyte-character'),
+    pytest.param([_boundary(', 42,') + 3], id='inside-number'),
+    pytest.param([_boundary('"volumes": [{') + 11], id='at-array-start'),
+])
+def test_json_array_items_across_chunk_boundaries(monkeypatch, boundaries):
+    monkeypatch.setattr(sfc, 'SF_STREAM_READ_SIZE', 16)
+    assert _array_items(STREAM_DOCUMENT, boundaries) == json.loads(STREAM_DOCUMENT)['result']['volumes']
+
+
+def test_json_array_items_at_every_chunk_size(monkeypatch):
+    monkeypatch.setattr(sfc, 'SF_STREAM_READ_SIZE', 16)
+    expected = json.loads(STREAM_DOCUMENT)['result']['volumes']
+    for size in (1, 2, 3, 7, 64, len(STREAM_DOCUMENT)):
+        assert _array_items(STREAM_DOCUMENT, range(size, len(STREAM_DOCUMENT), size)) == expected, size
+
+
+def test_json_array_items_empty_array():
+    body = b'{"id": 1, "result": {"volumes": [ ]}}'
+    assert _array_items(body, [len(body) - 4]) == json.loads(body)['result']['volumes'] == []
+
+
+def test_json_array_items_error_response_raises_like_json_loads():
+    body = b'{"id": 1, "error": {"name": "xUnknownAPIMethod", "code": 500, "message": "[volumes]"}}'
+    with pytest.raises(KeyError):
+        _array_items(body, [10, 40])
+
+
+def _chunk_sizer(monkeypatch, size=24, fixed=False):
+    monkeypatch.setattr(sfc, 'args', argparse.Namespace(loglevel='WARNING', fixed_chunk_size=fixed), raising=False)
+    monkeypatch.setattr(sfc, 'CHUNK_SIZE', size)
+    monkeypatch.setattr(sfc, 'CHUNK_SIZE_MIN', 8)
+    monkeypatch.setattr(sfc, 'CHUNK_SIZE_MAX', 500)
+    monkeypatch.setattr(sfc, 'CHUNK_LATENCY_CEILING', 5.0)
+    return sfc.ChunkSizer('ListVolumeStats')
+
+
+def _chunk_cycle(sizer, latency, items=2000):
+    """
+    Observe one cycle of calls of sizer.size items over items items, with latency(size) seconds per call.
+    """
+    for start in range(0, items, sizer.size):
+        size = min(sizer.size, items - start)
+        sizer.observe(size, latency(size), 100 * size)
+    return sizer.adjust()
+
+
+def test_chunk_sizer_grows_while_time_per_item_improves(monkeypatch):
+    sizer = _chunk_sizer(monkeypatch)
+    sizes = [sizer.size]
+    for _ in range(4):
+        _chunk_cycle(sizer, lambda size: 0.1 + 0.001 * size)
+        sizes.append(sizer.size)
+    assert sizes == [24, 30, 37, 46, 57]
+
+
+def test_chunk_sizer_turns_around_when_time_per_item_gets_worse(monkeypatch):
+    sizer = _chunk_sizer(monkeypatch)
+    # NOTE: per call overhead plus a cost that grows faster than the size: the time per item is lowest at 100 items
+    sizes = [sizer.size]
+    for _ in range(40):
+        _chunk_cycle(sizer, lambda size: 0.1 + 0.001 * size + 0.00001 * size ** 2)
+        sizes.append(sizer.size)
+    turned = [i for i in range(2, len(sizes)) if (sizes[i] - sizes[i - 1]) * (sizes[i - 1] - sizes[i - 2]) < 0]
+    assert turned
+    assert max(sizes) < 200
+    assert all(50 <= size <= 160 for size in sizes[-10:])
+
+
+def test_chunk_sizer_halves_above_latency_ceiling(monkeypatch):
+    sizer = _chunk_sizer(monkeypatch, size=200)
+    stats = _chunk_cycle(sizer, lambda size: 6.0 if size == 200 else 1.0)
+    assert (stats['chunk_size'], stats['latency_max']) == (200, 6.0)
+    assert sizer.size == 100 and sizer.direction == -1
+
+
+def test_chunk_sizer_does_not_grow_towards_latency_ceiling(monkeypatch):
+    sizer = _chunk_sizer(monkeypatch, size=100)
+    # NOTE: 4.5s * STEP would exceed the 5s ceiling
+    _chunk_cycle(sizer, lambda size: 4.5)
+    assert sizer.size == 100
+
+
+def test_chunk_sizer_does_not_grow_while_all_items_fit_in_one_call(monkeypatch):
+    sizer = _chunk_sizer(monkeypatch, size=100)
+    _chunk_cycle(sizer, lambda size: 0.1, items=60)
+    assert sizer.size == 100
+
+
+def test_chunk_sizer_stays_within_bounds(monkeypatch):
+    sizer = _chunk_sizer(monkeypatch, size=10)
+    for _ in range(3):
+        _chunk_cycle(sizer, lambda size: 9.0)
+    assert sizer.size == 8 and sizer.direction == 1
+    sizer = _chunk_sizer(monkeypatch, size=450)
+    for _ in range(3):
+        _chunk_cycle(sizer, lambda size: 0.5, items=5000)
+    assert sizer.size == 500 and sizer.direction == -1
+    # NOTE: the configured start size is clamped too
+    assert _chunk_sizer(monkeypatch, size=1000).size == 500
+
+
+def test_fixed_chunk_size(monkeypatch):
+    sizer = _chunk_sizer(monkeypatch, size=50, fixed=True)
+    for latency in (lambda size: 0.1, lambda size: 9.0, lambda size: 0.1 + 0.00001 * size ** 2):
+        stats = _chunk_cycle(sizer, latency)
+        assert sizer.size == 50 and stats['chunk_size'] == 50
+
+
+def test_chunk_sizer_without_calls(monkeypatch):
+    sizer = _chunk_sizer(monkeypatch)
+    assert sizer.adjust() is None
+    assert sizer.size == 24
+
+
+def _rotation(monkeypatch, tmp_path, slices=4):
+    monkeypatch.setattr(sfc, 'args', argparse.Namespace(loglevel='WARNING'), raising=False)
+    return sfc.EfficiencyRotation(slices, str(tmp_path / 'efficiency.json'))
+
+
+def _tick(rotation, accounts, volumes, totals=(10, 20), failed=((), ())):
+    rotation.record('accounts', accounts, totals[0], failed[0])
+    rotation.record('volumes', volumes, totals[1], failed[1])
+    return rotation.advance()
+
+
+def test_efficiency_rotation_selects_slices_by_id(monkeypatch, tmp_path):
+    rotation = _rotation(monkeypatch, tmp_path)
+    assert [i for i in range(10) if rotation.selects('volumes', i)] == [0, 4, 8]
+    _tick(rotation, 3, 5)
+    assert [i for i in range(10) if rotation.selects('volumes', i)] == [1, 5, 9]
+
+
+def test_efficiency_rotation_advance_wraps_the_round(monkeypatch, tmp_path):
+    rotation = _rotation(monkeypatch, tmp_path, slices=2)
+    tick = _tick(rotation, 3, 5)
+    assert (tick['slice'], tick['round'], tick['collected']) == (0, 1, {'accounts': 3, 'volumes': 5})
+    assert tick['refreshed'] == {'accounts': 3, 'volumes': 5} and tick['totals'] == {'accounts': 10, 'volumes': 20}
+    tick = _tick(rotation, 2, 4)
+    assert (tick['slice'], tick['round'], tick['refreshed']) == (1, 1, {'accounts': 5, 'volumes': 9})
+    # NOTE: the last slice of a round was collected, so the next tick starts a new round
+    assert (rotation.slice, rotation.round, rotation.refreshed) == (0, 2, {'accounts': 0, 'volumes': 0})
+
+
+def test_efficiency_rotation_complete_needs_both_kinds(monkeypatch, tmp_path):
+    rotation = _rotation(monkeypatch, tmp_path)
+    assert not rotation.complete()
+    rotation.record('accounts', 3, 10)
+    assert not rotation.complete()
+    rotation.record('volumes', 0, 0)
+    assert rotation.complete()
+
+
+def test_efficiency_rotation_discard_keeps_the_slice(monkeypatch, tmp_path):
+    rotation = _rotation(monkeypatch, tmp_path)
+    rotation.record('accounts', 3, 10, [4])
+    rotation.record('volumes', 5, 20)
+    rotation.discard()
+    assert rotation.slice == 0 and not rotation.complete()
+    assert rotation.collected == {'accounts': 0, 'volumes': 0} and rotation.refreshed == {'accounts': 0, 'volumes': 0}
+    # NOTE: the whole slice is collected again, so failures of the discarded tick are not retried separately
+    tick = _tick(rotation, 3, 5)
+    assert tick['slice'] == 0 and tick['failed'] == {'accounts': 0, 'volumes': 0}
+    assert rotation.retry == {'accounts': set(), 'volumes': set()}
+
+
+def test_efficiency_rotation_retries_failed_objects_in_the_next_tick(monkeypatch, tmp_path):
+    rotation = _rotation(monkeypatch, tmp_path)
+    tick = _tick(rotation, 2, 4, failed=([4], [0, 8]))
+    assert tick['failed'] == {'accounts': 1, 'volumes': 2}
+    assert [i for i in range(10) if rotation.selects('accounts', i)] == [1, 4, 5, 9]
+    assert [i for i in range(10) if rotation.selects('volumes', i)] == [0, 1, 5, 8, 9]
+    _tick(rotation, 3, 5)
+    assert [i for i in range(10) if rotation.selects('volumes', i)] == [2, 6]
+
+
+def test_efficiency_rotation_resumes_from_the_state_file(monkeypatch, tmp_path):
+    rotation = _rotation(monkeypatch, tmp_path)
+    _tick(rotation, 3, 5)
+    _tick(rotation, 2, 4, failed=([5], [9]))
+    with open(rotation.state_file) as f:
+        assert json.load(f) == {'slices': 4, 'next_slice': 2, 'round': 1, 'refreshed': {'accounts': 5, 'volumes': 9},
+                                'retry': {'accounts': [5], 'volumes': [9]}}
+    assert not os.path.exists(rotation.state_file + '.tmp')
+    resumed = _rotation(monkeypatch, tmp_path)
+    assert (resumed.slice, resumed.round, resumed.refreshed) == (2, 1, {'accounts': 5, 'volumes': 9})
+    assert resumed.retry == {'accounts': {5}, 'volumes': {9}}
+    assert resumed.selects('accounts', 5) and resumed.selects('volumes', 9) and not resumed.selects('volumes', 5)
+
+
+def test_efficiency_rotation_starts_a_new_round_when_slices_change(monkeypatch, tmp_path):
+    rotation = _rotation(monkeypatch, tmp_path)
+    _tick(rotation, 3, 5, failed=([4], []))
+    resumed = _rotation(monkeypatch, tmp_path, slices=3)
+    assert (resumed.slice, resumed.round, resumed.refreshed) == (0, 1, {'accounts': 0, 'volumes': 0})
+    assert resumed.retry == {'accounts': set(), 'volumes': set()}
+
+
+def test_efficiency_rotation_ignores_a_corrupt_state_file(monkeypatch, tmp_path):
+    (tmp_path / 'efficiency.json').write_text('{"slices": 4, "next_')
+    rotation = _rotation(monkeypatch, tmp_path)
+    assert (rotation.slice, rotation.round) == (0, 1)
+
+
+def test_account_efficiency_does_not_count_failed_accounts(monkeypatch, tmp_path):
+    rotation = _rotation(monkeypatch, tmp_path, slices=2)
+    monkeypatch.setattr(sfc, 'args', argparse.Namespace(loglevel='WARNING', no_instrumenting=True), raising=False)
+    monkeypatch.setattr(sfc, 'EFFICIENCY_ROTATION', rotation)
+    monkeypatch.setattr(sfc, 'ACCOUNT_EFFICIENCY_CONCURRENCY', 1)
+    monkeypatch.setattr(sfc, 'CLUSTER_NAME', 'PROD-01', raising=False)
+    monkeypatch.setattr(sfc, 'CURRENT_TIMESTAMP', None, raising=False)
+    accounts = {'result': {'accounts': [{'accountID': i, 'username': 'a' + str(i)} for i in range(1, 5)]}}
+
+    async def sf_api_post(session, url, payload, auth):
+        return accounts
+
+    sent = []
+
+    async def send_to_influx(payload):
+        sent.append(payload)
+
+    monkeypatch.setattr(sfc, 'sf_api_post', sf_api_post)
+    monkeypatch.setattr(sfc, 'send_to_influx', send_to_influx)
+    efficiency = {'result': {'compression': 2.0, 'deduplication': 1.5, 'thinProvisioning': 3.0}}
+    session = FakeSession([FakeResponse(200, json.dumps(efficiency).encode()),
+                           FakeResponse(200, b'{"error": {"name": "xUnknownAccount"}}')])
+    asyncio.run(sfc.account_efficiency(session, None))
+    assert ['"accountID": 2' in session.posts[0], '"accountID": 4' in session.posts[1]] == [True, True]
+    assert len(sent) == 1 and sent[0].startswith('account_efficiency,cluster=PROD-01,id=2,name=a2 ')
+    assert rotation.collected['accounts'] == 1 and rotation.totals['accounts'] == 4
+    assert rotation.failed['accounts'] == {4}
+    rotation.record('volumes', 0, 0)
+    rotation.advance()
+    assert [i for i in range(1, 5) if rotation.selects('accounts', i)] == [1, 3, 4]
+
+
+def _volume_efficiency(monkeypatch, tmp_path, volumes, responses):
+    rotation = _rotation(monkeypatch, tmp_path, slices=2)
+    monkeypatch.setattr(sfc, 'args', argparse.Namespace(loglevel='WARNING', no_instrumenting=True), raising=False)
+    monkeypatch.setattr(sfc, 'EFFICIENCY_ROTATION', rotation)
+    monkeypatch.setattr(sfc, 'VOLUME_EFFICIENCY_CONCURRENCY', 1)
+    monkeypatch.setattr(sfc, 'CLUSTER_NAME', 'PROD-01', raising=False)
+    monkeypatch.setattr(sfc, 'CURRENT_TIMESTAMP', None, raising=False)
+
+    async def list_volumes(session, auth):
+        for volume in volumes:
+            if isinstance(volume, BaseException):
+                raise volume
+            yield volume
+
+    sent = []
+
+    async def send_to_influx(payload):
+        sent.append(payload)
+
+    monkeypatch.setattr(sfc, 'list_volumes', list_volumes)
+    monkeypatch.setattr(sfc, 'send_to_influx', send_to_influx)
+    session = FakeSession(responses)
+    asyncio.run(sfc.volume_efficiency(session, None))
+    return rotation, session, sent
+
+
+def test_volume_efficiency_does_not_count_failed_volumes(monkeypatch, tmp_path):
+    efficiency = {'result': {'compression': 2.0, 'deduplication': 1.5, 'thinProvisioning': 3.0}}
+    rotation, session, sent = _volume_efficiency(
+        monkeypatch, tmp_path, [{'volumeID': i, 'name': 'v' + str(i)} for i in range(1, 7)],
+        [FakeResponse(200, b'{"error": {"name": "xVolumeIDDoesNotExist"}}'),
+         FakeResponse(200, json.dumps(efficiency).encode()), FakeResponse(200, json.dumps(efficiency).encode())])
+    assert [json.loads(post)['params']['volumeID'] for post in session.posts] == [2, 4, 6]
+    assert len(sent) == 1 and sent[0].count('\n') == 1
+    assert rotation.collected['volumes'] == 2 and rotation.totals['volumes'] == 6
+    assert rotation.failed['volumes'] == {2}
+
+
+def test_volume_efficiency_returns_if_volumes_cannot_be_listed(monkeypatch, tmp_path):
+    error = sfc.aiohttp.ClientConnectionError('Connection reset by peer')
+    rotation, session, sent = _volume_efficiency(
+        monkeypatch, tmp_path, [{'volumeID': 1, 'name': 'v1'}, {'volumeID': 2, 'name': 'v2'}, error], [])
+    assert session.posts == [] and sent == []
+    # NOTE: volumes were not recorded, so the tick is discarded and the slice collected again
+    rotation.record('accounts', 0, 0)
+    assert not rotation.complete()
+
+
+def test_cycle_deadline_is_rounded_to_milliseconds(monkeypatch):
+    monkeypatch.setattr(sfc, 'INT_HI_FREQ', 0.4)
+    monkeypatch.setattr(sfc, 'INT_LO_FREQ', 3600)
+    monkeypatch.setattr(sfc, 'EFFICIENCY_SLICES', 7)
+    monkeypatch.setattr(sfc, 'CYCLE_DEADLINE_FRACTION', 0.8)
+    monkeypatch.setattr(sfc, 'SF_CALL_TIMEOUT', 30)
+    # NOTE: 0.4 * 0.8 is 0.32000000000000006
+    assert sfc.cycle_deadline('hi') == 0.32 and sfc.sf_call_timeout('hi') == 0.16
+    assert sfc.cycle_deadline('efficiency') == 411.429 and sfc.sf_call_timeout('efficiency') == 30
+
+
+def _histogram_summary(rows):
+    pytest.importorskip('numpy')
+    # NOTE: buckets 0, 1-19, 20-39, 40-59, 60-79, 80-100 and 101+
+    stats = sfc.qos_histogram_summary(rows, *sfc.QOS_HISTOGRAM_BOUNDS['targetUtilizationPercentages'])
+    return {stat: stats[stat].tolist() for stat in sfc.QOS_HISTOGRAM_STATS}
+
+
+def test_qos_histogram_bounds():
+    assert sfc.QOS_HISTOGRAM_BOUNDS['targetUtilizationPercentages'] == (
+        [0.0, 1.0, 20.0, 40.0, 60.0, 80.0, 101.0], [0.0, 19.0, 39.0, 59.0, 79.0, 100.0, 101.0])
+
+
+def test_qos_histogram_summary_without_samples():
+    stats = _histogram_summary([[0] * 7])
+    assert all(math.isnan(value) for values in stats.values() for value in values)
+
+
+def test_qos_histogram_summary_interpolates_within_a_single_bucket():
+    assert _histogram_summary([[0, 0, 10, 0, 0, 0, 0]]) == {'p50': [29.5], 'p90': [37.1], 'p99': [38.81],
+                                                           'mean': [29.5]}
+
+
+def test_qos_histogram_summary_of_skewed_histograms():
+    stats = _histogram_summary([[90, 0, 0, 0, 0, 8, 2], [1, 0, 0, 0, 0, 0, 99], [0] * 7, [0, 0, 10, 0, 0, 0, 0]])
+    # NOTE: open-ended buckets count as their lower bound; every row is summarized on its own
+    assert stats['p50'][:2] == [0.0, 101.0] and stats['p90'][:2] == [0.0, 101.0]
+    assert stats['p99'][:2] == [101.0, 101.0] and stats['mean'][:2] == [9.22, 99.99]
+    assert math.isnan(stats['p50'][2]) and stats['p50'][3] == 29.5